@@ -0,0 +1,221 @@
+import base64
+import binascii
+import json
+import mimetypes
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+from helpscout.exceptions import HelpScoutException
+
+
+ChunkSize = 3 * 2 ** 16  # Multiple of 3 to encode without padding
+DataKey = b'"data"'
+
+
+def download_attachment(client, conversation_id, attachment_id, destination,
+                        chunk_size=ChunkSize):
+    """Downloads an attachment decoding its base64 data while it streams,
+    without holding the whole file in memory.
+
+    Parameters
+    ----------
+    client: HelpScout
+        A help scout client instance to query the API.
+    conversation_id: int or str
+        The id of the conversation the attachment belongs to.
+    attachment_id: int or str
+        The attachment id.
+    destination: str or file-like object
+        A file path or a binary file-like object to write the attachment to.
+        File-like objects are not closed.
+    chunk_size: int
+        Amount of bytes to read from the response at a time.
+
+    Returns
+    -------
+    int
+        The amount of bytes written.
+    """
+    endpoint = 'conversations/%s/attachments/%s/data' % (
+        conversation_id, attachment_id)
+    response = client.hit_raw(endpoint, 'get')
+    decoder = AttachmentDataDecoder()
+    written = 0
+    try:
+        with _open(destination, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                data = decoder.feed(chunk)
+                f.write(data)
+                written += len(data)
+            decoder.close()
+    finally:
+        response.close()
+    return written
+
+
+def download_attachments(client, attachments, max_workers=4,
+                         chunk_size=ChunkSize):
+    """Downloads several attachments concurrently.
+
+    Parameters
+    ----------
+    client: HelpScout
+        A help scout client instance to query the API, shared by the threads.
+    attachments: iterable((conversation_id, attachment_id, destination))
+        The attachments to download and where to write each of them.
+    max_workers: int
+        Amount of attachments to download at the same time.
+    chunk_size: int
+        Amount of bytes to read from each response at a time.
+
+    Returns
+    -------
+    [int]
+        The amount of bytes written for each attachment, in order.
+    """
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [
+            executor.submit(download_attachment, client, conversation_id,
+                            attachment_id, destination, chunk_size)
+            for conversation_id, attachment_id, destination in attachments]
+        return [future.result() for future in futures]
+
+
+def upload_attachment(client, conversation_id, thread_id, source,
+                      file_name=None, mime_type=None, chunk_size=ChunkSize):
+    """Uploads an attachment to a thread encoding its data in base64 while
+    it streams, without holding the whole file in memory.
+
+    Parameters
+    ----------
+    client: HelpScout
+        A help scout client instance to query the API.
+    conversation_id: int or str
+        The id of the conversation the thread belongs to.
+    thread_id: int or str
+        The id of the thread to attach the file to.
+    source: str or file-like object
+        A file path or a seekable binary file-like object, read from its
+        start.
+    file_name: str or None
+        The attachment's file name. Defaults to the source's file name.
+    mime_type: str or None
+        The attachment's mime type. Guessed from the file name by default.
+    chunk_size: int
+        Amount of bytes to read from the file at a time.
+    """
+    if file_name is None:
+        file_name = os.path.basename(getattr(source, 'name', source))
+    if mime_type is None:
+        mime_type = (mimetypes.guess_type(file_name)[0] or
+                     'application/octet-stream')
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    header = json.dumps({'fileName': file_name, 'mimeType': mime_type})
+    header = header[:-1].encode('utf-8') + b', "data": "'
+
+    def body():
+        with _open(source, 'rb') as f:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            yield header
+            chunk = f.read(chunk_size)
+            while chunk:
+                yield base64.b64encode(chunk)
+                chunk = f.read(chunk_size)
+            yield b'"}'
+
+    endpoint = 'conversations/%s/threads/%s/attachments' % (
+        conversation_id, thread_id)
+    client.hit_raw(endpoint, 'post', data=body).close()
+
+
+class AttachmentDataDecoder:
+
+    def __init__(self):
+        """Incrementally decodes the base64 data of a json response like
+        {"data": "<base64>"} as its chunks are received.
+        """
+        self._state = 'key'
+        self._buffer = b''
+        self._pending = b''
+
+    def feed(self, chunk):
+        """Decodes a chunk of the json response.
+
+        Parameters
+        ----------
+        chunk: bytes
+
+        Returns
+        -------
+        bytes
+            The attachment bytes decoded so far.
+        """
+        self._buffer += chunk
+        if self._state == 'key':
+            index = self._buffer.find(DataKey)
+            if index < 0:
+                self._buffer = self._buffer[-len(DataKey):]
+                return b''
+            self._buffer = self._buffer[index + len(DataKey):]
+            self._state = 'separator'
+        if self._state == 'separator':
+            index = self._buffer.find(b'"')
+            if index < 0:
+                return b''
+            if self._buffer[:index].strip() != b':':
+                raise HelpScoutException('Unexpected attachment data format')
+            self._buffer = self._buffer[index + 1:]
+            self._state = 'value'
+        if self._state != 'value':
+            return b''
+        # Base64 has no quotes, so the first one closes the string
+        index = self._buffer.find(b'"')
+        if index < 0:
+            keep = 1 if self._buffer.endswith(b'\\') else 0
+            value = self._buffer[:len(self._buffer) - keep]
+            self._buffer = self._buffer[len(value):]
+        else:
+            value, self._buffer = self._buffer[:index], b''
+            self._state = 'done'
+        value = (value.replace(b'\\/', b'/').replace(b'\\n', b'')
+                 .replace(b'\\r', b''))
+        self._pending += b''.join(value.split())
+        if self._state == 'done':
+            length = len(self._pending)
+        else:
+            length = len(self._pending) - len(self._pending) % 4
+        data, self._pending = (
+            self._pending[:length], self._pending[length:])
+        try:
+            return binascii.a2b_base64(data)
+        except binascii.Error as e:
+            raise HelpScoutException('Invalid attachment data: %s' % e)
+
+    def close(self):
+        """Checks the whole attachment data was decoded."""
+        if self._state != 'done':
+            raise HelpScoutException('Incomplete attachment data')
+
+
+def _open(destination, mode):
+    """Opens a path, or wraps a file-like object to avoid closing it."""
+    if hasattr(destination, 'write') or hasattr(destination, 'read'):
+        return _Unclosed(destination)
+    return open(destination, mode)
+
+
+class _Unclosed:
+
+    def __init__(self, f):
+        """Context manager returning a file-like object without closing it."""
+        self.f = f
+
+    def __enter__(self):
+        """Returns the file-like object."""
+        return self.f
+
+    def __exit__(self, *args):
+        """Leaves the file-like object open."""
+        return False
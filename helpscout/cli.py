@@ -0,0 +1,268 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from helpscout.client import EmbeddedKey, HelpScout, PageKey
+from helpscout.model import HelpScoutObject
+
+
+logger = logging.getLogger('HelpScout')
+StatsInterval = 10  # Seconds between progress reports
+
+
+def main(argv=None):
+    """Entry point of the helpscout-export command. E.g.:
+    helpscout-export conversations --since 2019-06-01T00:00:00Z \\
+        --concurrency 8 --out conversations.ndjson.gz
+
+    Parameters
+    ----------
+    argv: [str] or None
+        The command line arguments. None uses sys.argv.
+
+    Returns
+    -------
+    int
+        The exit status.
+    """
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else
+                        logging.INFO, format='%(message)s')
+    if not args.app_id or not args.app_secret:
+        sys.stderr.write('An app id and secret are required, through the '
+                         'HELPSCOUT_APP_ID and HELPSCOUT_APP_SECRET '
+                         'environment variables or the --app-id and '
+                         '--app-secret options.\n')
+        return 2
+    rate_limiter = None
+    if args.rate:
+        from helpscout.ratelimit import RateLimiter
+        rate_limiter = RateLimiter(args.rate / 60.)
+    client = HelpScout(args.app_id, args.app_secret,
+                       pool_size=args.concurrency, compression=True,
+                       rate_limiter=rate_limiter)
+    params = dict(param.split('=', 1) for param in args.param)
+    if args.since:
+        params['modifiedSince'] = args.since
+    exporter = HelpScoutExporter(client, args.endpoint, params, args.out,
+                                 args.checkpoint, args.concurrency)
+    exporter.run()
+    return 0
+
+
+def parse_args(argv=None):
+    """Parses the helpscout-export command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='helpscout-export',
+        description='Exports a Help Scout endpoint as json lines.')
+    parser.add_argument('endpoint', help='The endpoint to export. E.g.: '
+                        'conversations, customers.')
+    parser.add_argument('--since', help='Only objects modified since this '
+                        'timestamp. E.g.: 2019-06-01T00:00:00Z')
+    parser.add_argument('--param', action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help='Extra listing parameter, can be repeated. '
+                        'E.g.: --param status=all')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Amount of pages requested at the same time.')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Maximum requests per minute.')
+    parser.add_argument('--out', required=True, help='Output file path, '
+                        'gzipped when ending with .gz.')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Checkpoint file path to resume interrupted '
+                        'exports. Defaults to the output path with a '
+                        '.checkpoint suffix.')
+    parser.add_argument('--app-id', default=os.environ.get(
+        'HELPSCOUT_APP_ID'))
+    parser.add_argument('--app-secret', default=os.environ.get(
+        'HELPSCOUT_APP_SECRET'))
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not print progress stats.')
+    return parser.parse_args(argv)
+
+
+class HelpScoutExporter:
+
+    def __init__(self, client, endpoint, params, out, checkpoint=None,
+                 concurrency=4):
+        """Exports an endpoint listing as json lines, requesting several
+        pages at the same time and writing them in order, so memory stays
+        bounded by the pages in flight.
+
+        After each page is written its number and the output's size are
+        saved to a checkpoint file. Running an export with the same endpoint
+        and parameters again truncates the output to the saved size, dropping
+        anything written after the checkpoint, and resumes after the last
+        page saved. Gzipped outputs are written as a gzip member per page, so
+        they can be truncated after any page.
+
+        Parameters
+        ----------
+        client: HelpScout
+            A help scout client instance to query the API.
+        endpoint: str
+            The endpoint to list. E.g.: conversations.
+        params: dict
+            The listing parameters. Sorting by an immutable attribute, like
+            sortField=createdAt, keeps pages stable between runs.
+        out: str
+            The output file path, gzipped when ending with .gz.
+        checkpoint: str or None
+            The checkpoint file path. None uses the output path with a
+            .checkpoint suffix.
+        concurrency: int
+            Amount of pages requested at the same time.
+        """
+        self.client = client
+        self.endpoint = endpoint
+        self.params = params
+        self.out = out
+        self.checkpoint = checkpoint or out + '.checkpoint'
+        self.concurrency = concurrency
+        self.key = HelpScoutObject.cls(endpoint, endpoint).key
+        self.objects = 0
+        self.pages = 0
+        self.rate_limited = 0
+        self.client.hooks.append(self._hook)
+
+    def run(self):
+        """Exports the pages not exported yet.
+
+        Returns
+        -------
+        int
+            The amount of objects written in this run.
+        """
+        state = self._load_checkpoint()
+        page = state['page'] + 1
+        start = time.time()
+        last_report = start
+        with _open(self.out, state['offset']) as f, \
+                ThreadPoolExecutor(self.concurrency) as executor:
+            total_pages = self._write(f, page, self._fetch(page))
+            pending = deque()
+            next_page = page + 1
+            while next_page <= total_pages or pending:
+                while next_page <= total_pages and \
+                        len(pending) < self.concurrency:
+                    pending.append(
+                        (next_page, executor.submit(self._fetch, next_page)))
+                    next_page += 1
+                page, future = pending.popleft()
+                self._write(f, page, future.result())
+                if time.time() - last_report >= StatsInterval:
+                    self._report(start)
+                    last_report = time.time()
+        self._report(start)
+        return self.objects
+
+    def _fetch(self, page):
+        """Requests a single page of the listing."""
+        params = dict(self.params, page=page)
+        r = self.client.hit_raw(self.endpoint, 'get', params=params,
+                                stream=False)
+        try:
+            return r.json()
+        finally:
+            r.close()
+
+    def _write(self, f, page, response):
+        """Writes a page's objects and saves the checkpoint.
+
+        Returns
+        -------
+        int
+            The listing's total amount of pages.
+        """
+        objects = response.get(EmbeddedKey, {}).get(self.key, [])
+        if objects:
+            data = ''.join(json.dumps(api_object) + '\n'
+                           for api_object in objects).encode('utf-8')
+            if self.out.endswith('.gz'):
+                data = gzip.compress(data)
+            f.write(data)
+            f.flush()
+            self.objects += len(objects)
+            self.pages += 1
+            self._save_checkpoint(page, f.tell())
+        return response.get(PageKey, {}).get('totalPages', page)
+
+    def _load_checkpoint(self):
+        """Returns the saved checkpoint if it belongs to this export."""
+        state = {'endpoint': self.endpoint, 'params': self.params, 'page': 0,
+                 'offset': 0}
+        try:
+            with open(self.checkpoint) as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return state
+        if (saved.get('endpoint'), saved.get('params')) != \
+                (self.endpoint, self.params):
+            logger.warning('Checkpoint %s belongs to another export, '
+                           'starting over.' % self.checkpoint)
+            return state
+        if ('offset' not in saved or not os.path.exists(self.out) or
+                os.path.getsize(self.out) < saved['offset']):
+            logger.warning('Output %s is missing data saved by the '
+                           'checkpoint, starting over.' % self.out)
+            return state
+        logger.info('Resuming after page %s.' % saved['page'])
+        return saved
+
+    def _save_checkpoint(self, page, offset):
+        """Saves the last page written and the output's size, replacing the
+        file atomically."""
+        state = {'endpoint': self.endpoint, 'params': self.params,
+                 'page': page, 'offset': offset}
+        path = self.checkpoint + '.tmp'
+        with open(path, 'w') as f:
+            json.dump(state, f)
+        os.replace(path, self.checkpoint)
+
+    def _hook(self, event, info):
+        """Counts the rate limited responses."""
+        if event == 'response' and info['status_code'] == 429:
+            self.rate_limited += 1
+
+    def _report(self, start):
+        """Logs the export's throughput."""
+        elapsed = max(time.time() - start, 1e-6)
+        stats = self.client.stats
+        logger.info(
+            '%s objects, %s pages in %.1fs (%.1f objects/s, %.1f requests/s, '
+            '%.1f KB/s received), %s rate limited responses.' % (
+                self.objects, self.pages, elapsed, self.objects / elapsed,
+                stats['requests'] / elapsed,
+                stats['received_bytes'] / 1024. / elapsed,
+                self.rate_limited))
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(endpoint="%s", out="%s", concurrency=%s)' % (
+            self.__class__.__name__, self.endpoint, self.out,
+            self.concurrency)
+
+    __str__ = __repr__
+
+
+def _open(path, offset):
+    """Opens an output file to write after offset, truncating what follows.
+    """
+    if not offset:
+        return open(path, 'wb')
+    f = open(path, 'r+b')
+    f.truncate(offset)
+    f.seek(offset)
+    return f
+
+
+if __name__ == '__main__':
+    sys.exit(main())
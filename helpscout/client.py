@@ -1,23 +1,46 @@
+import gzip
+import json
 import logging
+import threading
 import time
 
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import partial
-try:  # Python 3
-    from urllib.parse import urljoin
-except ImportError:  # Python 2
-    from urlparse import urljoin
+from urllib.parse import urljoin
 
 import requests
 
+from requests.exceptions import Timeout
+
+from helpscout.concurrency import Deadline, prefetch, SingleFlight
 from helpscout.exceptions import (HelpScoutException,
                                   HelpScoutAuthenticationException,
-                                  HelpScoutRateLimitExceededException)
+                                  HelpScoutRateLimitExceededException,
+                                  HelpScoutTimeoutException)
 from helpscout.model import HelpScoutObject
+from helpscout.profiling import HelpScoutProfiler, response_wait
+from helpscout.transport import RequestsTransport
 
 
 logger = logging.getLogger('HelpScout')
 EmbeddedKey = '_embedded'
 PageKey = 'page'
+TokenExpirationMargin = 60
+# Relations the API embeds in the objects of an endpoint through ?embed=
+InlineRelations = {'conversations': ('threads',)}
+# Attributes referencing related objects by id, per relation endpoint
+RelationAttributes = {
+    'customers': ('primaryCustomer', 'customer'),
+    'users': ('assignee', 'assignedTo'),
+}
+RelationWorkers = 8
+HedgeWorkers = 32
+# Settings carried when pickling clients, passed again to __init__
+PickledSettings = (
+    'app_id', 'app_secret', 'base_url', 'sleep_on_rate_limit_exceeded',
+    'rate_limit_sleep', 'pool_size', 'coalesce_requests', 'prefetch_pages',
+    'compression', 'request_compression_threshold', 'timeout', 'priority')
 
 
 class HelpScout:
@@ -25,7 +48,12 @@ class HelpScout:
     def __init__(self, app_id, app_secret,
                  base_url='https://api.helpscout.net/v2/',
                  sleep_on_rate_limit_exceeded=True,
-                 rate_limit_sleep=10):
+                 rate_limit_sleep=10, mirror=None, pool_size=None,
+                 coalesce_requests=False, prefetch_pages=0, compression=False,
+                 request_compression_threshold=None, hooks=None,
+                 transport=None, rate_limiter=None, identity_map=None,
+                 timeout=None, hedging=None, circuit_breaker=None,
+                 priority=None):
         """Help Scout API v2 client wrapper.
 
         The app credentials are created on the My App section in your profile.
@@ -46,6 +74,73 @@ class HelpScout:
         rate_limit_sleep: int
             Amount of seconds to sleep when the rate limit is exceeded if
             sleep_on_rate_limit_exceeded is True.
+        mirror: helpscout.mirror.HelpScoutMirror or None
+            Local store where objects retrieved through get_objects are kept
+            and where single resources are looked up before hitting the API.
+        pool_size: int or None
+            Amount of connections to keep open to the API, usually the amount
+            of threads sharing the client. None opens a connection per request.
+            Ignored when a transport is given.
+        coalesce_requests: bool
+            True to make concurrent identical get_objects calls (same
+            endpoint, resource and parameters) share a single request to the
+            API. The returned objects are then shared among the callers.
+            Callers in asyncio event loops running the client through
+            executors are coalesced as well.
+        prefetch_pages: int
+            Amount of pages to request ahead in a background thread while the
+            caller consumes the current ones. Requesting further pages blocks
+            while that many pages are waiting to be consumed.
+            0 requests pages only when needed.
+        compression: bool
+            True to explicitly negotiate compressed responses, including
+            brotli when the brotli package is installed.
+        request_compression_threshold: int or None
+            Json bodies of at least this amount of bytes are sent gzipped.
+            None never compresses request bodies.
+        hooks: [callable] or None
+            Metrics hooks called as hook(event, info) where event is a str and
+            info a dictionary. A 'response' event is emitted for every
+            response with the method, url, status_code, sent_bytes,
+            received_bytes (as transferred, possibly compressed),
+            decoded_bytes and elapsed seconds.
+        transport: helpscout.transport.Transport or None
+            Sends the http requests, like HTTP2Transport to multiplex
+            concurrent requests over a single connection.
+            None uses requests, with a RequestsTransport if pool_size is set.
+        rate_limiter: helpscout.ratelimit.RateLimiter or None
+            Limiter every request waits for before being sent, shared with
+            other clients (even in other processes) to keep them all within
+            the same rate budget. A PriorityScheduler shares the budget
+            according to the clients priorities. None sends requests right
+            away.
+        identity_map: helpscout.model.IdentityMap or None
+            Map sharing a single object per class and id among every result
+            of get_objects, like the customers of different conversations.
+            Calls with fields or exclude build their own objects, as they
+            are partial. None builds new objects for every result.
+        timeout: float or (float, float) or None
+            Seconds to wait for each request, or connect and read timeouts.
+            Timeouts raise a HelpScoutTimeoutException. None waits forever.
+        hedging: helpscout.resilience.HedgingPolicy or None
+            Policy to send GET requests again when their responses are late,
+            using the first response received, to cut tail latencies.
+            Hedges are counted in stats as hedges and hedge_wins.
+            None sends every request once.
+        circuit_breaker: helpscout.resilience.CircuitBreaker or None
+            Breaker rejecting requests to endpoints failing too often with a
+            HelpScoutCircuitOpenException, instead of waiting on them. Its
+            state changes are emitted to the hooks as 'circuit_state' events.
+            None always sends requests.
+        priority: str or None
+            The priority of the client's requests for a PriorityScheduler
+            rate limiter: interactive, normal or bulk. None is normal.
+
+        Aggregated counters are kept in the stats attribute.
+
+        A single client can be shared across threads: the access token is
+        refreshed once per expiration and rate limit sleeps are shared, so
+        requests from every thread wait for the same sleep to finish.
         """
         self.app_id = app_id
         self.app_secret = app_secret
@@ -53,6 +148,39 @@ class HelpScout:
         self.sleep_on_rate_limit_exceeded = sleep_on_rate_limit_exceeded
         self.rate_limit_sleep = rate_limit_sleep
         self.access_token = None
+        self.access_token_expiration = None
+        self.mirror = mirror
+        self.pool_size = pool_size
+        self.coalesce_requests = coalesce_requests
+        self.prefetch_pages = prefetch_pages
+        self.compression = compression
+        self.request_compression_threshold = request_compression_threshold
+        self.hooks = list(hooks or [])
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._accept_encoding = accept_encoding() if compression else None
+        self._single_flight = SingleFlight() if coalesce_requests else None
+        if transport is None and pool_size is not None:
+            transport = RequestsTransport(pool_size)
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.priority = priority
+        self.identity_map = identity_map
+        self.timeout = timeout
+        self.hedging = hedging
+        self._hedge_executor = (
+            None if hedging is None else ThreadPoolExecutor(
+                hedging.max_workers or
+                (HedgeWorkers if pool_size is None else 2 * pool_size)))
+        self.circuit_breaker = circuit_breaker
+        self.profiler = None
+        if circuit_breaker is not None:
+            circuit_breaker.hooks.append(self._emit)
+        self._auth_lock = threading.Lock()
+        self._rate_limit_lock = threading.Lock()
+        self._rate_limit_generation = 0
+        self._rate_limit_clear = threading.Event()
+        self._rate_limit_clear.set()
 
     def __getattr__(self, endpoint):
         """Returns a request to hit the API in a nicer way. E.g.:
@@ -74,10 +202,36 @@ class HelpScout:
             attributes forwards the requests to the appropriate get_objects /
             hit client calls.
         """
+        if endpoint.startswith('_'):  # Protocol lookups, like __getstate__
+            raise AttributeError(endpoint)
         return HelpScoutEndpointRequester(self, endpoint, False)
 
+    def __getstate__(self):
+        """Returns the client's credentials, token and settings to pickle it,
+        so it can be sent to other processes.
+
+        Process bound helpers are not carried: connections, mirror, hooks,
+        rate limiter, hedging, circuit breaker and identity map. Pooled
+        connections are opened again if pool_size is set.
+        """
+        state = dict((setting, getattr(self, setting))
+                     for setting in PickledSettings)
+        state['access_token'] = self.access_token
+        state['access_token_expiration'] = self.access_token_expiration
+        return state
+
+    def __setstate__(self, state):
+        """Restores a pickled client."""
+        state = dict(state)
+        access_token = state.pop('access_token')
+        access_token_expiration = state.pop('access_token_expiration')
+        self.__init__(**state)
+        self.access_token = access_token
+        self.access_token_expiration = access_token_expiration
+
     def get_objects(self, endpoint, resource_id=None, params=None,
-                    specific_resource=False):
+                    specific_resource=False, fields=None, exclude=None,
+                    embed=None, deadline=None):
         """Returns the objects from the endpoint filtering by the parameters.
 
         Parameters
@@ -95,20 +249,148 @@ class HelpScout:
             Specifies if the endpoint is for an specific resource_id even if
             the id is contained in the endpoint uri and resource_id None is
             provided.
+        fields: iterable(str) or None
+            The only attributes to keep on the returned objects.
+            None keeps every attribute.
+        exclude: iterable(str) or None
+            Attributes to drop from the returned objects, like _links.
+        embed: iterable(str) or None
+            Related objects to load along with the returned ones.
+            Relations the API can embed, like threads for conversations, are
+            requested inline and kept under the _embedded attribute.
+            customers and users replace the references in attributes like
+            primaryCustomer or assignee with the full objects, requesting
+            each distinct id once and concurrently.
+        deadline: float or None
+            Seconds the whole call may take, including pagination, retries
+            and rate limit sleeps. A HelpScoutTimeoutException is raised when
+            exceeded. None sets no limit.
 
         Returns
         -------
         [HelpScoutObject]
             A list of objects returned by the api.
         """
+        args = (endpoint, resource_id, params, specific_resource, fields,
+                exclude, embed, deadline)
+        if self._single_flight is None:
+            return self._get_objects(*args)
+        if isinstance(params, dict):
+            params = dict(sorted(params.items()))
+        key = (self._url(endpoint, resource_id, params), specific_resource,
+               _frozen(fields), _frozen(exclude), _frozen(embed), deadline)
+        try:
+            hash(key)
+        except TypeError:  # Like a deadline given as an unhashable object
+            return self._get_objects(*args)
+        results = self._single_flight.do(key, self._get_objects, *args)
+        return list(results) if isinstance(results, list) else results
+
+    def _get_objects(self, endpoint, resource_id, params, specific_resource,
+                     fields, exclude, embed=None, deadline=None):
+        """Retrieves the objects for get_objects. Same parameters."""
+        deadline = Deadline.of(deadline)
         cls = HelpScoutObject.cls(endpoint, endpoint)
-        results = cls.from_results(
-            self.hit_(endpoint, 'get', resource_id, params=params))
-        if resource_id is not None or specific_resource:
+        single = resource_id is not None or specific_resource
+        mirrored = (self.mirror is not None and fields is None and
+                    exclude is None)
+        inline = [relation for relation in embed or ()
+                  if relation in InlineRelations.get(cls.key, ())]
+        related = [relation for relation in embed or ()
+                   if relation not in inline]
+        for relation in related:
+            if relation not in RelationAttributes:
+                raise HelpScoutException('Unknown relation: %s' % relation)
+        if inline:
+            params = _with_param(params, 'embed', ','.join(inline))
+        results = None
+        if mirrored and single and not params:
+            object_id = (endpoint.rstrip('/').rsplit('/', 1)[-1]
+                         if resource_id is None else resource_id)
+            api_object = self.mirror.get(cls.key, object_id)
+            if api_object is not None:
+                results = [cls(api_object) if self.identity_map is None else
+                           self.identity_map.get(cls, api_object)]
+        if results is None:
+            results = self._fetch_objects(
+                cls, endpoint, resource_id, params, fields, exclude, deadline)
+            if mirrored:
+                self.mirror.store(
+                    cls.key, (dict(zip(*result.__getstate__()))
+                              for result in results))
+        for relation in related:
+            self._load_related(results, relation, deadline)
+        if single:
             return results[0]
         return results
 
-    def hit(self, endpoint, method, resource_id=None, data=None, params=None):
+    def _fetch_objects(self, cls, endpoint, resource_id, params, fields,
+                       exclude, deadline):
+        """Requests and builds the objects for get_objects."""
+        api_results = self.hit_(endpoint, 'get', resource_id, params=params,
+                                fields=fields, exclude=exclude,
+                                deadline=deadline)
+        identity_map = (self.identity_map if fields is None and
+                        exclude is None else None)
+        if self.profiler is None:
+            return self._build(cls, api_results, identity_map)
+        with self.profiler.phase(
+                endpoint_name(endpoint, self.base_url), 'build'):
+            return self._build(cls, api_results, identity_map)
+
+    def _build(self, cls, api_results, identity_map=None):
+        """Builds the objects of API results, through the identity map if
+        there is one."""
+        if identity_map is None:
+            return cls.from_results(api_results)
+        return cls.from_results(api_results, identity_map)
+
+    def _load_related(self, objects, relation, deadline=None):
+        """Replaces references to related objects by the objects, requesting
+        each distinct one once and concurrently.
+
+        Parameters
+        ----------
+        objects: [HelpScoutObject]
+            The objects referencing the related ones.
+        relation: str
+            The related objects endpoint, one of RelationAttributes.
+        deadline: Deadline or None
+            The deadline of the call loading the objects, shared by the
+            related objects requests. Exceeding it raises instead of leaving
+            the references.
+        """
+        references = [
+            (api_object, attr, getattr(api_object, attr))
+            for api_object in objects
+            for attr in RelationAttributes[relation]
+            if isinstance(getattr(api_object, attr, None), dict) and
+            getattr(api_object, attr).get('id') is not None]
+        ids = set(reference['id'] for _, _, reference in references)
+        if not ids:
+            return
+
+        def load(object_id):
+            try:
+                return object_id, self.get_objects(
+                    relation, object_id, deadline=deadline)
+            except HelpScoutTimeoutException:
+                raise
+            except HelpScoutException as e:
+                logger.warning('Could not load %s %s: %s' % (
+                    relation, object_id, e))
+                return object_id, None
+
+        workers = min(len(ids), self.pool_size or RelationWorkers)
+        with ThreadPoolExecutor(workers) as executor:
+            loaded = dict(executor.map(load, ids))
+        for api_object, attr, reference in references:
+            related_object = loaded[reference['id']]
+            if related_object is not None:
+                setattr(api_object, attr, related_object)
+
+    def hit(self, endpoint, method, resource_id=None, data=None, params=None,
+            fields=None, exclude=None, deadline=None):
         """Hits the api and returns all the data.
         If several calls are needed due to pagination, control won't be
         returned to the caller until all is retrieved.
@@ -129,6 +411,14 @@ class HelpScout:
         params: dict or str or None
             Dictionary with the parameters to send to the url.
             Or the parameters already un url format.
+        fields: iterable(str) or None
+            The only attributes to keep on each received object.
+            None keeps every attribute.
+        exclude: iterable(str) or None
+            Attributes to drop from each received object.
+        deadline: float or None
+            Seconds the whole call may take, including pagination, retries
+            and rate limit sleeps. None sets no limit.
 
         Returns
         -------
@@ -137,9 +427,11 @@ class HelpScout:
                   dictionaries with HelpScout's _embedded data will be returned
             None if http 201 created or 204 no content are received.
         """
-        return list(self.hit_(endpoint, method, resource_id, data, params))
+        return list(self.hit_(endpoint, method, resource_id, data, params,
+                              fields, exclude, deadline))
 
-    def hit_(self, endpoint, method, resource_id=None, data=None, params=None):
+    def hit_(self, endpoint, method, resource_id=None, data=None, params=None,
+             fields=None, exclude=None, deadline=None):
         """Hits the api and yields the data.
 
         Parameters
@@ -158,6 +450,16 @@ class HelpScout:
         params: dict or str or None
             Dictionary with the parameters to send to the url.
             Or the parameters already un url format.
+        fields: iterable(str) or None
+            The only attributes to keep on each received object, pruned right
+            after decoding. None keeps every attribute.
+        exclude: iterable(str) or None
+            Attributes to drop from each received object.
+        deadline: float or None
+            Seconds the whole call may take, including pagination, retries
+            and rate limit sleeps. When exceeded a HelpScoutTimeoutException
+            is raised with the amount of pages received and the next page's
+            url. None sets no limit.
 
         Yields
         ------
@@ -165,39 +467,154 @@ class HelpScout:
             Dictionary with HelpScout's _embedded data.
             None if http 201 created or 204 no content are received.
         """
-        if self.access_token is None:
-            self._authenticate()
-        url = urljoin(self.base_url, endpoint)
-        if resource_id is not None:
-            url = urljoin(url + '/', str(resource_id))
-        if params:
-            if isinstance(params, dict):
-                params = '&'.join('%s=%s' % (k, v) for k, v in params.items())
-            url = '%s?%s' % (url, params)
+        deadline = Deadline.of(deadline)
+        token = self.access_token
+        if token is None or self._token_expired():
+            self._authenticate(token, deadline)
+            token = self.access_token
+        url = self._url(endpoint, resource_id, params)
         headers = self._authentication_headers()
         logger.debug('Request: %s %s' % (method, url))
-        r = getattr(requests, method)(url, headers=headers, json=data)
+        r = self._send(method, url, headers=headers, json=data,
+                       deadline=deadline)
         ok, status_code = r.ok, r.status_code
         logger.debug(
             'Received: %s %s (%s - %s)' % (method, url, ok, status_code))
         if status_code in (201, 204):
             yield
         elif ok:
-            response = r.json()
-            for item in self._results_with_pagination(response, method):
+            response = self._decode(r, url)
+            items = self._results_with_pagination(response, method, deadline)
+            if fields is not None or exclude is not None:
+                cls = HelpScoutObject.cls(endpoint, endpoint)
+                items = (cls.project(item, fields, exclude) for item in items)
+            for item in items:
                 yield item
         elif status_code == 401:
-            self._authenticate()
-            for item in self.hit_(endpoint, method, resource_id, data):
+            self._authenticate(token, deadline)
+            for item in self.hit_(endpoint, method, resource_id, data,
+                                  params, fields, exclude, deadline):
                 yield item
         elif status_code == 429:
-            self._handle_rate_limit_exceeded()
-            for item in self.hit_(endpoint, method, resource_id, data):
+            self._handle_rate_limit_exceeded(deadline)
+            for item in self.hit_(endpoint, method, resource_id, data,
+                                  params, fields, exclude, deadline):
                 yield item
         else:
             raise HelpScoutException(r.text)
 
-    def _results_with_pagination(self, response, method):
+    def hit_raw(self, endpoint, method, resource_id=None, data=None,
+                params=None, stream=True, deadline=None):
+        """Hits the api and returns the response without reading its body,
+        so large bodies can be streamed with iter_content.
+
+        Parameters
+        ----------
+        endpoint: str
+            The API endpoint.
+        method: str
+            The http method to hit the endpoint with.
+            One of {'get', 'post', 'put', 'patch', 'delete', 'head', 'options'}
+        resource_id: int or str or None
+            The id of the resource in the endpoint to query.
+        data: dict or callable or None
+            A dictionary with the data to send to the API as json.
+            Or a callable returning the json body as bytes or as an iterable
+            of bytes, called again if the request has to be retried.
+        params: dict or str or None
+            Dictionary with the parameters to send to the url.
+            Or the parameters already un url format.
+        stream: bool
+            False to read the body right away, for responses used as a whole
+            like a single page of a listing.
+        deadline: float or None
+            Seconds the call may take, including retries and rate limit
+            sleeps. None sets no limit.
+
+        Returns
+        -------
+        requests.Response
+            The successful response. It should be closed once consumed.
+        """
+        deadline = Deadline.of(deadline)
+        while True:
+            token = self.access_token
+            if token is None or self._token_expired():
+                self._authenticate(token, deadline)
+                token = self.access_token
+            url = self._url(endpoint, resource_id, params)
+            kwargs = {'headers': self._authentication_headers()}
+            if stream:
+                kwargs['stream'] = True
+            if callable(data):
+                kwargs['data'] = data()
+            else:
+                kwargs['json'] = data
+            logger.debug('Request: %s %s' % (method, url))
+            r = self._send(method, url, deadline=deadline, **kwargs)
+            logger.debug('Received: %s %s (%s - %s)' % (
+                method, url, r.ok, r.status_code))
+            if r.ok:
+                return r
+            elif r.status_code == 401:
+                r.close()
+                self._authenticate(token, deadline)
+            elif r.status_code == 429:
+                r.close()
+                self._handle_rate_limit_exceeded(deadline)
+            else:
+                raise HelpScoutException(r.text)
+
+    def paginate(self, response, method='get', deadline=None):
+        """Yields the results of a decoded response and of the pages after
+        it, like hit_ does. Useful to inspect a first page received through
+        hit_raw, like its page metadata, before following the rest.
+
+        Parameters
+        ----------
+        response: dict
+            The decoded json body of a response from the API.
+        method: str
+            The http method to request the following pages with.
+        deadline: float or Deadline or None
+            Seconds the whole pagination may take. None sets no limit.
+
+        Yields
+        ------
+        dict
+            Each page's embedded results, or the response itself if it is
+            not paginated.
+        """
+        return self._results_with_pagination(
+            response, method, Deadline.of(deadline))
+
+    def _url(self, endpoint, resource_id=None, params=None):
+        """Returns the full url for an endpoint.
+
+        Parameters
+        ----------
+        endpoint: str
+            The API endpoint.
+        resource_id: int or str or None
+            The id of the resource in the endpoint to query.
+        params: dict or str or None
+            Dictionary with the parameters to send to the url.
+            Or the parameters already un url format.
+
+        Returns
+        -------
+        str
+        """
+        url = urljoin(self.base_url, endpoint)
+        if resource_id is not None:
+            url = urljoin(url + '/', str(resource_id))
+        if params:
+            if isinstance(params, dict):
+                params = '&'.join('%s=%s' % (k, v) for k, v in params.items())
+            url = '%s?%s' % (url, params)
+        return url
+
+    def _results_with_pagination(self, response, method, deadline=None):
         """Requests and yields pagination results.
 
         Parameters
@@ -207,6 +624,8 @@ class HelpScout:
         method: str
             The http method to hit the endpoint with.
             One of {'get', 'post', 'put', 'patch', 'delete', 'head', 'options'}
+        deadline: Deadline or None
+            The deadline the whole pagination chain has to finish by.
 
         Yields
         dict
@@ -215,49 +634,368 @@ class HelpScout:
         if EmbeddedKey not in response or PageKey not in response:
             yield response
             return
-        if isinstance(response[EmbeddedKey], list):
-            for item in response[EmbeddedKey]:
+        pages = self._pages(response, method, deadline)
+        if self.prefetch_pages:
+            pages = prefetch(pages, self.prefetch_pages)
+        for page in pages:
+            for item in page:
                 yield item
-        else:
-            yield response[EmbeddedKey]
-        next_obj = response.get('_links', {}).get('next', {})
-        next_page = None if next_obj is None else next_obj.get('href')
+
+    def _pages(self, response, method, deadline=None):
+        """Requests and yields the objects of each page.
+
+        Parameters
+        ----------
+        response: dict
+            A dictionary with a previous api response return value containing
+            the first page.
+        method: str
+            The http method to hit the endpoint with.
+        deadline: Deadline or None
+            The deadline the whole pagination chain has to finish by, updated
+            with the pages received and the next one.
+
+        Yields
+        ------
+        [dict]
+            The embedded objects of a page.
+        """
+        next_page = next_page_url(response)
+        if deadline is not None:
+            deadline.pages, deadline.next_page = 1, next_page
+        yield embedded_objects(response)
         while next_page:
+            token = self.access_token
             headers = self._authentication_headers()
             logger.debug('%s %s' % (method, next_page))
-            r = getattr(requests, method)(next_page, headers=headers)
+            r = self._send(method, next_page, headers=headers,
+                           deadline=deadline)
             if r.ok:
-                response = r.json()
-                if isinstance(response[EmbeddedKey], list):
-                    for item in response[EmbeddedKey]:
-                        yield item
-                else:
-                    yield response[EmbeddedKey]
-                next_obj = response.get('_links', {}).get('next', {})
-                next_page = None if next_obj is None else next_obj.get('href')
+                response = self._decode(r, next_page)
+                next_page = next_page_url(response)
+                if deadline is not None:
+                    deadline.pages += 1
+                    deadline.next_page = next_page
+                yield embedded_objects(response)
             elif r.status_code == 401:
-                self._authenticate()
+                self._authenticate(token, deadline)
             elif r.status_code == 429:
-                self._handle_rate_limit_exceeded()
+                self._handle_rate_limit_exceeded(deadline)
             else:
                 raise HelpScoutException(r.text)
 
-    def _authenticate(self):
+    def _send(self, method, url, deadline=None, **kwargs):
+        """Sends a request to the API once no rate limit sleep is going on.
+
+        Parameters
+        ----------
+        method: str
+            The http method to hit the url with.
+        url: str
+            The full url to request.
+        deadline: Deadline or None
+            The deadline of the call the request belongs to, bounding the
+            request's timeout and the wait for rate limit sleeps.
+        **kwargs: keyword arguments
+            Keyword arguments forwarded to requests.
+
+        Returns
+        -------
+        requests.Response
+        """
+        if deadline is not None:
+            deadline.check('%s %s' % (method, url))
+        stream = kwargs.get('stream', False)
+        sent_bytes = self._prepare_body(kwargs)
+        if self._accept_encoding is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+            kwargs['headers']['Accept-Encoding'] = self._accept_encoding
+        if deadline is None:
+            self._rate_limit_clear.wait()
+        elif not self._rate_limit_clear.wait(max(deadline.remaining(), 0)):
+            raise deadline.exception(
+                'Deadline exceeded waiting for the rate limit sleep')
+        if self.rate_limiter is not None:
+            timeout = (None if deadline is None else
+                       max(deadline.remaining(), 0))
+            if self.rate_limiter.acquire(self.priority, timeout) is None:
+                raise deadline.exception(
+                    'Deadline exceeded waiting for the rate limiter')
+        circuit = None
+        if self.circuit_breaker is not None:
+            circuit = endpoint_name(url, self.base_url)
+            self.circuit_breaker.before(circuit)
+        timeout = self._request_timeout(deadline)
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        start = time.time()
+        try:
+            r = self._dispatch(method, url, kwargs, stream)
+        except Timeout as e:
+            self._record_outcome(circuit, False)
+            message = 'Request timed out: %s %s (%s)' % (method, url, e)
+            if deadline is None:
+                raise HelpScoutTimeoutException(message)
+            raise deadline.exception(message)
+        except Exception:
+            self._record_outcome(circuit, False)
+            raise
+        if circuit is not None:
+            self._record_outcome(circuit, r.status_code < 500)
+        received_bytes, decoded_bytes = (
+            (0, 0) if stream else transfer_sizes(r))
+        self._count(requests=1, sent_bytes=sent_bytes,
+                    received_bytes=received_bytes, decoded_bytes=decoded_bytes)
+        if self.hooks:
+            self._emit('response', {
+                'method': method, 'url': url, 'status_code': r.status_code,
+                'sent_bytes': sent_bytes, 'received_bytes': received_bytes,
+                'decoded_bytes': decoded_bytes,
+                'elapsed': time.time() - start})
+        return r
+
+    def _record_outcome(self, circuit, success):
+        """Records a request's outcome in the circuit breaker, if any.
+
+        Parameters
+        ----------
+        circuit: str or None
+            The endpoint whose circuit the request went through.
+        success: bool
+            False for server errors, timeouts and connection errors.
+        """
+        if circuit is not None:
+            self.circuit_breaker.record(circuit, success)
+
+    def _dispatch(self, method, url, kwargs, stream):
+        """Sends a request, hedged if configured and profiled if profiling.
+
+        Parameters
+        ----------
+        method: str
+            The http method to hit the url with.
+        url: str
+            The full url to request.
+        kwargs: dict
+            Keyword arguments forwarded to requests.
+        stream: bool
+            True if the response's body is read later on.
+
+        Returns
+        -------
+        requests.Response
+        """
+        hedged = self.hedging is not None and method == 'get' and not stream
+        request = self._request_hedged if hedged else self._request
+        if self.profiler is None:
+            return request(method, url, kwargs)
+        with self.profiler.phase(
+                endpoint_name(url, self.base_url), 'request') as phase:
+            r = request(method, url, kwargs)
+            total, wait = phase.elapsed(), response_wait(r)
+            if wait is not None:
+                phase.split('wait', min(wait, total))
+                phase.split('transfer', max(0, total - wait))
+        return r
+
+    def _decode(self, r, url):
+        """Returns a response's decoded json body, profiled if profiling."""
+        if self.profiler is None:
+            return r.json()
+        with self.profiler.phase(endpoint_name(url, self.base_url), 'decode'):
+            return r.json()
+
+    def _request(self, method, url, kwargs):
+        """Sends an http request through the transport, or requests."""
+        if self.transport is None:
+            return getattr(requests, method)(url, **kwargs)
+        return self.transport.request(method, url, **kwargs)
+
+    def _request_hedged(self, method, url, kwargs):
+        """Sends a request, sending it again if its response is late
+        according to the hedging policy, and returns the first response.
+
+        Parameters
+        ----------
+        method: str
+            The http method to hit the url with.
+        url: str
+            The full url to request.
+        kwargs: dict
+            Keyword arguments forwarded to requests.
+
+        Returns
+        -------
+        requests.Response
+        """
+        started = threading.Event()
+
+        def timed_request():
+            started.set()
+            start = time.time()
+            r = self._request(method, url, kwargs)
+            return r, time.time() - start
+
+        futures = [self._hedge_executor.submit(timed_request)]
+        # The delay counts from the request being sent, not queued for a
+        # thread, so busy executors do not trigger hedges
+        started.wait()
+        done, _ = wait(futures, self.hedging.delay())
+        # Hedges are only sent if the rate limiter lets them through at once
+        if (not done and self.hedging.acquire() and
+                (self.rate_limiter is None or
+                 self.rate_limiter.acquire(self.priority, 0) is not None)):
+            self._count(hedges=1)
+            logger.debug('Hedging: %s %s' % (method, url))
+            futures.append(self._hedge_executor.submit(timed_request))
+        pending, error = futures, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    r, elapsed = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                self.hedging.record(elapsed)
+                if future is not futures[0]:
+                    self._count(hedge_wins=1)
+                for other in futures:
+                    if other is not future:
+                        other.add_done_callback(_close_response)
+                return r
+        raise error
+
+    def _request_timeout(self, deadline):
+        """Returns a request's timeout, bounded by the call's deadline.
+
+        Parameters
+        ----------
+        deadline: Deadline or None
+
+        Returns
+        -------
+        float or (float, float) or None
+        """
+        timeout = self.timeout
+        if deadline is None:
+            return timeout
+        remaining = max(deadline.remaining(), 0.001)
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(min(value, remaining) for value in timeout)
+        return min(timeout, remaining)
+
+    def _prepare_body(self, kwargs):
+        """Gzips json bodies over the compression threshold.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Keyword arguments to forward to requests, modified in place.
+
+        Returns
+        -------
+        int
+            The amount of body bytes to send, if known.
+        """
+        threshold = self.request_compression_threshold
+        data = kwargs.get('json')
+        if threshold is None or data is None:
+            return 0
+        body = json.dumps(data).encode('utf-8')
+        if len(body) < threshold:
+            return len(body)
+        kwargs.pop('json')
+        kwargs['data'] = body = gzip.compress(body)
+        kwargs['headers'] = dict(kwargs.get('headers') or {})
+        kwargs['headers']['Content-Encoding'] = 'gzip'
+        kwargs['headers']['content-type'] = 'application/json'
+        return len(body)
+
+    def _count(self, **counters):
+        """Adds amounts to the stats counters."""
+        with self._stats_lock:
+            self.stats.update(counters)
+
+    def _emit(self, event, info):
+        """Calls the metrics hooks with an event.
+
+        Parameters
+        ----------
+        event: str
+            The event name.
+        info: dict
+            The event information.
+        """
+        for hook in self.hooks:
+            try:
+                hook(event, info)
+            except Exception:
+                logger.exception('Metrics hook failed: %s' % event)
+
+    def profile(self, trace_memory=True):
+        """Returns a profiler attributing the client's time to each endpoint
+        and phase (request, decode, build) while used as a context manager:
+        > with client.profile() as profiler:
+        >     client.conversations.get()
+        > print(profiler.summary())
+
+        Parameters
+        ----------
+        trace_memory: bool
+            True to trace memory allocations with tracemalloc.
+
+        Returns
+        -------
+        helpscout.profiling.HelpScoutProfiler
+        """
+        return HelpScoutProfiler(self, trace_memory)
+
+    def _authenticate(self, expired_token=None, deadline=None):
         """Authenticates with the API and gets a token for subsequent requests.
+
+        Parameters
+        ----------
+        expired_token: str or None
+            The token the caller found to be expired, if any. When another
+            thread already replaced it, no new token is requested.
+        deadline: Deadline or None
+            The deadline of the call requiring the token.
         """
-        url = urljoin(self.base_url, 'oauth2/token')
-        data = {
-            'grant_type': 'client_credentials',
-            'client_id': self.app_id,
-            'client_secret': self.app_secret,
-            }
-        logger.debug('post %s' % url)
-        r = requests.post(url, data=data)
-        if r.ok:
-            response = r.json()
-            self.access_token = response['access_token']
-        else:
-            raise HelpScoutAuthenticationException(r.text)
+        timeout = -1 if deadline is None else max(deadline.remaining(), 0)
+        if not self._auth_lock.acquire(timeout=timeout):
+            raise deadline.exception(
+                'Deadline exceeded waiting for another thread to authenticate')
+        try:
+            if (self.access_token != expired_token and
+                    not self._token_expired()):
+                return
+            url = urljoin(self.base_url, 'oauth2/token')
+            data = {
+                'grant_type': 'client_credentials',
+                'client_id': self.app_id,
+                'client_secret': self.app_secret,
+                }
+            logger.debug('post %s' % url)
+            r = self._send('post', url, data=data, deadline=deadline)
+            if r.ok:
+                response = r.json()
+                expires_in = response.get('expires_in')
+                self.access_token_expiration = (
+                    None if expires_in is None else
+                    time.time() + expires_in - TokenExpirationMargin)
+                self.access_token = response['access_token']
+            else:
+                raise HelpScoutAuthenticationException(r.text)
+        finally:
+            self._auth_lock.release()
+
+    def _token_expired(self):
+        """Returns True if the current token is known to be expired."""
+        expiration = self.access_token_expiration
+        return expiration is not None and time.time() >= expiration
 
     def _authentication_headers(self):
         """Returns authentication headers."""
@@ -267,13 +1005,32 @@ class HelpScout:
             'charset': 'UTF-8'
             }
 
-    def _handle_rate_limit_exceeded(self):
-        """Handles a rate limit exceeded."""
+    def _handle_rate_limit_exceeded(self, deadline=None):
+        """Handles a rate limit exceeded.
+
+        Parameters
+        ----------
+        deadline: Deadline or None
+            The deadline of the call that was rate limited. If the sleep
+            would exceed it, a HelpScoutTimeoutException is raised instead.
+        """
         logger.warning('Rate limit exceeded.')
-        if self.sleep_on_rate_limit_exceeded:
-            time.sleep(self.rate_limit_sleep)
-        else:
+        if not self.sleep_on_rate_limit_exceeded:
             raise HelpScoutRateLimitExceededException()
+        if (deadline is not None and
+                deadline.remaining() < self.rate_limit_sleep):
+            raise deadline.exception(
+                'Deadline exceeded by the rate limit sleep')
+        generation = self._rate_limit_generation
+        with self._rate_limit_lock:
+            if generation != self._rate_limit_generation:
+                return  # Another thread already slept for this rate limit
+            self._rate_limit_clear.clear()
+            try:
+                time.sleep(self.rate_limit_sleep)
+            finally:
+                self._rate_limit_generation += 1
+                self._rate_limit_clear.set()
 
     def __eq__(self, other):
         """Equality comparison."""
@@ -305,6 +1062,137 @@ class HelpScout:
     __str__ = __repr__
 
 
+def endpoint_name(url, base_url):
+    """Returns the name of the endpoint a url belongs to.
+    E.g.: conversations for https://api.helpscout.net/v2/conversations/1/tags
+
+    Parameters
+    ----------
+    url: str
+        The full url.
+    base_url: str
+        The API's base url.
+
+    Returns
+    -------
+    str
+    """
+    if url.startswith(base_url):
+        url = url[len(base_url):]
+    return url.split('?', 1)[0].strip('/').split('/', 1)[0]
+
+
+def _close_response(future):
+    """Closes the response of a request that lost a hedge."""
+    if future.exception() is None:
+        future.result()[0].close()
+
+
+def _frozen(values):
+    """Returns an iterable of attribute names as a hashable tuple."""
+    return None if values is None else tuple(sorted(values))
+
+
+def _with_param(params, name, value):
+    """Returns url parameters, as a dict or a str, with another one added.
+
+    Parameters
+    ----------
+    params: dict or str or None
+        Dictionary with the parameters to send to the url.
+        Or the parameters already un url format.
+    name: str
+        The added parameter name.
+    value: str
+        The added parameter value.
+
+    Returns
+    -------
+    dict or str
+    """
+    if isinstance(params, str):
+        return '%s&%s=%s' % (params, name, value) if params else \
+            '%s=%s' % (name, value)
+    params = dict(params or {})
+    params[name] = value
+    return params
+
+
+def accept_encoding():
+    """Returns the Accept-Encoding header value for the available decoders."""
+    encodings = ['gzip', 'deflate']
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        encodings.append('br')
+        break
+    return ', '.join(encodings)
+
+
+def transfer_sizes(response):
+    """Returns the amount of bytes received for a response.
+
+    Parameters
+    ----------
+    response: requests.Response
+        A response whose content was not streamed.
+
+    Returns
+    -------
+    (int, int)
+        The bytes transferred, compressed if the response was, and the
+        decoded bytes.
+    """
+    content = response.content
+    decoded = len(content) if isinstance(content, bytes) else 0
+    received = getattr(response, 'num_bytes_downloaded', None)
+    if not isinstance(received, int):
+        try:
+            received = response.raw.tell()
+        except Exception:
+            pass
+    if not isinstance(received, int) or received <= 0:
+        try:
+            received = int(response.headers.get('Content-Length'))
+        except (AttributeError, TypeError, ValueError):
+            received = decoded
+    return received, decoded
+
+
+def embedded_objects(response):
+    """Returns the list of objects embedded in a paginated response.
+
+    Parameters
+    ----------
+    response: dict
+        A paginated response from the API.
+
+    Returns
+    -------
+    [dict]
+    """
+    embedded = response[EmbeddedKey]
+    return embedded if isinstance(embedded, list) else [embedded]
+
+
+def next_page_url(response):
+    """Returns the url of the next page of a paginated response, if any.
+
+    Parameters
+    ----------
+    response: dict
+        A paginated response from the API.
+
+    Returns
+    -------
+    str or None
+    """
+    next_obj = response.get('_links', {}).get('next', {})
+    return None if next_obj is None else next_obj.get('href')
+
+
 class HelpScoutEndpointRequester:
 
     def __init__(self, client, endpoint, specific_resource):
@@ -330,6 +1218,9 @@ class HelpScoutEndpointRequester:
         requested, as this are considered attributes of the main object, like
         tags of a conversation.
 
+        Names starting with an underscore raise an AttributeError, as they
+        are protocol lookups, like pickle's __getstate__.
+
         Parameters
         ----------
         method: str
@@ -343,6 +1234,8 @@ class HelpScoutEndpointRequester:
           expected to be used mainly for subattributes of an endpoint or
           subendpoints of specific resources, like tags from a conversation.
         """
+        if method.startswith('_'):
+            raise AttributeError(method)
         if method == 'get':
             return partial(
                 self.client.get_objects,
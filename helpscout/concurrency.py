@@ -0,0 +1,328 @@
+import pickle
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from queue import Empty, Full, Queue
+
+from helpscout.exceptions import HelpScoutTimeoutException
+from helpscout.ratelimit import RateLimiter
+
+
+PollInterval = 0.1
+_process_client = None  # The client of each pool process
+
+
+class SingleFlight:
+
+    def __init__(self):
+        """Shares a single execution among concurrent identical calls.
+
+        While a call for a key is in flight, other callers asking for the same
+        key wait for it and receive its result (or exception) instead of
+        executing the function again.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """Calls the function unless a call for the same key is in flight.
+
+        Parameters
+        ----------
+        key: hashable
+            Identifies equivalent calls.
+        function: callable
+            The function to call.
+        *args: positional arguments
+            Positional arguments to call the function with.
+        **kwargs: keyword arguments
+            Keyword arguments to call the function with.
+
+        Returns
+        -------
+        The function's return value, shared among the coalesced callers.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Returns the amount of calls currently in flight."""
+        with self._lock:
+            return len(self._calls)
+
+
+class _Call:
+
+    def __init__(self):
+        """A call in flight."""
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+def prefetch(iterable, size):
+    """Iterates an iterable in a background thread, keeping at most size
+    items ready ahead of the consumer.
+
+    The background thread blocks while the buffer is full, so a slow consumer
+    overlaps with the production of the next items without unbounded memory
+    growth. Exceptions raised while producing are raised to the consumer.
+
+    Parameters
+    ----------
+    iterable: iterable
+        The iterable to consume in the background.
+    size: int
+        The maximum amount of items waiting to be consumed.
+
+    Yields
+    ------
+    The iterable's items, in order.
+    """
+    buffer, stop = Queue(size), threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=PollInterval)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((False, None))
+        except Exception as e:
+            put((False, e))
+
+    thread = threading.Thread(target=produce, name='helpscout-prefetch')
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            try:
+                is_item, value = buffer.get(timeout=PollInterval)
+            except Empty:
+                if not thread.is_alive() and buffer.empty():
+                    return
+                continue
+            if is_item:
+                yield value
+            elif value is None:
+                return
+            else:
+                raise value
+    finally:
+        stop.set()
+
+
+class Deadline:
+
+    def __init__(self, seconds):
+        """Time limit for a whole call, including pagination, retries and
+        sleeps, keeping track of the call's progress.
+
+        Parameters
+        ----------
+        seconds: float
+            Seconds the call may take.
+        """
+        self.seconds = seconds
+        self.start = time.time()
+        self.expiration = self.start + seconds
+        self.pages = 0
+        self.next_page = None
+
+    @classmethod
+    def of(cls, deadline):
+        """Returns a Deadline for a call's deadline parameter.
+
+        Parameters
+        ----------
+        deadline: float or Deadline or None
+            Seconds the call may take, or a deadline already started.
+
+        Returns
+        -------
+        Deadline or None
+        """
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        """Returns the seconds left, negative once expired."""
+        return self.expiration - time.time()
+
+    def check(self, doing):
+        """Raises a HelpScoutTimeoutException if the deadline expired.
+
+        Parameters
+        ----------
+        doing: str
+            What was about to be done, for the exception message.
+        """
+        if self.remaining() <= 0:
+            raise self.exception('Deadline exceeded before %s' % doing)
+
+    def exception(self, message):
+        """Returns a HelpScoutTimeoutException with the call's progress."""
+        return HelpScoutTimeoutException(
+            message, self.pages, self.next_page, time.time() - self.start)
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(seconds=%s, remaining=%.3f)' % (
+            self.__class__.__name__, self.seconds, self.remaining())
+
+    __str__ = __repr__
+
+
+class HelpScoutProcessPool:
+
+    def __init__(self, client, max_workers=None):
+        """Pool of processes calling the API with copies of a client, so
+        decoding and building objects scale with the available cores.
+
+        The client is authenticated once and pickled to every process with
+        its token, so processes start with a warm token. A client's
+        RateLimiter is shared by the processes, keeping all of them within
+        its budget.
+
+        Parameters
+        ----------
+        client: HelpScout
+            The client whose credentials, token and settings the processes
+            use. See HelpScout.__getstate__ for the settings carried.
+        max_workers: int or None
+            Amount of processes. None uses one per cpu.
+        """
+        if client.access_token is None or client._token_expired():
+            client._authenticate(client.access_token)
+        self.client = client
+        self.max_workers = max_workers
+        rate_limiter = client.rate_limiter
+        if not isinstance(rate_limiter, RateLimiter):  # Not process shared
+            rate_limiter = None
+        self.executor = ProcessPoolExecutor(
+            max_workers, initializer=_init_process_client,
+            initargs=(pickle.dumps(client), rate_limiter))
+
+    def map(self, function, *iterables, **kwargs):
+        """Calls function(client, *items) in the processes for the items of
+        the iterables, with each process's client.
+
+        Parameters
+        ----------
+        function: callable
+            A picklable function, like a module level one.
+        *iterables: iterables
+            The arguments of each call after the client.
+        **kwargs: keyword arguments
+            chunksize and timeout, as in Executor.map.
+
+        Returns
+        -------
+        iterator
+            The calls results, in order.
+        """
+        return self.executor.map(
+            _call_with_client, repeat(function), *iterables, **kwargs)
+
+    def get_objects(self, endpoint, resource_ids, **kwargs):
+        """Requests several resources of an endpoint across the processes.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint. E.g.: conversations/{}/threads formats every id
+            into the endpoint, while conversations requests each id as a
+            resource of it.
+        resource_ids: iterable(int or str)
+            The ids to request.
+        **kwargs: keyword arguments
+            Other get_objects keyword arguments, like params or fields.
+
+        Returns
+        -------
+        list
+            The get_objects result for each id, in order.
+        """
+        return list(self.map(_get_objects, repeat(endpoint), resource_ids,
+                             repeat(kwargs)))
+
+    def shutdown(self, wait=True):
+        """Stops the processes."""
+        self.executor.shutdown(wait)
+
+    def __enter__(self):
+        """Returns the pool."""
+        return self
+
+    def __exit__(self, *args):
+        """Stops the processes."""
+        self.shutdown()
+        return False
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(max_workers=%s)' % (
+            self.__class__.__name__, self.max_workers)
+
+    __str__ = __repr__
+
+
+def _init_process_client(state, rate_limiter=None):
+    """Keeps the client of a pool process.
+
+    Clients are received pickled, so forked processes get the same copy as
+    spawned ones instead of the parent's locks and connections.
+
+    Parameters
+    ----------
+    state: bytes
+        The pickled client.
+    rate_limiter: RateLimiter or None
+        A rate limiter shared by the processes, set on the client.
+    """
+    global _process_client
+    _process_client = pickle.loads(state)
+    if rate_limiter is not None:
+        _process_client.rate_limiter = rate_limiter
+
+
+def _call_with_client(function, *args):
+    """Calls a function with the process's client."""
+    return function(_process_client, *args)
+
+
+def _get_objects(client, endpoint, resource_id, kwargs):
+    """Requests a resource for HelpScoutProcessPool.get_objects."""
+    if '{}' in endpoint:
+        return client.get_objects(endpoint.format(resource_id), **kwargs)
+    return client.get_objects(endpoint, resource_id, **kwargs)
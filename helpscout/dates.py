@@ -0,0 +1,144 @@
+import calendar
+import re
+
+from datetime import datetime, timedelta, timezone
+
+
+UTC = timezone.utc
+TimestampFormat = '%Y-%m-%dT%H:%M:%SZ'
+TimestampRegex = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6})\d*)?'
+    r'(Z|[+-]\d{2}:?\d{2})?$')
+Epoch = datetime(1970, 1, 1, tzinfo=UTC)
+try:  # Python 3.11+ parses the Z suffix natively, much faster
+    NativeParsing = datetime.fromisoformat('2019-06-20T15:00:00Z') is not None
+except ValueError:
+    NativeParsing = False
+
+
+def parse_timestamp(value):
+    """Parses an API timestamp, like 2019-06-20T15:00:00Z, as a UTC datetime.
+
+    Parameters
+    ----------
+    value: str or datetime or None
+
+    Returns
+    -------
+    datetime or None
+        A timezone aware datetime in UTC. None if value is None.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    if len(value) == 20 and value[19] == 'Z':  # Fixed format fast path
+        try:
+            if NativeParsing:
+                return datetime.fromisoformat(value)
+            return datetime(
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                tzinfo=UTC)
+        except ValueError:
+            pass
+    match = TimestampRegex.match(value)
+    if match is None:
+        raise ValueError('Invalid timestamp: %s' % value)
+    parts = match.groups()
+    microseconds = int((parts[6] or '0').ljust(6, '0'))
+    parsed = datetime(*(int(part) for part in parts[:6]),
+                      microsecond=microseconds, tzinfo=UTC)
+    offset = parts[7]
+    if offset and offset != 'Z':
+        offset = offset.replace(':', '')
+        delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+        parsed = parsed - delta if offset[0] == '+' else parsed + delta
+    return parsed
+
+
+def parse_timestamps(values):
+    """Parses a whole column of API timestamps, parsing repeated values
+    only once.
+
+    Parameters
+    ----------
+    values: iterable(str or datetime or None)
+
+    Returns
+    -------
+    [datetime or None]
+        Timezone aware datetimes in UTC, None for None values.
+    """
+    parsed = {}
+    column = []
+    for value in values:
+        timestamp = parsed.get(value)
+        if timestamp is None and value is not None:
+            timestamp = parsed[value] = parse_timestamp(value)
+        column.append(timestamp)
+    return column
+
+
+def format_timestamp(value):
+    """Formats a datetime as an API timestamp, like 2019-06-20T15:00:00Z.
+
+    Parameters
+    ----------
+    value: datetime or str
+        Naive datetimes are considered to be in UTC. Strings are returned as
+        received.
+
+    Returns
+    -------
+    str
+    """
+    if not isinstance(value, datetime):
+        return value
+    return (Epoch + timedelta(seconds=to_seconds(value))).strftime(
+        TimestampFormat)
+
+
+def to_seconds(value):
+    """Returns the seconds since the epoch of a datetime or timestamp.
+
+    Parameters
+    ----------
+    value: datetime or str
+        Naive datetimes are considered to be in UTC.
+
+    Returns
+    -------
+    int
+    """
+    value = parse_timestamp(value)
+    return calendar.timegm(value.utctimetuple())
+
+
+def split_range(start, end, step):
+    """Splits a time range into windows aligned to multiples of step since
+    the epoch, so the same windows are produced for overlapping ranges.
+
+    Parameters
+    ----------
+    start: datetime or str
+        The range start.
+    end: datetime or str
+        The range end.
+    step: timedelta
+        The windows length.
+
+    Returns
+    -------
+    [(datetime, datetime)]
+        Consecutive UTC windows covering the range. The first and last ones
+        are clipped to the range.
+    """
+    start, end = to_seconds(start), to_seconds(end)
+    step = int(step.total_seconds())
+    windows = []
+    window_start = start
+    while window_start < end:
+        window_end = min(end, (window_start // step + 1) * step)
+        windows.append((Epoch + timedelta(seconds=window_start),
+                        Epoch + timedelta(seconds=window_end)))
+        window_start = window_end
+    return windows
@@ -11,3 +11,46 @@ class HelpScoutAuthenticationException(HelpScoutException):
 
 class HelpScoutRateLimitExceededException(HelpScoutException):
     pass
+
+
+class HelpScoutInvalidSignatureException(HelpScoutException):
+    pass
+
+
+class HelpScoutTimeoutException(HelpScoutException):
+    def __init__(self, message, pages=0, next_page=None, elapsed=None):
+        """Raised when a request times out or a call exceeds its deadline.
+
+        Parameters
+        ----------
+        message: str
+            What was going on when time ran out.
+        pages: int
+            Amount of pages received before running out of time.
+        next_page: str or None
+            The url of the next page to request to resume the listing.
+        elapsed: float or None
+            Seconds since the call started.
+        """
+        super(HelpScoutTimeoutException, self).__init__(message)
+        self.pages = pages
+        self.next_page = next_page
+        self.elapsed = elapsed
+
+
+class HelpScoutCircuitOpenException(HelpScoutException):
+    def __init__(self, endpoint, retry_after):
+        """Raised instead of sending requests to an endpoint failing too
+        often, while its circuit is open.
+
+        Parameters
+        ----------
+        endpoint: str
+            The failing endpoint.
+        retry_after: float
+            Seconds until requests to the endpoint are tried again.
+        """
+        super(HelpScoutCircuitOpenException, self).__init__(
+            'Circuit open for %s, retry in %.1fs' % (endpoint, retry_after))
+        self.endpoint = endpoint
+        self.retry_after = retry_after
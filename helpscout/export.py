@@ -0,0 +1,178 @@
+import itertools
+import json
+import logging
+import multiprocessing
+import pickle
+
+from datetime import timedelta
+
+from helpscout import concurrency
+from helpscout.dates import format_timestamp, split_range
+from helpscout.model import HelpScoutObject
+from helpscout.ratelimit import RateLimiter
+
+
+logger = logging.getLogger('HelpScout')
+# Pages waiting for the sink per process, bounding the export's memory
+QueuedPages = 2
+
+_queue = None  # The pages queue of each pool process
+
+
+def export(client, endpoint, shards, sink, processes=None, fields=None,
+           exclude=None):
+    """Exports an endpoint splitting its listing into shards requested by a
+    pool of processes, so decoding scales with the available cores.
+
+    Every process gets a copy of the client, pickled with its credentials,
+    access token and settings as HelpScoutProcessPool does, and the
+    processes share its RateLimiter. A new one within the API's limits is
+    used if it has none, or a PriorityScheduler, which only works within a
+    process. The client itself is left untouched. Objects are written to
+    the sink a page at a time as the processes receive them, through a
+    bounded queue pausing the processes while the sink falls behind.
+
+    Parameters
+    ----------
+    client: HelpScout
+        The client whose credentials and settings the processes use.
+    endpoint: str
+        The endpoint to list. E.g.: conversations.
+    shards: [dict]
+        The parameters of each shard's listing, like the ones made by
+        conversation_shards. They should not overlap.
+    sink: file-like object or callable
+        Where exported objects go: written as json lines to file-like
+        objects, or passed one by one as dictionaries to callables.
+    processes: int or None
+        Amount of processes to use. None uses one per cpu, 0 exports in the
+        current process with the given client.
+    fields: iterable(str) or None
+        The only attributes to export for each object.
+    exclude: iterable(str) or None
+        Attributes to drop from each object.
+
+    Returns
+    -------
+    int
+        The amount of objects exported.
+    """
+    lines = hasattr(sink, 'write')
+    tasks = [(endpoint, params, fields, exclude, lines) for params in shards]
+    if processes == 0:
+        pages = (page for task in tasks
+                 for page in _shard_pages(task, client))
+        return _drain(pages, sink, lines)
+    if client.access_token is None or client._token_expired():
+        client._authenticate(client.access_token)
+    rate_limiter = client.rate_limiter
+    if not isinstance(rate_limiter, RateLimiter):
+        rate_limiter = RateLimiter()
+    queue = multiprocessing.Queue(
+        QueuedPages * (processes or multiprocessing.cpu_count()))
+    initargs = (pickle.dumps(client), rate_limiter, queue)
+    with multiprocessing.Pool(processes, _init_process, initargs) as pool:
+        result = pool.map_async(_export_shard, tasks)
+        count = _drain(_queued_pages(queue, len(tasks)), sink, lines)
+        result.get()  # Raises the shards' errors
+    return count
+
+
+def conversation_shards(mailboxes=None, statuses=('all',), start=None,
+                        end=None, window=timedelta(days=30)):
+    """Returns the parameters partitioning a conversations listing by
+    mailbox, status and creation date window.
+
+    Windows include their start and exclude their end, so conversations
+    created on a window edge belong to a single shard.
+
+    Parameters
+    ----------
+    mailboxes: iterable(int) or None
+        Mailbox ids. None does not partition by mailbox.
+    statuses: iterable(str)
+        Conversation statuses. E.g.: active, closed, pending, spam, all.
+    start: datetime or str or None
+        Creation date range start. None does not partition by date.
+    end: datetime or str or None
+        Creation date range end, excluded.
+    window: timedelta
+        The date windows length.
+
+    Returns
+    -------
+    [dict]
+    """
+    mailboxes = [None] if mailboxes is None else mailboxes
+    windows = [None] if start is None else split_range(start, end, window)
+    shards = []
+    for mailbox, status, dates in itertools.product(
+            mailboxes, statuses, windows):
+        params = {'status': status}
+        if mailbox is not None:
+            params['mailbox'] = mailbox
+        if dates is not None:
+            # Timestamps have second precision: the second before the end
+            # is the last one included
+            params['query'] = '(createdAt:[%s TO %s])' % (
+                format_timestamp(dates[0]),
+                format_timestamp(dates[1] - timedelta(seconds=1)))
+        shards.append(params)
+    return shards
+
+
+def _drain(pages, sink, lines):
+    """Writes the pages objects to the sink and returns their amount."""
+    count = 0
+    for params, objects in pages:
+        if objects is None:  # The shard is done
+            logger.debug('Exported shard %s' % params)
+            continue
+        for api_object in objects:
+            if lines:
+                sink.write(api_object)
+            else:
+                sink(api_object)
+        count += len(objects)
+    return count
+
+
+def _queued_pages(queue, shards):
+    """Yields the pages put in the queue until every shard is done."""
+    while shards:
+        params, objects = queue.get()
+        if objects is None:
+            shards -= 1
+        yield params, objects
+
+
+def _init_process(state, rate_limiter, queue):
+    """Keeps the client and the pages queue of a pool process."""
+    global _queue
+    concurrency._init_process_client(state, rate_limiter)
+    _queue = queue
+
+
+def _export_shard(task):
+    """Lists a shard in a pool process, queueing its pages."""
+    try:
+        for page in _shard_pages(task, concurrency._process_client):
+            _queue.put(page)
+    except Exception:
+        _queue.put((task[1], None))  # Done, the error is raised by the pool
+        raise
+
+
+def _shard_pages(task, client):
+    """Yields a shard's pages as its params and objects, serialized as json
+    lines if required, followed by its params and None once it is done."""
+    endpoint, params, fields, exclude, lines = task
+    key = HelpScoutObject.cls(endpoint, endpoint).key
+    for api_result in client.hit_(endpoint, 'get', params=params,
+                                  fields=fields, exclude=exclude):
+        objects = api_result.get(key, [api_result])
+        if lines:
+            objects = [json.dumps(api_object) + '\n'
+                       for api_object in objects]
+        yield params, objects
+    yield params, None
@@ -0,0 +1,132 @@
+TimestampSuffix = 'At'  # Help Scout timestamps: createdAt, closedAt, ...
+
+
+def to_columns(items, columns=None):
+    """Builds columns straight from the dictionaries yielded by hit_, without
+    creating an object per row.
+
+    Parameters
+    ----------
+    items: iterable(dict)
+        The API results yielded by hit_, each one with a list of objects
+        under the endpoint's key, or the objects themselves. E.g.:
+        client.hit_('conversations', 'get')
+    columns: [str] or {str: str} or None
+        The paths of the values to extract, with dots to go into nested
+        objects and numbers for list positions. E.g.: primaryCustomer.email,
+        tags.0.tag. A dictionary maps column names to paths.
+        None uses the top level attributes of the first object but _links.
+
+    Returns
+    -------
+    {str: list}
+        The values of each column, None for missing ones.
+    """
+    items = _objects(items)
+    if columns is None:
+        columns = [key for key in (items[0] if items else ())
+                   if key != '_links']
+    if not isinstance(columns, dict):
+        columns = dict((column, column) for column in columns)
+    return dict((name, _column(items, path))
+                for name, path in columns.items())
+
+
+def to_dataframe(items, columns=None, timestamps=None):
+    """Returns a pandas DataFrame of API objects. Requires pandas.
+
+    Parameters
+    ----------
+    items: iterable(dict)
+        The API results yielded by hit_ or the objects. See to_columns.
+    columns: [str] or {str: str} or None
+        The paths of the values to extract. See to_columns.
+    timestamps: [str] or None
+        The columns to parse as UTC timestamps.
+        None parses the ones whose names end with At, like createdAt.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError('to_dataframe requires pandas: pip install pandas')
+    data = to_columns(items, columns)
+    for column in _timestamps(data, timestamps):
+        data[column] = pandas.to_datetime(
+            data[column], utc=True, format='ISO8601')
+    return pandas.DataFrame(data, columns=list(data))
+
+
+def to_arrow(items, columns=None, timestamps=None):
+    """Returns a pyarrow Table of API objects. Requires pyarrow.
+
+    Parameters
+    ----------
+    items: iterable(dict)
+        The API results yielded by hit_ or the objects. See to_columns.
+    columns: [str] or {str: str} or None
+        The paths of the values to extract. See to_columns.
+    timestamps: [str] or None
+        The columns to parse as UTC timestamps.
+        None parses the ones whose names end with At, like createdAt.
+
+    Returns
+    -------
+    pyarrow.Table
+    """
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError:
+        raise ImportError('to_arrow requires pyarrow: pip install pyarrow')
+    data = to_columns(items, columns)
+    arrays = dict((column, pyarrow.array(values))
+                  for column, values in data.items())
+    for column in _timestamps(data, timestamps):
+        arrays[column] = pyarrow.compute.cast(
+            pyarrow.array(data[column], pyarrow.string()),
+            pyarrow.timestamp('us', tz='UTC'))
+    return pyarrow.table(arrays)
+
+
+def _objects(items):
+    """Returns the objects listed in API results, or the items themselves
+    when they are not results listing objects under a single key."""
+    objects = []
+    for item in items:
+        if len(item) == 1:
+            listed = next(iter(item.values()))
+            if isinstance(listed, list):
+                objects.extend(listed)
+                continue
+        objects.append(item)
+    return objects
+
+
+def _column(items, path):
+    """Extracts the values of a path from every item."""
+    if '.' not in path:
+        return [item.get(path) for item in items]
+    keys = [int(key) if key.isdigit() else key for key in path.split('.')]
+    values = items
+    for key in keys:
+        if isinstance(key, int):
+            values = [value[key]
+                      if isinstance(value, list) and len(value) > key
+                      else None
+                      for value in values]
+        else:
+            values = [value.get(key) if isinstance(value, dict) else None
+                      for value in values]
+    return values
+
+
+def _timestamps(data, timestamps):
+    """Returns the timestamp columns to parse."""
+    if timestamps is None:
+        return [column for column in data
+                if column.endswith(TimestampSuffix)]
+    return timestamps
@@ -0,0 +1,271 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger('HelpScout')
+
+TimestampFormat = '%Y-%m-%dT%H:%M:%SZ'
+# Attributes stored in the updated_at column, the first one found
+UpdatedAttributes = ('updatedAt', 'userUpdatedAt')
+
+Schema = (
+    '''CREATE TABLE IF NOT EXISTS objects (
+        endpoint TEXT NOT NULL,
+        id TEXT NOT NULL,
+        updated_at TEXT,
+        email TEXT,
+        mailbox_id INTEGER,
+        fetched_at REAL NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (endpoint, id))''',
+    '''CREATE INDEX IF NOT EXISTS objects_updated_at
+        ON objects (endpoint, updated_at)''',
+    '''CREATE INDEX IF NOT EXISTS objects_email
+        ON objects (endpoint, email)''',
+    '''CREATE INDEX IF NOT EXISTS objects_mailbox_id
+        ON objects (endpoint, mailbox_id)''',
+    '''CREATE TABLE IF NOT EXISTS syncs (
+        endpoint TEXT NOT NULL,
+        params TEXT NOT NULL,
+        synced_at TEXT NOT NULL,
+        PRIMARY KEY (endpoint, params))''',
+)
+
+
+class HelpScoutMirror:
+
+    def __init__(self, path=':memory:', max_age=None):
+        """Local copy of the objects fetched from the API stored in SQLite.
+
+        Objects are keyed by endpoint and id, with secondary indexes on
+        updatedAt (userUpdatedAt for conversations), email and mailboxId to
+        answer lookups without hitting the API.
+
+        Parameters
+        ----------
+        path: str
+            Path to the SQLite database file. Defaults to an in memory one.
+        max_age: int or float or None
+            Amount of seconds a stored object is considered fresh for.
+            None keeps stored objects fresh until replaced, which is expected
+            when the mirror is fed by sync.
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            for statement in Schema:
+                self._connection.execute(statement)
+
+    def store(self, endpoint, api_objects):
+        """Stores or replaces objects received from the API.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint the objects belong to. E.g.: customers, users.
+        api_objects: iterable(dict)
+            Dictionaries with objects from the API. Objects without an id are
+            ignored.
+
+        Returns
+        -------
+        int
+            The amount of objects stored.
+        """
+        now = time.time()
+        rows = [
+            (endpoint, str(api_object['id']), _updated_at(api_object),
+             _email(api_object), api_object.get('mailboxId'), now,
+             json.dumps(api_object))
+            for api_object in api_objects if 'id' in api_object]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows)
+        return len(rows)
+
+    def get(self, endpoint, resource_id, max_age=None):
+        """Returns a stored object if it is fresh.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint the object belongs to. E.g.: customers, users.
+        resource_id: int or str
+            The id of the object.
+        max_age: int or float or None
+            Overrides the mirror's max_age for this lookup.
+
+        Returns
+        -------
+        dict or None
+            The object's dictionary or None if it is not stored or stale.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT fetched_at, data FROM objects '
+                'WHERE endpoint = ? AND id = ?',
+                (endpoint, str(resource_id))).fetchone()
+        if row is None:
+            return None
+        fetched_at, data = row
+        if max_age is not None and time.time() - fetched_at > max_age:
+            return None
+        return json.loads(data)
+
+    def find(self, endpoint, email=None, mailbox_id=None, updated_since=None):
+        """Returns the stored objects matching all the given filters.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint the objects belong to. E.g.: customers, users.
+        email: str or None
+            The object's email.
+        mailbox_id: int or None
+            The object's mailbox id.
+        updated_since: str or None
+            Only objects updated at or after this timestamp are returned.
+            E.g.: 2019-06-20T00:00:00Z
+
+        Returns
+        -------
+        [dict]
+            The objects' dictionaries sorted by their updatedAt value, or
+            userUpdatedAt for conversations.
+        """
+        conditions, values = ['endpoint = ?'], [endpoint]
+        for column, value in (('email', email), ('mailbox_id', mailbox_id)):
+            if value is not None:
+                conditions.append('%s = ?' % column)
+                values.append(value)
+        if updated_since is not None:
+            conditions.append('updated_at >= ?')
+            values.append(updated_since)
+        query = 'SELECT data FROM objects WHERE %s ORDER BY updated_at' % (
+            ' AND '.join(conditions))
+        with self._lock:
+            rows = self._connection.execute(query, values).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def last_updated(self, endpoint):
+        """Returns the latest updatedAt value stored for an endpoint, or
+        userUpdatedAt for conversations.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint the objects belong to. E.g.: customers, users.
+
+        Returns
+        -------
+        str or None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT MAX(updated_at) FROM objects WHERE endpoint = ?',
+                (endpoint,)).fetchone()
+        return row[0]
+
+    def last_synced(self, endpoint, params=None):
+        """Returns when the last completed synchronization of an endpoint
+        with the same parameters started.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint synchronized. E.g.: customers, conversations.
+        params: dict or None
+            The parameters the endpoint was synchronized with.
+
+        Returns
+        -------
+        str or None
+            A timestamp like 2019-06-20T00:00:00Z, None if never synchronized.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT synced_at FROM syncs '
+                'WHERE endpoint = ? AND params = ?',
+                (endpoint, _params_key(params))).fetchone()
+        return None if row is None else row[0]
+
+    def sync(self, client, endpoint, params=None):
+        """Stores the objects modified since the last synchronization.
+
+        The watermark is the start time of the last completed synchronization
+        of the endpoint with the same parameters, so objects stored by
+        get_objects do not move it. An interrupted synchronization leaves the
+        previous watermark, and the next one requests its objects again.
+
+        Parameters
+        ----------
+        client: HelpScout
+            A help scout client instance to query the API.
+        endpoint: str
+            An endpoint accepting the modifiedSince parameter, like customers
+            or conversations.
+        params: dict or None
+            Extra parameters to send to the url.
+
+        Returns
+        -------
+        int
+            The amount of objects stored.
+        """
+        key = _params_key(params)
+        started = time.strftime(TimestampFormat, time.gmtime())
+        since = self.last_synced(endpoint, params)
+        params = dict(params or {})
+        if since is not None:
+            params['modifiedSince'] = since
+        logger.debug('Mirror sync: %s since %s' % (endpoint, since))
+        stored = 0
+        for api_result in client.hit_(endpoint, 'get', params=params):
+            stored += self.store(
+                endpoint, api_result.get(endpoint, [api_result]))
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)',
+                (endpoint, key, started))
+        return stored
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        name = self.__class__.__name__
+        return '%s(path="%s", max_age=%s)' % (name, self.path, self.max_age)
+
+    __str__ = __repr__
+
+
+def _updated_at(api_object):
+    """Returns an object's last update timestamp, if it has one."""
+    for attribute in UpdatedAttributes:
+        if api_object.get(attribute) is not None:
+            return api_object[attribute]
+    return None
+
+
+def _params_key(params):
+    """Returns the parameters of a synchronization as a stable string."""
+    return json.dumps(params or {}, sort_keys=True)
+
+
+def _email(api_object):
+    """Returns an object's email, using the first embedded one if needed."""
+    email = api_object.get('email')
+    if email is None:
+        emails = api_object.get('_embedded', {}).get('emails') or [{}]
+        email = emails[0].get('value')
+    return email
@@ -1,3 +1,17 @@
+import threading
+import weakref
+
+from collections import OrderedDict
+from functools import lru_cache, partial
+
+from helpscout.dates import parse_timestamp
+
+
+SortedAttributes = {}
+SortedAttributesLimit = 1024
+TimestampSuffix = '_dt'
+
+
 class HelpScoutObject(object):
 
     key = ''
@@ -19,12 +33,20 @@ class HelpScoutObject(object):
             - updatedAt
             - _links
         """
-        self._attrs = tuple(sorted(api_object))
-        for key, value in api_object.items():
-            setattr(self, key, value)
+        keys = tuple(api_object)
+        attrs = SortedAttributes.get(keys)
+        if attrs is None:
+            attrs = tuple(sorted(keys))
+            if len(SortedAttributes) < SortedAttributesLimit:
+                SortedAttributes[keys] = attrs
+        # Objects with the same keys share the sorted attributes tuple, and
+        # values are set at once instead of going through __setattr__.
+        attributes = self.__dict__
+        attributes.update(api_object)
+        attributes['_attrs'] = attrs
 
     @classmethod
-    def from_results(cls, api_results):
+    def from_results(cls, api_results, identity_map=None):
         """Generates HelpScout objects from API results.
 
         Parameters
@@ -32,18 +54,50 @@ class HelpScoutObject(object):
         api_results: generator({cls.key: [dict]}) or generator(dict)
             A generator returning API responses that cointain a list of
             objects each under the class key.
+        identity_map: IdentityMap or None
+            Map returning the objects already built for the same ids instead
+            of new ones. None builds an object per result.
 
         Returns
         -------
         [HelpScoutObject]
         """
+        build = cls if identity_map is None else partial(
+            identity_map.get, cls)
         results = []
         for api_result in api_results:
             for object_data in api_result.get(cls.key, [api_result]):
                 if len(object_data) > 0:
-                    results.append(cls(object_data))
+                    results.append(build(object_data))
         return results
 
+    @classmethod
+    def project(cls, api_result, fields=None, exclude=None):
+        """Prunes an API result to the requested attributes before any object
+        is built from it.
+
+        Parameters
+        ----------
+        api_result: {cls.key: [dict]} or dict
+            An API response containing a list of objects under the class key
+            or a single object.
+        fields: iterable(str) or None
+            The only attributes to keep. None keeps every attribute.
+        exclude: iterable(str) or None
+            Attributes to drop. None drops nothing.
+
+        Returns
+        -------
+        {cls.key: [dict]} or dict
+            The pruned API result, with the same shape as the one received.
+        """
+        if fields is None and exclude is None:
+            return api_result
+        if cls.key in api_result:
+            return {cls.key: [prune(object_data, fields, exclude)
+                              for object_data in api_result[cls.key]]}
+        return prune(api_result, fields, exclude)
+
     @classmethod
     def cls(cls, entity_name, key):
         """Returns the object class based on the entity_name.
@@ -61,21 +115,30 @@ class HelpScoutObject(object):
         -------
         type: The object's class
         """
-        if '/' in entity_name:
-            parts = entity_name.rsplit('/')
-            entity_name = parts[-2] if len(parts) % 2 == 0 else parts[-1]
-        if '/' in key:
-            parts = key.rsplit('/')
-            key = parts[-2] if len(parts) % 2 == 0 else parts[-1]
-        plural_letters = (-2 if entity_name.endswith('es') else
-                          -1 if entity_name.endswith('s') else
-                          None)
-        class_name = entity_name.capitalize()[:plural_letters]
-        existing_class = globals().get(class_name)
-        if existing_class is not None:
-            return existing_class
-        globals()[class_name] = cls = type(class_name, (cls,), {'key': key})
-        return cls
+        return resolve_class(cls, entity_name, key)
+
+    def __getattr__(self, attr):
+        """Returns timestamp attributes parsed as UTC datetimes when
+        requested in snake case with a _dt suffix. E.g.: updated_at_dt for
+        updatedAt. Timestamps are parsed once, when first requested.
+
+        Parameters
+        ----------
+        attr: str
+
+        Returns
+        -------
+        datetime or None
+        """
+        if not attr.endswith(TimestampSuffix):
+            raise AttributeError(attr)
+        source = timestamp_attribute(attr)
+        if source not in self.__dict__:
+            raise AttributeError(attr)
+        value = parse_timestamp(self.__dict__[source])
+        # Cached outside of _attrs, so the object's state is left untouched
+        self.__dict__[attr] = value
+        return value
 
     def __setattr__(self, attr, value):
         """Sets an attribute to an object and adds it to the attributes list.
@@ -145,6 +208,202 @@ class HelpScoutObject(object):
     __str__ = __repr__
 
 
+class Conversation(HelpScoutObject):
+    """A conversation, from the conversations endpoint."""
+
+    key = 'conversations'
+
+
+class Thread(HelpScoutObject):
+    """A conversation thread, from the conversations/{id}/threads endpoint."""
+
+    key = 'threads'
+
+
+class Customer(HelpScoutObject):
+    """A customer, from the customers endpoint."""
+
+    key = 'customers'
+
+
+class User(HelpScoutObject):
+    """A user, from the users endpoint."""
+
+    key = 'users'
+
+
+class Mailbox(HelpScoutObject):
+    """A mailbox, from the mailboxes endpoint."""
+
+    key = 'mailboxes'
+
+
+class IdentityMap:
+
+    def __init__(self, maxsize=1024):
+        """Keeps a single object per class and id, so repeated resources
+        resolve to the same shared object and can be compared by identity.
+        Nested objects referenced by id, like a conversation's
+        primaryCustomer, are shared as well when their contents are equal.
+
+        The first version of an object received is kept while it is in use,
+        so a new map should be used per session to see updated objects.
+
+        Parameters
+        ----------
+        maxsize: int
+            Amount of recently used objects kept even when nothing else
+            references them. Other objects are only kept while referenced.
+        """
+        self.maxsize = maxsize
+        self._objects = weakref.WeakValueDictionary()
+        self._recent = OrderedDict()
+        self._nested = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cls, api_object):
+        """Returns the object for an API dictionary, building it only if
+        there is none for its class and id.
+
+        Parameters
+        ----------
+        cls: type
+            The HelpScoutObject subclass of the object.
+        api_object: dict
+            Dictionary with an object from the API.
+
+        Returns
+        -------
+        HelpScoutObject
+        """
+        object_id = api_object.get('id')
+        with self._lock:
+            if object_id is None:
+                return cls(self._share_nested(api_object))
+            key = (cls, object_id)
+            shared = self._objects.get(key)
+            if shared is None:
+                shared = cls(self._share_nested(api_object))
+                self._objects[key] = shared
+            self._remember(self._recent, key, shared)
+            return shared
+
+    def _share_nested(self, api_object):
+        """Replaces nested dictionaries with ids by equal ones seen before."""
+        shared_object = None
+        for attr, value in api_object.items():
+            if not isinstance(value, dict) or value.get('id') is None:
+                continue
+            key = (attr, value['id'])
+            nested = self._nested.get(key)
+            if nested is None or nested != value:
+                self._remember(self._nested, key, value)
+            elif nested is not value:
+                if shared_object is None:
+                    shared_object = dict(api_object)
+                shared_object[attr] = nested
+        return api_object if shared_object is None else shared_object
+
+    def _remember(self, recent, key, value):
+        """Keeps a value among the most recently used ones."""
+        recent[key] = value
+        recent.move_to_end(key)
+        if len(recent) > self.maxsize:
+            recent.popitem(last=False)
+
+    def __len__(self):
+        """Returns the amount of objects in the map."""
+        return len(self._objects)
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(maxsize=%s)' % (self.__class__.__name__, self.maxsize)
+
+    __str__ = __repr__
+
+
+@lru_cache(maxsize=1024)
+def resolve_class(base, entity_name, key):
+    """Returns the object class for an entity, creating it if needed.
+    Declared classes, like Conversation or Mailbox, are returned for their
+    endpoints. Results are cached, so endpoints are parsed only once.
+
+    Parameters
+    ----------
+    base: type
+        HelpScoutObject or a subclass to base new classes on.
+    entity_name: str
+        The help scout object name. E.g.: conversation, mailbox.
+    key: str
+        The key under which the object's dictionary is contained in the
+        API response.
+
+    Returns
+    -------
+    type: The object's class
+    """
+    if '/' in entity_name:
+        parts = entity_name.rsplit('/')
+        entity_name = parts[-2] if len(parts) % 2 == 0 else parts[-1]
+    if '/' in key:
+        parts = key.rsplit('/')
+        key = parts[-2] if len(parts) % 2 == 0 else parts[-1]
+    plural_letters = (-2 if entity_name.endswith('es') else
+                      -1 if entity_name.endswith('s') else
+                      None)
+    class_name = entity_name.capitalize()[:plural_letters]
+    existing_class = globals().get(class_name)
+    if existing_class is not None:
+        return existing_class
+    globals()[class_name] = cls = type(class_name, (base,), {'key': key})
+    return cls
+
+
+@lru_cache(maxsize=1024)
+def timestamp_attribute(attr):
+    """Returns the API attribute of a parsed timestamp attribute.
+
+    Parameters
+    ----------
+    attr: str
+        The parsed timestamp attribute. E.g.: updated_at_dt.
+
+    Returns
+    -------
+    str
+        The API attribute. E.g.: updatedAt.
+    """
+    words = attr[:-len(TimestampSuffix)].split('_')
+    return words[0] + ''.join(word.capitalize() for word in words[1:])
+
+
+def prune(api_object, fields=None, exclude=None):
+    """Returns a copy of an API dictionary with only the requested keys.
+
+    Parameters
+    ----------
+    api_object: dict
+        Dictionary with an object from the API.
+    fields: iterable(str) or None
+        The only keys to keep. None keeps every key.
+    exclude: iterable(str) or None
+        Keys to drop. None drops nothing.
+
+    Returns
+    -------
+    dict
+    """
+    if fields is not None:
+        api_object = {
+            key: api_object[key] for key in fields if key in api_object}
+    if exclude is not None:
+        exclude = set(exclude)
+        api_object = {
+            key: value for key, value in api_object.items()
+            if key not in exclude}
+    return api_object
+
+
 def get_subclass_instance(class_name, key):
     """Gets a dynamic class from a class name for unpickling.
 
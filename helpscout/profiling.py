@@ -0,0 +1,229 @@
+import threading
+import time
+import tracemalloc
+
+from collections import defaultdict
+from datetime import timedelta
+
+
+Metrics = ('wall', 'cpu', 'memory')
+
+
+class HelpScoutProfiler:
+
+    def __init__(self, client=None, trace_memory=True):
+        """Attributes the time spent by a client to each endpoint and phase:
+        request (split into wait, the time to the first byte until the
+        response headers arrive, including connecting and the API's
+        processing, and transfer), decode (json parsing) and build
+        (HelpScoutObjects).
+
+        Phases nest, like the requests for further pages made while objects
+        are built. Each phase's own wall time, thread cpu time and memory
+        allocated (net, as traced by tracemalloc) exclude the nested phases,
+        so time not attributed to any phase belongs to the caller's code.
+
+        Used as a context manager it profiles the client within the block:
+        > with client.profile() as profiler:
+        >     client.conversations.get()
+        > print(profiler.summary())
+
+        Parameters
+        ----------
+        client: HelpScout or None
+            The client to profile while in the context.
+        trace_memory: bool
+            True to trace memory allocations with tracemalloc, which slows
+            allocations down while profiling.
+        """
+        self.client = client
+        self.trace_memory = trace_memory
+        self.stats = defaultdict(lambda: dict.fromkeys(
+            ('calls',) + Metrics, 0))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._previous = None
+        self._started_tracing = False
+
+    def phase(self, endpoint, name):
+        """Returns a context manager measuring a phase for an endpoint.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint name. E.g.: conversations.
+        name: str
+            The phase name. E.g.: decode.
+
+        Returns
+        -------
+        Phase
+        """
+        return Phase(self, endpoint, name)
+
+    def record(self, path, calls=1, wall=0, cpu=0, memory=0):
+        """Adds measurements to a phase path.
+
+        Parameters
+        ----------
+        path: tuple(str)
+            The endpoint followed by the nested phases names.
+        calls: int
+        wall: float
+            Wall seconds.
+        cpu: float
+            Cpu seconds.
+        memory: int
+            Bytes allocated.
+        """
+        with self._lock:
+            stats = self.stats[path]
+            stats['calls'] += calls
+            stats['wall'] += wall
+            stats['cpu'] += cpu
+            stats['memory'] += memory
+
+    def summary(self, limit=None):
+        """Returns a table of the phases sorted by wall time.
+
+        Parameters
+        ----------
+        limit: int or None
+            Amount of phases to include. None includes all.
+
+        Returns
+        -------
+        str
+        """
+        with self._lock:
+            rows = sorted(self.stats.items(),
+                          key=lambda item: -item[1]['wall'])
+        rows = rows[:limit] if limit is not None else rows
+        lines = ['%-50s %8s %10s %10s %12s' % (
+            'phase', 'calls', 'wall (s)', 'cpu (s)', 'memory (KB)')]
+        for path, stats in rows:
+            lines.append('%-50s %8d %10.3f %10.3f %12.1f' % (
+                ';'.join(path), stats['calls'], stats['wall'], stats['cpu'],
+                stats['memory'] / 1024.))
+        return '\n'.join(lines)
+
+    def folded(self, metric='wall'):
+        """Returns the phases as folded stacks, one per line, for flame graph
+        tools like flamegraph.pl or speedscope. E.g.:
+        conversations;build;request;transfer 1234
+
+        Parameters
+        ----------
+        metric: str
+            wall or cpu (in microseconds), or memory (in bytes).
+
+        Returns
+        -------
+        str
+        """
+        scale = 1 if metric == 'memory' else 1e6
+        with self._lock:
+            stacks = sorted(self.stats.items())
+        return '\n'.join(
+            '%s %d' % (';'.join(path), max(0, stats[metric]) * scale)
+            for path, stats in stacks if stats[metric] > 0)
+
+    def _stack(self):
+        """Returns the current thread's stack of open phases."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def __enter__(self):
+        """Starts profiling the client."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.client is not None:
+            self._previous = self.client.profiler
+            self.client.profiler = self
+        return self
+
+    def __exit__(self, *args):
+        """Stops profiling the client."""
+        if self.client is not None:
+            self.client.profiler = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(phases=%s)' % (self.__class__.__name__, len(self.stats))
+
+    __str__ = __repr__
+
+
+class Phase:
+
+    def __init__(self, profiler, endpoint, name):
+        """A phase being measured. See HelpScoutProfiler.phase."""
+        self.profiler = profiler
+        self.endpoint = endpoint
+        self.name = name
+
+    def __enter__(self):
+        """Starts measuring the phase."""
+        stack = self.profiler._stack()
+        parent = stack[-1].path if stack else (self.endpoint,)
+        self.path = parent + (self.name,)
+        self.children = dict.fromkeys(Metrics, 0)
+        self.start = {'wall': time.perf_counter(), 'cpu': time.thread_time(),
+                      'memory': _traced_memory()}
+        stack.append(self)
+        return self
+
+    def elapsed(self):
+        """Returns the wall seconds since the phase started."""
+        return time.perf_counter() - self.start['wall']
+
+    def split(self, name, wall):
+        """Attributes part of the phase's wall time to a nested phase
+        measured by other means, like the time until response headers.
+
+        Parameters
+        ----------
+        name: str
+            The nested phase name.
+        wall: float
+            Wall seconds.
+        """
+        self.profiler.record(self.path + (name,), wall=wall)
+        self.children['wall'] += wall
+
+    def __exit__(self, *args):
+        """Records the phase, excluding its nested phases."""
+        end = {'wall': time.perf_counter(), 'cpu': time.thread_time(),
+               'memory': _traced_memory()}
+        total = dict((metric, end[metric] - self.start[metric])
+                     for metric in Metrics)
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            for metric in Metrics:
+                stack[-1].children[metric] += total[metric]
+        self.profiler.record(self.path, **dict(
+            (metric, total[metric] - self.children[metric])
+            for metric in Metrics))
+        return False
+
+
+def response_wait(response):
+    """Returns the seconds until a response's headers arrived, if known."""
+    elapsed = getattr(response, 'elapsed', None)
+    if isinstance(elapsed, timedelta):
+        return elapsed.total_seconds()
+    return None
+
+
+def _traced_memory():
+    """Returns the bytes currently allocated, if tracing memory."""
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() \
+        else 0
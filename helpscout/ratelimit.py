@@ -0,0 +1,173 @@
+import multiprocessing
+import threading
+import time
+
+from collections import Counter
+
+
+DefaultRate = 400 / 60.  # Help Scout allows 400 requests per minute
+Interactive = 'interactive'
+Normal = 'normal'
+Bulk = 'bulk'
+Priorities = (Interactive, Normal, Bulk)
+
+
+class RateLimiter:
+
+    def __init__(self, rate=DefaultRate, burst=None):
+        """Token bucket limiting the requests sent to the API.
+
+        Its state lives in shared memory, so a single limiter can be shared
+        by the threads of a process and by the processes of a pool (handing
+        it to the processes when they are created), keeping all of them
+        within the same rate budget.
+
+        Parameters
+        ----------
+        rate: float
+            Amount of requests allowed per second.
+        burst: int or None
+            Amount of requests that can be sent at once after being idle.
+            None allows a second worth of requests.
+        """
+        self.rate = rate
+        self.burst = max(1, int(rate) if burst is None else burst)
+        # Available tokens and time they were last updated
+        self._state = multiprocessing.Array('d', [self.burst, time.time()])
+
+    def acquire(self, priority=None, timeout=None):
+        """Blocks until a request can be sent.
+
+        Parameters
+        ----------
+        priority: str or None
+            Ignored, every request shares the same budget.
+        timeout: float or None
+            Maximum seconds to wait. None waits as long as needed.
+
+        Returns
+        -------
+        float or None
+            The seconds waited, None if the request could not be sent within
+            the timeout.
+        """
+        waited = 0
+        while True:
+            with self._state.get_lock():
+                now = time.time()
+                tokens = min(self.burst, self._state[0] +
+                             (now - self._state[1]) * self.rate)
+                self._state[1] = now
+                if tokens >= 1:
+                    self._state[0] = tokens - 1
+                    return waited
+                self._state[0] = tokens
+                wait = (1 - tokens) / self.rate
+            if timeout is not None and waited + wait > timeout:
+                return None
+            time.sleep(wait)
+            waited += wait
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(rate=%s, burst=%s)' % (
+            self.__class__.__name__, self.rate, self.burst)
+
+    __str__ = __repr__
+
+
+class PriorityScheduler:
+
+    def __init__(self, rate=DefaultRate, burst=None, reserved=None):
+        """Token bucket sharing a rate budget among clients, or threads,
+        with priority classes: interactive, normal and bulk.
+
+        Waiting requests are let through by priority, and part of the budget
+        is reserved for the higher priorities, so interactive requests get
+        through quickly while bulk ones soak up the remaining budget. As
+        every page is a new request, long listings are preempted between
+        pages.
+
+        The scheduler is shared by the threads of a process. For several
+        processes use a RateLimiter.
+
+        Parameters
+        ----------
+        rate: float
+            Amount of requests allowed per second.
+        burst: int or None
+            Amount of requests that can be sent at once after being idle.
+            None allows a second worth of requests.
+        reserved: {str: float} or None
+            Share of the burst reserved for each priority and the ones above
+            it, that lower priorities cannot use.
+            None reserves 30% for interactive and 10% for normal requests.
+        """
+        self.rate = rate
+        self.burst = max(1, int(rate) if burst is None else burst)
+        self.reserved = ({Interactive: 0.3, Normal: 0.1} if reserved is None
+                         else reserved)
+        # Tokens each priority has to leave for the ones above it
+        self._reserves = [
+            self.burst * sum(self.reserved.get(above, 0)
+                             for above in Priorities[:level])
+            for level in range(len(Priorities))]
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._waiting = [0] * len(Priorities)
+        self._condition = threading.Condition()
+        self.stats = Counter()
+
+    def acquire(self, priority=None, timeout=None):
+        """Blocks until a request of a priority can be sent.
+
+        Parameters
+        ----------
+        priority: str or None
+            interactive, normal or bulk. None is normal.
+        timeout: float or None
+            Maximum seconds to wait. None waits as long as needed.
+
+        Returns
+        -------
+        float or None
+            The seconds waited, None if the request could not be sent within
+            the timeout.
+        """
+        level = Priorities.index(priority or Normal)
+        reserve = self._reserves[level]
+        start = time.time()
+        with self._condition:
+            self._waiting[level] += 1
+            try:
+                while True:
+                    now = time.time()
+                    self._tokens = min(self.burst, self._tokens +
+                                       (now - self._updated) * self.rate)
+                    self._updated = now
+                    preceded = any(self._waiting[:level])
+                    if not preceded and self._tokens - 1 >= reserve:
+                        self._tokens -= 1
+                        break
+                    wait = max(reserve + 1 - self._tokens, 1) / self.rate
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            self.stats[Priorities[level] + '_timeouts'] += 1
+                            return None
+                        wait = min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._waiting[level] -= 1
+                self._condition.notify_all()
+            waited = time.time() - start
+            self.stats.update({Priorities[level]: 1,
+                               Priorities[level] + '_waited': waited})
+        return waited
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(rate=%s, burst=%s, reserved=%s)' % (
+            self.__class__.__name__, self.rate, self.burst, self.reserved)
+
+    __str__ = __repr__
@@ -0,0 +1,130 @@
+import json
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from helpscout.dates import format_timestamp, split_range, to_seconds
+
+
+logger = logging.getLogger('HelpScout')
+
+
+class HelpScoutReportRunner:
+
+    def __init__(self, client, window=timedelta(days=7), max_workers=4,
+                 cache=None):
+        """Runs reports over long ranges by splitting them into windows that
+        are requested concurrently and merged.
+
+        Parameters
+        ----------
+        client: HelpScout
+            A help scout client instance to query the API, shared by the
+            threads requesting the windows.
+        window: timedelta
+            The windows length. Windows are aligned to multiples of it, so
+            re-running a range only requests the windows not seen before.
+        max_workers: int
+            Amount of windows to request at the same time.
+        cache: dict-like or None
+            Where the results of windows already finished are kept, keyed by
+            str. E.g.: a dict or a shelve for a persistent cache.
+            None uses a dict for the runner's lifetime.
+        """
+        self.client = client
+        self.window = window
+        self.max_workers = max_workers
+        self.cache = {} if cache is None else cache
+
+    def run(self, report, start, end, params=None, additive=()):
+        """Runs a report for a range.
+
+        Parameters
+        ----------
+        report: str
+            The report endpoint. E.g.: reports/conversations.
+        start: datetime or str
+            The range start. E.g.: 2019-06-01T00:00:00Z
+        end: datetime or str
+            The range end.
+        params: dict or None
+            Other report parameters, like mailboxes or tags.
+        additive: iterable(str)
+            Dotted paths of the metrics that can be summed across windows,
+            like current.totalConversations. Counts of distinct customers,
+            busiest days, averages or percentages cannot, and are only
+            available per window.
+
+        Returns
+        -------
+        dict
+            windows: [(str, str, dict)] each window start, end and report.
+            totals: {str: int or float} each additive metric summed over the
+              windows.
+        """
+        windows = [
+            (format_timestamp(window_start), format_timestamp(window_end))
+            for window_start, window_end in split_range(
+                start, end, self.window)]
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            results = list(executor.map(
+                lambda window: self._window(report, window, params),
+                windows))
+        return {
+            'windows': [window + (result,)
+                        for window, result in zip(windows, results)],
+            'totals': merge_additive(results, additive),
+        }
+
+    def _window(self, report, window, params):
+        """Returns a window's report, from the cache if possible."""
+        window_params = dict(params or {})
+        window_params['start'], window_params['end'] = window
+        key = '%s?%s' % (report, json.dumps(window_params, sort_keys=True))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        logger.debug('Report window: %s' % key)
+        result = next(self.client.hit_(report, 'get', params=window_params))
+        if to_seconds(window[1]) <= time.time():  # Finished windows only
+            self.cache[key] = result
+        return result
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        name = self.__class__.__name__
+        return '%s(window=%s, max_workers=%s)' % (
+            name, self.window, self.max_workers)
+
+    __str__ = __repr__
+
+
+def merge_additive(results, paths):
+    """Sums metrics of reports that are known to be additive.
+
+    Parameters
+    ----------
+    results: [dict]
+        Reports with the same structure.
+    paths: iterable(str)
+        Dotted paths of the metrics to sum. E.g.: current.totalConversations.
+        Reports without a number at a path are left out of its sum.
+
+    Returns
+    -------
+    {str: int or float}
+        The sum of each path found in any report.
+    """
+    totals = {}
+    for path in paths:
+        keys = path.split('.')
+        for result in results:
+            value = result
+            for key in keys:
+                value = value.get(key) if isinstance(value, dict) else None
+            if (isinstance(value, (int, float)) and
+                    not isinstance(value, bool)):
+                totals[path] = totals.get(path, 0) + value
+    return totals
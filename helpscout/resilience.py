@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+
+from collections import deque
+
+from helpscout.exceptions import HelpScoutCircuitOpenException
+
+
+logger = logging.getLogger('HelpScout')
+Closed = 'closed'
+Open = 'open'
+HalfOpen = 'half_open'
+
+
+class HedgingPolicy:
+
+    def __init__(self, percentile=95, min_delay=0.05, max_delay=2.0,
+                 budget=0.05, window=500, min_samples=20, max_workers=None):
+        """Decides when a GET request still waiting for its response is sent
+        again, using whichever response arrives first.
+
+        The delay is a percentile of the recent response times, so only
+        stragglers are hedged. Hedges are capped to a share of the requests
+        so they barely consume the rate limit.
+
+        Parameters
+        ----------
+        percentile: float
+            Percentile of the recent response times to wait before hedging.
+        min_delay: float
+            Minimum seconds to wait before hedging.
+        max_delay: float
+            Maximum seconds to wait before hedging, also used until enough
+            response times are known.
+        budget: float
+            Maximum hedges per request sent. E.g.: 0.05 for 5%.
+        window: int
+            Amount of recent response times to consider.
+        min_samples: int
+            Amount of response times required to use the percentile.
+        max_workers: int or None
+            Threads sending the hedged requests and their hedges, bounding
+            the client's concurrent GET requests. None uses twice the
+            client's pool_size, or 32 threads without one.
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._latencies = deque(maxlen=window)
+        self._tokens = 1.0  # Hedges available, refilled by requests
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Returns the seconds to wait for a response before hedging."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return self.max_delay
+        index = min(len(latencies) - 1,
+                    int(len(latencies) * self.percentile / 100.))
+        return min(self.max_delay, max(self.min_delay, latencies[index]))
+
+    def record(self, latency):
+        """Records a response time and refills the hedges budget.
+
+        Parameters
+        ----------
+        latency: float
+            Seconds a response took.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            self._tokens = min(self._tokens + self.budget, 1 + self.budget)
+
+    def acquire(self):
+        """Returns True if a hedge can be sent, consuming the budget."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(percentile=%s, min_delay=%s, max_delay=%s, budget=%s)' % (
+            self.__class__.__name__, self.percentile, self.min_delay,
+            self.max_delay, self.budget)
+
+    __str__ = __repr__
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_rate=0.5, window=20, min_requests=10,
+                 recovery_time=30, half_open_requests=1, hooks=None):
+        """Rejects requests to endpoints failing too often right away, instead
+        of waiting on them, until they recover.
+
+        Each endpoint has a circuit, closed while it works. When the rate of
+        failures (server errors, timeouts and connection errors) among its
+        recent requests is too high the circuit opens and requests are
+        rejected with a HelpScoutCircuitOpenException. After a while it goes
+        half open and lets some requests through: if they succeed the circuit
+        closes, otherwise it opens again.
+
+        Parameters
+        ----------
+        failure_rate: float
+            Share of failed recent requests opening the circuit.
+        window: int
+            Amount of recent requests considered per endpoint.
+        min_requests: int
+            Amount of recent requests required to open the circuit.
+        recovery_time: float
+            Seconds a circuit stays open before letting requests through.
+        half_open_requests: int
+            Amount of requests let through at the same time when half open.
+        hooks: [callable] or None
+            Hooks called as hook('circuit_state', info) when a circuit
+            changes its state, info being a dictionary with the endpoint,
+            state and previous state. Clients add their metrics hooks.
+        """
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_requests = min_requests
+        self.recovery_time = recovery_time
+        self.half_open_requests = half_open_requests
+        self.hooks = list(hooks or [])
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, endpoint):
+        """Returns the state of an endpoint's circuit: closed, open or
+        half_open."""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                return Closed
+            if circuit.state == Open and self._recovered(circuit):
+                return HalfOpen
+            return circuit.state
+
+    def before(self, endpoint):
+        """Raises a HelpScoutCircuitOpenException if requests to the endpoint
+        have to be rejected, otherwise lets the request through.
+
+        Parameters
+        ----------
+        endpoint: str
+        """
+        changed = None
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit.state == Open:
+                if not self._recovered(circuit):
+                    raise HelpScoutCircuitOpenException(
+                        endpoint,
+                        circuit.opened + self.recovery_time - time.time())
+                changed = self._change(circuit, HalfOpen)
+            if circuit.state == HalfOpen:
+                if circuit.probes >= self.half_open_requests:
+                    raise HelpScoutCircuitOpenException(
+                        endpoint, self.recovery_time)
+                circuit.probes += 1
+        self._notify(endpoint, changed)
+
+    def record(self, endpoint, success):
+        """Records the outcome of a request let through.
+
+        Parameters
+        ----------
+        endpoint: str
+        success: bool
+            False for server errors, timeouts and connection errors.
+        """
+        changed = None
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit.state == HalfOpen:
+                circuit.probes = max(0, circuit.probes - 1)
+                circuit.results.clear()
+                changed = self._change(circuit, Closed if success else Open)
+            else:
+                circuit.results.append(success)
+                failures = circuit.results.count(False)
+                if (circuit.state == Closed and
+                        len(circuit.results) >= self.min_requests and
+                        failures >= self.failure_rate *
+                        len(circuit.results)):
+                    changed = self._change(circuit, Open)
+        self._notify(endpoint, changed)
+
+    def _circuit(self, endpoint):
+        """Returns an endpoint's circuit, creating it if needed."""
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = _Circuit(self.window)
+        return circuit
+
+    def _recovered(self, circuit):
+        """Returns True if an open circuit can let requests through."""
+        return time.time() >= circuit.opened + self.recovery_time
+
+    def _change(self, circuit, state):
+        """Changes a circuit's state, returning the previous and new ones."""
+        previous = circuit.state
+        if previous == state:
+            return None
+        circuit.state = state
+        if state == Open:
+            circuit.opened = time.time()
+            circuit.results.clear()
+        return previous, state
+
+    def _notify(self, endpoint, changed):
+        """Calls the hooks with a state change, if any."""
+        if changed is None:
+            return
+        previous, state = changed
+        logger.warning('Circuit %s: %s -> %s' % (endpoint, previous, state))
+        info = {'endpoint': endpoint, 'state': state, 'previous': previous}
+        for hook in self.hooks:
+            try:
+                hook('circuit_state', info)
+            except Exception:
+                logger.exception('Circuit hook failed: %s' % endpoint)
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(failure_rate=%s, window=%s, recovery_time=%s)' % (
+            self.__class__.__name__, self.failure_rate, self.window,
+            self.recovery_time)
+
+    __str__ = __repr__
+
+
+class _Circuit:
+
+    def __init__(self, window):
+        """The state of an endpoint's circuit."""
+        self.state = Closed
+        self.results = deque(maxlen=window)
+        self.opened = 0
+        self.probes = 0
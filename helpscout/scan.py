@@ -0,0 +1,141 @@
+import logging
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from helpscout.client import EmbeddedKey, PageKey
+from helpscout.dates import (Epoch, format_timestamp, parse_timestamp,
+                             split_range, to_seconds)
+from helpscout.model import HelpScoutObject
+
+
+logger = logging.getLogger('HelpScout')
+
+
+class HelpScoutScanner:
+
+    def __init__(self, client, field='modifiedAt', window=timedelta(days=1),
+                 max_pages=10, max_workers=1, min_window=timedelta(seconds=1)):
+        """Scans list endpoints by sorted time windows of a timestamp field
+        instead of following page numbers, so deep scans do not get slower
+        with every page and windows can be requested concurrently.
+
+        Windows include their start and exclude their end. Windows returning
+        more than max_pages pages are split in halves until they fit.
+
+        Scans stop at the time they start, so objects modified while scanning
+        get a field value out of the range instead of being returned again by
+        a later window. A scan starting at scanned_until picks them up.
+
+        Parameters
+        ----------
+        client: HelpScout
+            A help scout client instance to query the API, shared by the
+            threads requesting the windows.
+        field: str
+            The timestamp field the windows filter and sort by. E.g.:
+            modifiedAt or createdAt.
+        window: timedelta
+            The initial windows length, aligned to multiples of it.
+        max_pages: int
+            Amount of pages a window can have before being split.
+        max_workers: int
+            Amount of windows to request at the same time.
+        min_window: timedelta
+            The shortest window. Windows this short are paged through
+            whatever their amount of pages.
+        """
+        self.client = client
+        self.field = field
+        self.window = window
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.min_window = min_window
+        self.scanned_until = None
+
+    def scan(self, endpoint, start, end, params=None):
+        """Yields the objects of an endpoint with field values in a range,
+        sorted by window.
+
+        Parameters
+        ----------
+        endpoint: str
+            The list endpoint. E.g.: conversations.
+        start: datetime or str
+            The range start. E.g.: 2019-06-01T00:00:00Z
+        end: datetime or str
+            The range end, excluded. Ends after the scan's start are replaced
+            by it, and the end used is kept in scanned_until.
+        params: dict or None
+            Other endpoint parameters, like mailbox or status. A query is
+            combined with the windows' ones.
+
+        Yields
+        ------
+        HelpScoutObject
+            The objects, each one once.
+        """
+        cls = HelpScoutObject.cls(endpoint, endpoint)
+        end = Epoch + timedelta(seconds=min(to_seconds(end), int(time.time())))
+        self.scanned_until = format_timestamp(end)
+        windows = iter(split_range(start, end, self.window))
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            futures = deque(
+                executor.submit(self._window, endpoint, cls.key, params, w)
+                for w in islice(windows, 2 * self.max_workers))
+            while futures:
+                objects = futures.popleft().result()
+                for window in islice(windows, 1):  # Keep the workers busy
+                    futures.append(executor.submit(
+                        self._window, endpoint, cls.key, params, window))
+                for object_data in objects:
+                    yield cls(object_data)
+
+    def _window(self, endpoint, key, params, window):
+        """Returns a window's objects, splitting it if it has too many."""
+        start, end = window
+        window_params = dict(params or {})
+        window_params['query'] = self._query(window_params.get('query'),
+                                             start, end)
+        window_params['sortField'] = self.field
+        window_params['sortOrder'] = 'asc'
+        r = self.client.hit_raw(endpoint, 'get', params=window_params,
+                                stream=False)
+        response = r.json()
+        pages = response.get(PageKey, {}).get('totalPages', 1)
+        if pages > self.max_pages:
+            if end - start > self.min_window:
+                middle = Epoch + timedelta(
+                    seconds=(to_seconds(start) + to_seconds(end)) // 2)
+                logger.debug('Splitting %s window %s - %s (%s pages)' % (
+                    endpoint, start, end, pages))
+                return (self._window(endpoint, key, params, (start, middle)) +
+                        self._window(endpoint, key, params, (middle, end)))
+            logger.warning('Paging %s window %s - %s through %s pages' % (
+                endpoint, start, end, pages))
+        if EmbeddedKey not in response:
+            return []
+        return [
+            api_object
+            for api_result in self.client.paginate(response)
+            for api_object in api_result.get(key, [api_result])]
+
+    def _query(self, query, start, end):
+        """Returns the search query restricting the field to a window."""
+        # Timestamps have second precision: the second before the end is the
+        # last one included
+        window = '(%s:[%s TO %s])' % (
+            self.field, format_timestamp(start),
+            format_timestamp(parse_timestamp(end) - timedelta(seconds=1)))
+        return window if not query else '(%s) AND %s' % (query, window)
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(field="%s", window=%s, max_pages=%s, max_workers=%s)' % (
+            self.__class__.__name__, self.field, self.window, self.max_pages,
+            self.max_workers)
+
+    __str__ = __repr__
@@ -0,0 +1,429 @@
+import gzip
+import json
+import tempfile
+import threading
+import time
+
+from collections import defaultdict, deque
+from functools import partial
+
+import requests
+
+from helpscout.exceptions import HelpScoutException
+
+
+TokenEndpoint = 'oauth2/token'
+SpoolSize = 2 ** 20  # Streamed bodies larger than this are spooled to disk
+
+
+class Transport:
+
+    def request(self, method, url, **kwargs):
+        """Sends an http request.
+
+        Parameters
+        ----------
+        method: str
+            The http method. E.g.: get, post.
+        url: str
+            The full url to request.
+        **kwargs: keyword arguments
+            requests style keyword arguments: headers, json, data, timeout and
+            stream.
+
+        Returns
+        -------
+        requests.Response or an object with the same interface: ok,
+        status_code, headers, text, content, json() and iter_content().
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Releases the transport's connections."""
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s()' % self.__class__.__name__
+
+    __str__ = __repr__
+
+
+class RequestsTransport(Transport):
+
+    def __init__(self, pool_size=10):
+        """HTTP/1.1 transport keeping a pool of connections through requests.
+
+        Parameters
+        ----------
+        pool_size: int
+            Amount of connections to keep open, usually the amount of threads
+            sharing the client.
+        """
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        """Sends an http request through the pooled session."""
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(pool_size=%s)' % (self.__class__.__name__, self.pool_size)
+
+    __str__ = __repr__
+
+
+class HTTP2Transport(Transport):
+
+    def __init__(self, max_connections=1, timeout=None):
+        """HTTP/2 transport multiplexing concurrent requests over a single
+        connection. Requires httpx with http2 support:
+        pip install httpx[http2]
+
+        The transport is thread safe: requests from threads sharing the
+        client, or from asyncio code running the client in executors, are
+        multiplexed over the same connection.
+
+        Parameters
+        ----------
+        max_connections: int
+            Amount of connections to open to the API.
+        timeout: float or None
+            Default seconds to wait for the API. None waits forever.
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                'HTTP2Transport requires httpx: pip install httpx[http2]')
+        self.max_connections = max_connections
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http2=True, timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections))
+
+    def request(self, method, url, headers=None, json=None, data=None,
+                timeout=None, stream=False):
+        """Sends an http request over the multiplexed connection.
+
+        Dictionaries in data are sent form encoded, like requests does, and
+        bytes or iterables of bytes as they are.
+        """
+        kwargs = {} if timeout is None else {'timeout': timeout}
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            kwargs['timeout'] = self.httpx.Timeout(read, connect=connect)
+        if isinstance(data, dict):
+            kwargs['data'] = data
+        else:
+            kwargs['content'] = data
+        request = self.client.build_request(
+            method.upper(), url, headers=headers, json=json, **kwargs)
+        try:
+            return HTTPXResponse(self.client.send(request, stream=stream))
+        except self.httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+
+    def close(self):
+        """Closes the connections."""
+        self.client.close()
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(max_connections=%s)' % (
+            self.__class__.__name__, self.max_connections)
+
+    __str__ = __repr__
+
+
+class HTTPXResponse:
+
+    def __init__(self, response):
+        """Wraps an httpx response with the requests.Response interface used
+        by the client.
+
+        Parameters
+        ----------
+        response: httpx.Response
+        """
+        self.response = response
+
+    @property
+    def ok(self):
+        """True for non error status codes."""
+        return self.response.status_code < 400
+
+    @property
+    def status_code(self):
+        """The http status code."""
+        return self.response.status_code
+
+    @property
+    def headers(self):
+        """The response headers."""
+        return self.response.headers
+
+    @property
+    def text(self):
+        """The decoded response body."""
+        return self.response.text
+
+    @property
+    def content(self):
+        """The response body bytes."""
+        return self.response.content
+
+    @property
+    def num_bytes_downloaded(self):
+        """The bytes transferred, compressed if the response was."""
+        return self.response.num_bytes_downloaded
+
+    def json(self):
+        """Returns the decoded json body."""
+        return self.response.json()
+
+    def iter_content(self, chunk_size=None):
+        """Iterates the body bytes of streamed responses."""
+        return self.response.iter_bytes(chunk_size)
+
+    def close(self):
+        """Releases the connection of streamed responses."""
+        self.response.close()
+
+
+class RecordingTransport(Transport):
+
+    def __init__(self, path, transport=None):
+        """Transport recording every response to a gzipped cassette file, to
+        replay them later with ReplayTransport.
+
+        Responses are stored with their status code, headers, body and the
+        elapsed time, so pagination chains replay as they were received.
+        Request headers are not stored and access tokens are masked.
+
+        Streamed responses are recorded as their chunks are read, through a
+        temporary file, so large bodies are not held in memory. Their entry
+        is written once they are closed, reading any unread chunks first.
+
+        Parameters
+        ----------
+        path: str
+            The cassette file path.
+        transport: Transport or None
+            The transport sending the requests. None uses requests.
+        """
+        self.path = path
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def request(self, method, url, **kwargs):
+        """Sends an http request and records its response."""
+        start = time.time()
+        if self.transport is None:
+            response = getattr(requests, method)(url, **kwargs)
+        else:
+            response = self.transport.request(method, url, **kwargs)
+        if kwargs.get('stream'):
+            return RecordingResponse(response, partial(
+                self._write_spooled, method, url, response, start))
+        content = response.content
+        elapsed = time.time() - start
+        if url.endswith(TokenEndpoint) and response.ok:
+            token = json.loads(content.decode('utf-8'))
+            token['access_token'] = 'recorded'
+            content = json.dumps(token).encode('utf-8')
+        entry = self._entry(method, url, response)
+        entry['body'] = content.decode('latin-1')
+        entry['elapsed'] = elapsed
+        with self._lock:
+            self._file.write(json.dumps(entry) + '\n')
+        return response
+
+    def _entry(self, method, url, response):
+        """Returns a response's entry, without its body and elapsed time."""
+        return {
+            'method': method,
+            'url': url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+        }
+
+    def _write_spooled(self, method, url, response, start, spool):
+        """Writes the entry of a streamed response from its spooled body,
+        escaping it a chunk at a time."""
+        elapsed = time.time() - start
+        entry = json.dumps(self._entry(method, url, response))
+        spool.seek(0)
+        with self._lock:
+            self._file.write(entry[:-1] + ', "body": "')
+            for chunk in iter(partial(spool.read, SpoolSize), b''):
+                # Latin-1 maps every byte to a character, so chunks can be
+                # escaped on their own
+                self._file.write(json.dumps(chunk.decode('latin-1'))[1:-1])
+            self._file.write('", "elapsed": %s}\n' % json.dumps(elapsed))
+
+    def close(self):
+        """Closes the cassette and the wrapped transport."""
+        with self._lock:
+            self._file.close()
+        if self.transport is not None:
+            self.transport.close()
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(path="%s")' % (self.__class__.__name__, self.path)
+
+    __str__ = __repr__
+
+
+class RecordingResponse:
+
+    def __init__(self, response, record):
+        """Wraps a streamed response, copying its chunks to a temporary file
+        as they are read, to record it once closed.
+
+        Parameters
+        ----------
+        response: requests.Response or an object with its interface
+            The streamed response.
+        record: callable
+            Called with the temporary file holding the whole body when the
+            response is closed.
+        """
+        self.response = response
+        self._record = record
+        self._spool = tempfile.SpooledTemporaryFile(SpoolSize)
+        self._chunks = None
+        self._recorded = False
+
+    def __getattr__(self, attr):
+        """Returns the wrapped response's attributes, like status_code."""
+        if attr.startswith('_') or attr == 'response':
+            raise AttributeError(attr)
+        return getattr(self.response, attr)
+
+    def iter_content(self, chunk_size=1):
+        """Iterates the body bytes, recording them."""
+        self._chunks = self.response.iter_content(chunk_size)
+        return self._spooled(self._chunks)
+
+    def _spooled(self, chunks):
+        """Yields chunks copying them to the temporary file."""
+        for chunk in chunks:
+            self._spool.write(chunk)
+            yield chunk
+
+    def close(self):
+        """Records the response, reading its unread chunks, and closes it."""
+        if not self._recorded:
+            self._recorded = True
+            chunks = self._chunks
+            if chunks is None:
+                chunks = self.response.iter_content(SpoolSize)
+            for chunk in chunks:
+                self._spool.write(chunk)
+            try:
+                self._record(self._spool)
+            finally:
+                self._spool.close()
+        self.response.close()
+
+
+class ReplayTransport(Transport):
+
+    def __init__(self, path, latency=False):
+        """Transport answering requests with the responses recorded by a
+        RecordingTransport, without touching the network.
+
+        Identical requests get the recorded responses in the order they were
+        recorded, the last one being repeated once exhausted.
+
+        Parameters
+        ----------
+        path: str
+            The cassette file path.
+        latency: bool or float
+            False replays at full speed. True sleeps the recorded elapsed time
+            before each response, a float multiplies it.
+        """
+        self.path = path
+        self.latency = float(latency)
+        self._lock = threading.Lock()
+        self._responses = defaultdict(deque)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                self._responses[entry['method'], entry['url']].append(entry)
+
+    def request(self, method, url, **kwargs):
+        """Returns the recorded response for a request."""
+        with self._lock:
+            entries = self._responses.get((method, url))
+            if not entries:
+                raise HelpScoutException(
+                    'No recorded response for %s %s' % (method, url))
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+        if self.latency:
+            time.sleep(entry['elapsed'] * self.latency)
+        return RecordedResponse(
+            entry['status_code'], entry['headers'],
+            entry['body'].encode('latin-1'))
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        return '%s(path="%s", latency=%s)' % (
+            self.__class__.__name__, self.path, self.latency)
+
+    __str__ = __repr__
+
+
+class RecordedResponse:
+
+    def __init__(self, status_code, headers, content):
+        """A recorded response with the requests.Response interface used by
+        the client.
+
+        Parameters
+        ----------
+        status_code: int
+            The http status code.
+        headers: dict
+            The response headers.
+        content: bytes
+            The response body.
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        """True for non error status codes."""
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        """The decoded response body."""
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """Returns the decoded json body."""
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        """Iterates the body bytes in chunks."""
+        chunk_size = chunk_size or len(self.content) or 1
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        """Nothing to release."""
@@ -0,0 +1,242 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+
+from helpscout.exceptions import HelpScoutInvalidSignatureException
+from helpscout.model import HelpScoutObject
+
+
+logger = logging.getLogger('HelpScout')
+SignatureHeader = 'X-HelpScout-Signature'
+EventHeader = 'X-HelpScout-Event'
+AnyEvent = '*'
+EventEndpoints = {
+    'convo': 'conversations',
+    'customer': 'customers',
+    'satisfaction': 'ratings',
+    'tag': 'tags',
+    'user': 'users',
+    'mailbox': 'mailboxes',
+}
+
+
+class HelpScoutWebhook:
+
+    def __init__(self, secret_key):
+        """Receives Help Scout webhooks, verifies their signatures and
+        dispatches the objects sent to the registered handlers.
+
+        More about webhooks here:
+        https://developer.helpscout.com/webhooks/
+
+        Parameters
+        ----------
+        secret_key: str or bytes
+            The secret key set when creating the webhook.
+        """
+        if not isinstance(secret_key, bytes):
+            secret_key = secret_key.encode('utf-8')
+        # Keyed once, copied for every message
+        self._mac = hmac.new(secret_key, digestmod=hashlib.sha1)
+        self._handlers = {}
+
+    def on(self, event=AnyEvent):
+        """Decorator registering a handler for an event. E.g.:
+        > webhook = HelpScoutWebhook(secret_key='asdk12')
+        > @webhook.on('convo.created')
+        > def created(event, conversation):
+        >     print(conversation.id)
+
+        Parameters
+        ----------
+        event: str
+            The event name, like convo.created. '*' handles every event.
+
+        Returns
+        -------
+        callable
+            The decorator, returning the handler unchanged.
+        """
+        def decorator(handler):
+            self.register(event, handler)
+            return handler
+        return decorator
+
+    def register(self, event, handler):
+        """Registers a handler for an event.
+
+        Parameters
+        ----------
+        event: str
+            The event name, like convo.created. '*' handles every event.
+        handler: callable
+            Called with the event name and the received HelpScoutObject.
+        """
+        self._handlers.setdefault(event, []).append(handler)
+
+    def signature(self, body):
+        """Returns the signature Help Scout sends for a body.
+
+        Parameters
+        ----------
+        body: bytes
+            The raw request body.
+
+        Returns
+        -------
+        bytes
+            The base64 encoded HMAC-SHA1 digest of the body.
+        """
+        mac = self._mac.copy()
+        mac.update(body)
+        return base64.b64encode(mac.digest())
+
+    def verify(self, body, signature):
+        """Checks if a signature matches a body.
+
+        Parameters
+        ----------
+        body: bytes
+            The raw request body.
+        signature: str or bytes or None
+            The X-HelpScout-Signature header value.
+
+        Returns
+        -------
+        bool
+        """
+        if not signature:
+            return False
+        if not isinstance(signature, bytes):
+            signature = signature.encode('ascii', 'ignore')
+        return hmac.compare_digest(self.signature(body), signature.strip())
+
+    def parse(self, body, event):
+        """Builds the object sent in a webhook.
+
+        Parameters
+        ----------
+        body: bytes or str
+            The raw request body.
+        event: str
+            The X-HelpScout-Event header value, like convo.created.
+
+        Returns
+        -------
+        HelpScoutObject
+            An object of the same class that get_objects returns for the
+            event's endpoint. E.g.: Conversation for convo.* events.
+        """
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        resource = event.split('.', 1)[0]
+        endpoint = EventEndpoints.get(resource, resource + 's')
+        cls = HelpScoutObject.cls(endpoint, endpoint)
+        return cls(json.loads(body))
+
+    def handle(self, body, signature, event):
+        """Verifies a webhook, parses its object and calls its handlers.
+
+        Parameters
+        ----------
+        body: bytes
+            The raw request body.
+        signature: str or bytes or None
+            The X-HelpScout-Signature header value.
+        event: str
+            The X-HelpScout-Event header value, like convo.created.
+
+        Returns
+        -------
+        list
+            The values returned by the handlers called.
+
+        Raises
+        ------
+        HelpScoutInvalidSignatureException
+            When the signature does not match the body.
+        """
+        if not self.verify(body, signature):
+            raise HelpScoutInvalidSignatureException(event)
+        handlers = (self._handlers.get(event, []) +
+                    self._handlers.get(AnyEvent, []))
+        logger.debug('Webhook: %s (%s handlers)' % (event, len(handlers)))
+        if not handlers:
+            return []
+        obj = self.parse(body, event)
+        return [handler(event, obj) for handler in handlers]
+
+    def wsgi_app(self, environ, start_response):
+        """WSGI application receiving webhooks.
+
+        Responds 401 to invalid signatures and 500 when a handler fails, so
+        Help Scout retries the delivery.
+        """
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length)
+        status = self._status(
+            body, environ.get('HTTP_X_HELPSCOUT_SIGNATURE'),
+            environ.get('HTTP_X_HELPSCOUT_EVENT', ''))
+        start_response(status, [('Content-Type', 'text/plain')])
+        return [status.encode('ascii')]
+
+    async def asgi_app(self, scope, receive, send):
+        """ASGI application receiving webhooks.
+
+        Responds 401 to invalid signatures and 500 when a handler fails, so
+        Help Scout retries the delivery. Lifespan events are acknowledged and
+        other non http scopes ignored.
+        """
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        chunks, more_body = [], True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])}
+        status = self._status(
+            b''.join(chunks), headers.get(SignatureHeader.lower()),
+            headers.get(EventHeader.lower(), ''))
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body',
+                    'body': status.encode('ascii')})
+
+    def _status(self, body, signature, event):
+        """Handles a webhook and returns the http status to respond with."""
+        try:
+            self.handle(body, signature, event)
+        except HelpScoutInvalidSignatureException:
+            logger.warning('Webhook with invalid signature: %s' % event)
+            return '401 Unauthorized'
+        except Exception:
+            logger.exception('Webhook handler failed: %s' % event)
+            return '500 Internal Server Error'
+        return '200 OK'
+
+    def __repr__(self):
+        """Returns the object as a string."""
+        name = self.__class__.__name__
+        events = ', '.join(sorted(self._handlers))
+        return '%s(events=[%s])' % (name, events)
+
+    __str__ = __repr__
@@ -25,11 +25,15 @@ setup(
     license='MIT',
     install_requires=['requests'],
     packages=['helpscout'],
+    entry_points={
+        'console_scripts': ['helpscout-export = helpscout.cli:main'],
+        },
     test_suite='tests',
+    python_requires='>=3.7',
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 3'
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only'
         ]
 )
@@ -0,0 +1,93 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+
+from io import BytesIO
+from unittest import main, TestCase
+from unittest.mock import MagicMock
+
+from helpscout.attachments import (AttachmentDataDecoder, download_attachment,
+                                   download_attachments, upload_attachment)
+from helpscout.exceptions import HelpScoutException
+
+
+class TestAttachments(TestCase):
+
+    data = os.urandom(10000)
+    body = json.dumps({'data': base64.b64encode(data).decode('ascii')})
+
+    def _client(self, body=None, chunk_size=7):
+        body = (self.body if body is None else body).encode('ascii')
+        client = MagicMock()
+        response = client.hit_raw.return_value
+        response.iter_content.side_effect = lambda size: (
+            body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+        return client
+
+    def test_decoder(self):
+        for chunk_size in (1, 3, 4, 5, 1000, 100000):
+            decoder = AttachmentDataDecoder()
+            body = self.body.encode('ascii')
+            decoded = b''.join(
+                decoder.feed(body[i:i + chunk_size])
+                for i in range(0, len(body), chunk_size))
+            decoder.close()
+            self.assertEqual(decoded, self.data)
+
+    def test_decoder_escaped_slashes(self):
+        encoded = base64.b64encode(b'\xff\xff\xff' * 30).decode('ascii')
+        body = '{"data" : "%s"}' % encoded.replace('/', '\\/')
+        decoder = AttachmentDataDecoder()
+        decoded = b''.join(decoder.feed(c.encode()) for c in body)
+        self.assertEqual(decoded, b'\xff\xff\xff' * 30)
+
+    def test_decoder_incomplete(self):
+        decoder = AttachmentDataDecoder()
+        decoder.feed(self.body[:100].encode('ascii'))
+        with self.assertRaises(HelpScoutException):
+            decoder.close()
+
+    def test_download_attachment_file_like(self):
+        client, destination = self._client(), BytesIO()
+        written = download_attachment(client, 1, 2, destination)
+        client.hit_raw.assert_called_once_with(
+            'conversations/1/attachments/2/data', 'get')
+        self.assertEqual(destination.getvalue(), self.data)
+        self.assertEqual(written, len(self.data))
+        self.assertFalse(destination.closed)
+        client.hit_raw.return_value.close.assert_called_once()
+
+    def test_download_attachments_paths(self):
+        directory = tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(directory, str(i)) for i in range(3)]
+            client = self._client()
+            written = download_attachments(
+                client, [(1, i, path) for i, path in enumerate(paths)])
+            self.assertEqual(written, [len(self.data)] * 3)
+            for path in paths:
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), self.data)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_upload_attachment(self):
+        client = MagicMock()
+        source = BytesIO(self.data)
+        source.name = '/tmp/report.pdf'
+        upload_attachment(client, 1, 2, source, chunk_size=100)
+        endpoint, method = client.hit_raw.call_args[0]
+        self.assertEqual(endpoint, 'conversations/1/threads/2/attachments')
+        self.assertEqual(method, 'post')
+        body = client.hit_raw.call_args[1]['data']
+        for _ in range(2):  # Bodies can be rebuilt for retries
+            sent = json.loads(b''.join(body()).decode('ascii'))
+            self.assertEqual(sent['fileName'], 'report.pdf')
+            self.assertEqual(sent['mimeType'], 'application/pdf')
+            self.assertEqual(base64.b64decode(sent['data']), self.data)
+
+
+if __name__ == '__main__':
+    main()
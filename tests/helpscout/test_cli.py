@@ -0,0 +1,125 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from collections import Counter
+from unittest import main, TestCase
+from unittest.mock import MagicMock, patch
+
+from helpscout.cli import HelpScoutExporter, main as cli_main, parse_args
+
+
+class TestCli(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.out = os.path.join(self.directory, 'conversations.ndjson.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _client(self, total_pages=3):
+        client = MagicMock(hooks=[], stats=Counter())
+
+        def hit_raw(endpoint, method, params, stream):
+            page = params['page']
+            objects = [{'id': page * 10 + i} for i in range(2)]
+            response = MagicMock()
+            response.json.return_value = {
+                '_embedded': {'conversations':
+                              objects if page <= total_pages else []},
+                'page': {'number': page, 'totalPages': total_pages}}
+            return response
+
+        client.hit_raw.side_effect = hit_raw
+        return client
+
+    def _read(self):
+        with gzip.open(self.out, 'rt') as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def test_run(self):
+        client = self._client()
+        exporter = HelpScoutExporter(client, 'conversations',
+                                     {'status': 'all'}, self.out,
+                                     concurrency=2)
+        self.assertEqual(exporter.run(), 6)
+        self.assertEqual(self._read(), [10, 11, 20, 21, 30, 31])
+        client.hit_raw.assert_any_call(
+            'conversations', 'get', params={'status': 'all', 'page': 2},
+            stream=False)
+        with open(self.out + '.checkpoint') as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['page'], 3)
+        self.assertEqual(checkpoint['offset'], os.path.getsize(self.out))
+
+    def test_resume(self):
+        page = gzip.compress(b'{"id": 10}\n')
+        with open(self.out + '.checkpoint', 'w') as f:
+            json.dump({'endpoint': 'conversations', 'params': {}, 'page': 2,
+                       'offset': len(page)}, f)
+        with open(self.out, 'wb') as f:  # Killed while writing page 3
+            f.write(page + gzip.compress(b'{"id": 30}\n{"id": 31}\n')[:15])
+        client = self._client()
+        exporter = HelpScoutExporter(client, 'conversations', {}, self.out)
+        self.assertEqual(exporter.run(), 2)
+        self.assertEqual(self._read(), [10, 30, 31])
+        self.assertEqual(client.hit_raw.call_count, 1)
+
+    def test_resume_plain_output(self):
+        out = os.path.join(self.directory, 'conversations.ndjson')
+        with open(out + '.checkpoint', 'w') as f:
+            json.dump({'endpoint': 'conversations', 'params': {}, 'page': 2,
+                       'offset': 11}, f)
+        with open(out, 'w') as f:
+            f.write('{"id": 10}\n{"id": 3')
+        exporter = HelpScoutExporter(self._client(), 'conversations', {}, out)
+        self.assertEqual(exporter.run(), 2)
+        with open(out) as f:
+            self.assertEqual([json.loads(line)['id'] for line in f],
+                             [10, 30, 31])
+
+    def test_resume_missing_output(self):
+        with open(self.out + '.checkpoint', 'w') as f:
+            json.dump({'endpoint': 'conversations', 'params': {}, 'page': 2,
+                       'offset': 30}, f)
+        with patch('helpscout.cli.logger'):
+            exporter = HelpScoutExporter(self._client(), 'conversations', {},
+                                         self.out)
+            self.assertEqual(exporter.run(), 6)
+        self.assertEqual(self._read(), [10, 11, 20, 21, 30, 31])
+
+    def test_checkpoint_of_another_export(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint')
+        with open(checkpoint, 'w') as f:
+            json.dump({'endpoint': 'customers', 'params': {}, 'page': 2}, f)
+        exporter = HelpScoutExporter(self._client(1), 'conversations', {},
+                                     self.out, checkpoint)
+        with patch('helpscout.cli.logger'):
+            self.assertEqual(exporter.run(), 2)
+
+    def test_rate_limited_count(self):
+        exporter = HelpScoutExporter(self._client(), 'conversations', {},
+                                     self.out)
+        exporter._hook('response', {'status_code': 429})
+        exporter._hook('response', {'status_code': 200})
+        self.assertEqual(exporter.rate_limited, 1)
+
+    def test_parse_args(self):
+        args = parse_args(['conversations', '--since', '2019-06-01T00:00:00Z',
+                           '--param', 'status=all', '--concurrency', '8',
+                           '--out', 'data.ndjson.gz'])
+        self.assertEqual(args.endpoint, 'conversations')
+        self.assertEqual(args.param, ['status=all'])
+        self.assertEqual(args.concurrency, 8)
+
+    def test_main_without_credentials(self):
+        with patch.dict(os.environ, {}, clear=True), \
+                patch('helpscout.cli.sys.stderr'):
+            self.assertEqual(cli_main(['users', '--out', self.out]), 2)
+
+
+if __name__ == '__main__':
+    main()
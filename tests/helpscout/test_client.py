@@ -1,11 +1,29 @@
+import gzip
+import json
+import pickle
+
 from functools import partial
+from io import BytesIO
+from threading import Event, Thread
 from unittest import main, TestCase
 from unittest.mock import call, MagicMock, patch, PropertyMock
 
-from helpscout.client import EmbeddedKey, HelpScout, HelpScoutEndpointRequester
-from helpscout.exceptions import (HelpScoutException,
+from requests import Response
+from requests.exceptions import Timeout
+
+from helpscout.client import (EmbeddedKey, HelpScout,
+                              HelpScoutEndpointRequester, PageKey,
+                              transfer_sizes)
+from helpscout.concurrency import Deadline
+from helpscout.exceptions import (HelpScoutCircuitOpenException,
+                                  HelpScoutException,
                                   HelpScoutAuthenticationException,
-                                  HelpScoutRateLimitExceededException)
+                                  HelpScoutRateLimitExceededException,
+                                  HelpScoutTimeoutException)
+from helpscout.mirror import HelpScoutMirror
+from helpscout.model import HelpScoutObject, IdentityMap
+from helpscout.resilience import CircuitBreaker, HedgingPolicy
+from helpscout.transport import RequestsTransport
 
 
 class TestClient(TestCase):
@@ -41,7 +59,8 @@ class TestClient(TestCase):
             hit.return_value = hit_return = 9
             hs.get_objects(endpoint, params=params)
             HelpScoutObject.cls.assert_called_with(endpoint, endpoint)
-            hit.assert_called_with(endpoint, 'get', None, params=params)
+            hit.assert_called_with(endpoint, 'get', None, params=params,
+                                   fields=None, exclude=None, deadline=None)
             cls.from_results.assert_called_with(hit_return)
 
     def test_get_objects_str_params(self):
@@ -53,7 +72,8 @@ class TestClient(TestCase):
             hit.return_value = hit_return = 9
             hs.get_objects(endpoint, params=params)
             HelpScoutObject.cls.assert_called_with(endpoint, endpoint)
-            hit.assert_called_with(endpoint, 'get', None, params=params)
+            hit.assert_called_with(endpoint, 'get', None, params=params,
+                                   fields=None, exclude=None, deadline=None)
             cls.from_results.assert_called_with(hit_return)
 
     def test_get_objects_no_params(self):
@@ -65,7 +85,8 @@ class TestClient(TestCase):
             hit.return_value = hit_return = 9
             hs.get_objects(endpoint, params)
             HelpScoutObject.cls.assert_called_with(endpoint, endpoint)
-            hit.assert_called_with(endpoint, 'get', None, params=params)
+            hit.assert_called_with(endpoint, 'get', None, params=params,
+                                   fields=None, exclude=None, deadline=None)
             cls.from_results.assert_called_with(hit_return)
 
     def test_get_objects_resource_id(self):
@@ -79,10 +100,136 @@ class TestClient(TestCase):
             hit.return_value = hit_return = user
             data = hs.get_objects(endpoint, resource_id=resource_id)
             HelpScoutObject.cls.assert_called_with(endpoint, endpoint)
-            hit.assert_called_with(endpoint, 'get', 10, params=None)
+            hit.assert_called_with(endpoint, 'get', 10, params=None,
+                                   fields=None, exclude=None, deadline=None)
             cls.from_results.assert_called_with(hit_return)
             self.assertEqual(data, user)
 
+    def test_get_objects_fields(self):
+        endpoint, fields, exclude = 'users', ['id', 'name'], ['_links']
+        hs = self._get_client()
+        with patch('helpscout.client.HelpScoutObject') as HelpScoutObject, \
+                patch('helpscout.client.HelpScout.hit_') as hit:
+            HelpScoutObject.cls.return_value = cls = MagicMock()
+            hit.return_value = hit_return = 9
+            hs.get_objects(endpoint, fields=fields, exclude=exclude)
+            hit.assert_called_with(endpoint, 'get', None, params=None,
+                                   fields=fields, exclude=exclude,
+                                   deadline=None)
+            cls.from_results.assert_called_with(hit_return)
+
+    def test_get_objects_embed_inline(self):
+        hs = self._get_client()
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.return_value = iter([])
+            hs.get_objects('conversations', params={'status': 'all'},
+                           embed=['threads'])
+            hit.assert_called_with(
+                'conversations', 'get', None,
+                params={'status': 'all', 'embed': 'threads'}, fields=None,
+                exclude=None, deadline=None)
+            hit.return_value = iter([])
+            hs.get_objects('conversations', params='status=all',
+                           embed=['threads'])
+            self.assertEqual(hit.call_args[1]['params'],
+                             'status=all&embed=threads')
+
+    def test_get_objects_embed_related(self):
+        hs = self._get_client()
+        conversations = {'conversations': [
+            {'id': 1, 'primaryCustomer': {'id': 7}, 'assignee': {'id': 3}},
+            {'id': 2, 'primaryCustomer': {'id': 7}},
+            {'id': 3, 'primaryCustomer': {'id': 8}},
+        ]}
+
+        def hit_(endpoint, method, resource_id=None, **kwargs):
+            if endpoint == 'conversations':
+                return iter([conversations])
+            if resource_id == 8:
+                raise HelpScoutException('Not found')
+            return iter([{'id': resource_id, 'firstName': 'Jo'}])
+
+        with patch('helpscout.client.HelpScout.hit_') as hit, \
+                patch('helpscout.client.logger'):
+            hit.side_effect = hit_
+            ret = hs.get_objects('conversations',
+                                 embed=['customers', 'users'])
+        customer_calls = [call for call in hit.call_args_list
+                          if call[0][0] == 'customers']
+        self.assertEqual(sorted(call[0][2] for call in customer_calls),
+                         [7, 8])
+        self.assertEqual(ret[0].primaryCustomer.__class__.__name__,
+                         'Customer')
+        self.assertIs(ret[0].primaryCustomer.firstName, 'Jo')
+        self.assertEqual(ret[1].primaryCustomer.id, 7)
+        self.assertEqual(ret[2].primaryCustomer, {'id': 8})
+        self.assertEqual(ret[0].assignee.__class__.__name__, 'User')
+
+    def test_get_objects_embed_unknown(self):
+        hs = self._get_client()
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.return_value = iter([{'id': 1}])
+            with self.assertRaises(HelpScoutException):
+                hs.get_objects('mailboxes', embed=['threads'])
+            hit.assert_not_called()
+
+    def test_get_objects_embed_deadline(self):
+        hs = self._get_client()
+
+        def hit_(endpoint, method, resource_id=None, deadline=None,
+                 **kwargs):
+            if endpoint == 'conversations':
+                return iter([{'id': 1, 'primaryCustomer': {'id': 7}}])
+            raise deadline.exception('Deadline exceeded')
+
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.side_effect = hit_
+            with self.assertRaises(HelpScoutTimeoutException):
+                hs.get_objects('conversations', deadline=5,
+                               embed=['customers'])
+        deadlines = [call[1]['deadline'] for call in hit.call_args_list]
+        self.assertIsInstance(deadlines[0], Deadline)
+        self.assertEqual(deadlines, [deadlines[0]] * 2)
+
+    def test_get_objects_embed_mirrored(self):
+        hs = self._get_client()
+        hs.mirror = HelpScoutMirror()
+        hs.mirror.store('conversations',
+                        [{'id': 1, 'primaryCustomer': {'id': 7}}])
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.return_value = iter([{'id': 7, 'firstName': 'Jo'}])
+            ret = hs.conversations[1].get(embed=['customers'])
+        hit.assert_called_once_with('customers', 'get', 7, params=None,
+                                    fields=None, exclude=None,
+                                    deadline=None)
+        self.assertEqual(ret.primaryCustomer.__class__.__name__, 'Customer')
+        self.assertEqual(ret.primaryCustomer.firstName, 'Jo')
+
+    def test_hit_fields_and_exclude(self):
+        endpoint, method = 'users', 'get'
+        hs_path = 'helpscout.client.HelpScout.'
+        hs = self._get_client(token='abc')
+        with patch('helpscout.client.requests') as requests, \
+                patch('helpscout.client.logger'), \
+                patch(hs_path + '_authentication_headers'), \
+                patch(hs_path + '_results_with_pagination') as pages:
+            # Setup
+            response = requests.get.return_value = MagicMock()
+            response.ok, response.status_code = True, 200
+            pages.return_value = [
+                {'users': [{'id': 1, 'name': 'Mike', '_links': {}, 'x': 1},
+                           {'id': 2, 'name': 'Kate', '_links': {}}]},
+                {'id': 3, 'name': 'Matt', '_links': {}},
+            ]
+            ret = list(hs.hit_(endpoint, method, fields=['id', 'name', 'x'],
+                               exclude=['x']))
+            # Asserts
+            self.assertEqual(
+                ret,
+                [{'users': [{'id': 1, 'name': 'Mike'},
+                            {'id': 2, 'name': 'Kate'}]},
+                 {'id': 3, 'name': 'Matt'}])
+
     def test_hit_no_access_token_ok(self):
         endpoint, method = 'users', 'get'
         full_url = self.url + endpoint
@@ -105,7 +252,7 @@ class TestClient(TestCase):
             requests.get.assert_called_once_with(
                 full_url, headers=headers, json=None)
             response.json.assert_called_once()
-            pages.assert_called_once_with(json_response, method)
+            pages.assert_called_once_with(json_response, method, None)
 
     def test_hit_ok(self):
         endpoint, method = 'users', 'get'
@@ -137,7 +284,7 @@ class TestClient(TestCase):
             requests.get.assert_called_once_with(
                 full_url, headers=headers, json=None)
             response.json.assert_called_once()
-            pages.assert_called_once_with(json_response, method)
+            pages.assert_called_once_with(json_response, method, None)
 
     def test_hit_resource_id_ok(self):
         endpoint, method, resource_id = 'users', 'get', 4
@@ -203,7 +350,7 @@ class TestClient(TestCase):
             requests.get.assert_called_once_with(
                 full_url, headers=headers, json=None)
             response.json.assert_called_once()
-            pages.assert_called_once_with(json_response, method)
+            pages.assert_called_once_with(json_response, method, None)
 
     def test_hit_resource_id_with_params_dict_ok(self):
         params, params_str = {'embed': 'threads'}, '?embed=threads'
@@ -406,7 +553,7 @@ class TestClient(TestCase):
                 requests.get.call_args_list,
                 [call(full_url, headers=headers, json=None) for _ in range(2)])
             response.json.assert_called_once()
-            pages.assert_called_once_with(json_response, method)
+            pages.assert_called_once_with(json_response, method, None)
             auth.assert_called_once()
 
     def test_hit_rate_limit_exceeded(self):
@@ -442,7 +589,7 @@ class TestClient(TestCase):
                 requests.get.call_args_list,
                 [call(full_url, headers=headers, json=None) for _ in range(2)])
             response.json.assert_called_once()
-            pages.assert_called_once_with(json_response, method)
+            pages.assert_called_once_with(json_response, method, None)
             rate_limit.assert_called_once()
             auth.assert_not_called()
 
@@ -483,6 +630,46 @@ class TestClient(TestCase):
             rate_limit.assert_not_called()
             auth.assert_not_called()
 
+    def test_hit_raw_ok(self):
+        hs = self._get_client(token='abc')
+        with patch('helpscout.client.requests') as requests, \
+                patch('helpscout.client.logger'):
+            response = requests.get.return_value = MagicMock(
+                ok=True, status_code=200)
+            ret = hs.hit_raw('users', 'get', 4, params={'a': 1})
+            self.assertIs(ret, response)
+            requests.get.assert_called_once_with(
+                self.url + 'users/4?a=1',
+                headers=hs._authentication_headers(), stream=True, json=None)
+            response.json.assert_not_called()
+
+    def test_hit_raw_retries_with_rebuilt_body(self):
+        hs_path = 'helpscout.client.HelpScout.'
+        hs = self._get_client(token='abc')
+        body = MagicMock(side_effect=[iter([b'1']), iter([b'2'])])
+        with patch('helpscout.client.requests') as requests, \
+                patch('helpscout.client.logger'), \
+                patch(hs_path + '_authenticate') as auth, \
+                patch(hs_path + '_handle_rate_limit_exceeded') as rate_limit:
+            responses = [MagicMock(ok=False, status_code=401),
+                         MagicMock(ok=True, status_code=201)]
+            requests.post.side_effect = responses
+            ret = hs.hit_raw('users', 'post', data=body)
+            self.assertIs(ret, responses[1])
+            self.assertEqual(body.call_count, 2)
+            auth.assert_called_once_with('abc', None)
+            rate_limit.assert_not_called()
+            responses[0].close.assert_called_once()
+
+    def test_hit_raw_exception(self):
+        hs = self._get_client(token='abc')
+        with patch('helpscout.client.requests') as requests, \
+                patch('helpscout.client.logger'):
+            requests.get.return_value = MagicMock(
+                ok=False, status_code=500, text='error')
+            with self.assertRaises(HelpScoutException):
+                hs.hit_raw('users', 'get')
+
     def test_pagination_no_embedded(self):
         response = {'msg': 'welcome to help scout'}
         hs = self._get_client(token='abc')
@@ -793,6 +980,292 @@ class TestClient(TestCase):
             response.json.assert_not_called()
             self.assertEqual(hs.access_token, None)
 
+    def test_authenticate_expires_in(self):
+        hs = self._get_client()
+        with patch('helpscout.client.requests') as requests, \
+                patch('helpscout.client.logger'), \
+                patch('helpscout.client.time') as time:
+            # Setup
+            time.time.return_value = 1000
+            response = requests.post.return_value = MagicMock(ok=True)
+            response.json.return_value = {
+                'access_token': 'kakaroto', 'expires_in': 7200}
+            hs._authenticate()
+            # Asserts
+            self.assertEqual(hs.access_token_expiration, 8140)
+            self.assertFalse(hs._token_expired())
+            time.time.return_value = 8140
+            self.assertTrue(hs._token_expired())
+
+    def test_authenticate_token_already_replaced(self):
+        hs = self._get_client(token='new')
+        with patch('helpscout.client.requests') as requests:
+            hs._authenticate('old')
+            requests.post.assert_not_called()
+            self.assertEqual(hs.access_token, 'new')
+
+    def test_authenticate_once_for_concurrent_expirations(self):
+        hs = self._get_client(token='old')
+        with patch('helpscout.client.requests') as requests, \
+                patch('helpscout.client.logger'):
+            # Setup
+            response = requests.post.return_value = MagicMock(ok=True)
+            response.json.return_value = {'access_token': 'new'}
+            threads = [Thread(target=hs._authenticate, args=('old',))
+                       for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # Asserts
+            requests.post.assert_called_once()
+            self.assertEqual(hs.access_token, 'new')
+
+    def test_pool_size_transport(self):
+        hs = HelpScout('app_id', 'app_secret', pool_size=8)
+        self.assertIsInstance(hs.transport, RequestsTransport)
+        self.assertEqual(hs.transport.pool_size, 8)
+        with patch.object(hs.transport, 'session') as session, \
+                patch('helpscout.client.requests') as requests:
+            session.request.return_value = MagicMock(content=b'')
+            hs._send('get', 'http://helpscout.com/api/users', headers={})
+            session.request.assert_called_once_with(
+                'get', 'http://helpscout.com/api/users', headers={})
+            requests.get.assert_not_called()
+
+    def test_send_transport(self):
+        transport = MagicMock()
+        transport.request.return_value = response = MagicMock(content=b'ab')
+        hs = HelpScout('app_id', 'app_secret', transport=transport)
+        self.assertIs(hs._send('get', 'url', headers={}), response)
+        transport.request.assert_called_once_with('get', 'url', headers={})
+        self.assertEqual(hs.stats['decoded_bytes'], 2)
+
+    def test_send_rate_limiter(self):
+        transport, rate_limiter = MagicMock(), MagicMock()
+        transport.request.return_value = MagicMock(content=b'')
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       rate_limiter=rate_limiter)
+        hs._send('get', 'url', headers={})
+        rate_limiter.acquire.assert_called_once_with(None, None)
+
+    def test_send_rate_limiter_deadline(self):
+        transport, rate_limiter = MagicMock(), MagicMock()
+        rate_limiter.acquire.return_value = None
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       rate_limiter=rate_limiter, priority='bulk')
+        with self.assertRaises(HelpScoutTimeoutException):
+            hs._send('get', 'url', headers={}, deadline=Deadline(5))
+        priority, timeout = rate_limiter.acquire.call_args[0]
+        self.assertEqual(priority, 'bulk')
+        self.assertTrue(4 < timeout <= 5)
+        transport.request.assert_not_called()
+
+    def test_authenticate_lock_deadline(self):
+        hs = self._get_client()
+        hs._auth_lock.acquire()  # Another thread authenticating
+        with self.assertRaises(HelpScoutTimeoutException):
+            hs._authenticate(deadline=Deadline(0.01))
+        hs._auth_lock.release()
+
+    def test_send_timeout(self):
+        transport = MagicMock()
+        transport.request.return_value = MagicMock(content=b'')
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       timeout=(3, 20))
+        hs._send('get', 'url', headers={})
+        transport.request.assert_called_once_with(
+            'get', 'url', headers={}, timeout=(3, 20))
+        hs._send('get', 'url', headers={}, deadline=Deadline(5))
+        connect, read = transport.request.call_args[1]['timeout']
+        self.assertEqual(connect, 3)
+        self.assertTrue(4 < read <= 5)
+
+    def test_send_timed_out(self):
+        transport = MagicMock()
+        transport.request.side_effect = Timeout('read timeout')
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       timeout=1)
+        with self.assertRaises(HelpScoutTimeoutException):
+            hs._send('get', 'url', headers={})
+
+    def test_send_deadline_exceeded(self):
+        transport = MagicMock()
+        hs = HelpScout('app_id', 'app_secret', transport=transport)
+        with self.assertRaises(HelpScoutTimeoutException):
+            hs._send('get', 'url', headers={}, deadline=Deadline(-1))
+        transport.request.assert_not_called()
+
+    def test_pagination_deadline_progress(self):
+        hs = self._get_client(token='abc')
+        first = {EmbeddedKey: [1], PageKey: {},
+                 '_links': {'next': {'href': 'page2'}}}
+        second = {EmbeddedKey: [2], PageKey: {},
+                  '_links': {'next': {'href': 'page3'}}}
+        deadline = Deadline(60)
+        with patch('helpscout.client.HelpScout._send') as send, \
+                patch('helpscout.client.logger'):
+            def respond(method, url, deadline, **kwargs):
+                if url == 'page3':
+                    deadline.expiration = 0
+                    deadline.check('%s %s' % (method, url))
+                return MagicMock(ok=True, json=MagicMock(return_value=second))
+            send.side_effect = respond
+            items = hs._results_with_pagination(first, 'get', deadline)
+            self.assertEqual([next(items), next(items)], [1, 2])
+            with self.assertRaises(HelpScoutTimeoutException) as context:
+                next(items)
+        self.assertEqual(context.exception.pages, 2)
+        self.assertEqual(context.exception.next_page, 'page3')
+
+    def test_rate_limit_sleep_exceeds_deadline(self):
+        hs = self._get_client()
+        with patch('helpscout.client.time.sleep') as sleep, \
+                patch('helpscout.client.logger'):
+            with self.assertRaises(HelpScoutTimeoutException):
+                hs._handle_rate_limit_exceeded(Deadline(self.seconds - 1))
+            sleep.assert_not_called()
+
+    def test_send_hedged(self):
+        slow, fast = MagicMock(content=b''), MagicMock(content=b'')
+        released = Event()
+
+        def request(method, url, **kwargs):
+            if transport.request.call_count == 1:
+                released.wait(5)
+                return slow
+            return fast
+
+        transport = MagicMock()
+        transport.request.side_effect = request
+        hedging = HedgingPolicy(max_delay=0.01)
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       hedging=hedging)
+        self.assertIs(hs._send('get', 'url', headers={}), fast)
+        released.set()
+        self.assertEqual(hs.stats['hedges'], 1)
+        self.assertEqual(hs.stats['hedge_wins'], 1)
+        self.assertEqual(transport.request.call_count, 2)
+        hs._hedge_executor.shutdown()
+        slow.close.assert_called_once()
+        # Only GET requests are hedged
+        transport.request.side_effect = None
+        transport.request.return_value = fast
+        hs._send('post', 'url', headers={})
+        self.assertEqual(transport.request.call_count, 3)
+        self.assertEqual(hs.stats['hedges'], 1)
+
+    def test_send_hedged_fast_response(self):
+        transport = MagicMock()
+        transport.request.return_value = response = MagicMock(content=b'')
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       hedging=HedgingPolicy(max_delay=5))
+        self.assertIs(hs._send('get', 'url', headers={}), response)
+        transport.request.assert_called_once_with('get', 'url', headers={})
+        self.assertEqual(hs.stats['hedges'], 0)
+
+    def test_send_hedged_queued(self):
+        transport = MagicMock()
+        transport.request.return_value = response = MagicMock(content=b'')
+        hs = HelpScout('app_id', 'app_secret', transport=transport,
+                       hedging=HedgingPolicy(max_delay=0.01, max_workers=1))
+        released = Event()
+        busy = hs._hedge_executor.submit(released.wait, 5)
+        ret = []
+        thread = Thread(target=lambda: ret.append(
+            hs._send('get', 'url', headers={})))
+        thread.start()
+        thread.join(0.1)  # Waits for a thread longer than the delay
+        released.set()
+        thread.join(5)
+        busy.result()
+        self.assertEqual(ret, [response])
+        transport.request.assert_called_once_with('get', 'url', headers={})
+        self.assertEqual(hs.stats['hedges'], 0)
+        hs._hedge_executor.shutdown()
+
+    def test_hedge_workers(self):
+        hs = HelpScout('app_id', 'app_secret', pool_size=20,
+                       hedging=HedgingPolicy())
+        self.assertEqual(hs._hedge_executor._max_workers, 40)
+        hs = HelpScout('app_id', 'app_secret', pool_size=20,
+                       hedging=HedgingPolicy(max_workers=4))
+        self.assertEqual(hs._hedge_executor._max_workers, 4)
+
+    def test_send_circuit_breaker(self):
+        hook = MagicMock()
+        transport = MagicMock()
+        transport.request.return_value = MagicMock(content=b'',
+                                                   status_code=503)
+        breaker = CircuitBreaker(window=2, min_requests=2)
+        hs = HelpScout('app_id', 'app_secret', base_url=self.url,
+                       transport=transport, circuit_breaker=breaker,
+                       hooks=[hook])
+        url = self.url + 'conversations/1/threads'
+        hs._send('get', url, headers={})
+        transport.request.side_effect = Timeout()
+        with self.assertRaises(HelpScoutTimeoutException):
+            hs._send('get', url, headers={})
+        self.assertEqual(breaker.state('conversations'), 'open')
+        hook.assert_any_call('circuit_state', {
+            'endpoint': 'conversations', 'state': 'open',
+            'previous': 'closed'})
+        with self.assertRaises(HelpScoutCircuitOpenException):
+            hs._send('get', self.url + 'conversations?page=2', headers={})
+        self.assertEqual(transport.request.call_count, 2)
+
+    def test_send_compression(self):
+        hs = HelpScout('app_id', 'app_secret', compression=True,
+                       request_compression_threshold=10)
+        with patch('helpscout.client.requests') as requests:
+            requests.get.return_value = MagicMock(content=b'abc')
+            hs._send('get', 'url', headers={'a': 'b'}, json={'x': 'y' * 20})
+            args, kwargs = requests.get.call_args
+            self.assertNotIn('json', kwargs)
+            self.assertIn('gzip', kwargs['headers']['Accept-Encoding'])
+            self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+            self.assertEqual(kwargs['headers']['a'], 'b')
+            self.assertEqual(json.loads(gzip.decompress(kwargs['data'])),
+                             {'x': 'y' * 20})
+            self.assertEqual(hs.stats['sent_bytes'], len(kwargs['data']))
+
+    def test_send_small_body_not_compressed(self):
+        hs = HelpScout('app_id', 'app_secret',
+                       request_compression_threshold=1000)
+        with patch('helpscout.client.requests') as requests:
+            requests.post.return_value = MagicMock(content=b'')
+            hs._send('post', 'url', headers={}, json={'x': 'y'})
+            requests.post.assert_called_once_with(
+                'url', headers={}, json={'x': 'y'})
+            self.assertEqual(hs.stats['sent_bytes'], len('{"x": "y"}'))
+
+    def test_send_stats_and_hooks(self):
+        hook = MagicMock()
+        hs = HelpScout('app_id', 'app_secret', hooks=[hook])
+        with patch('helpscout.client.requests') as requests:
+            response = requests.get.return_value = MagicMock(
+                status_code=200, content=b'0123456789')
+            response.raw.tell.return_value = 4
+            hs._send('get', 'url', headers={})
+            hs._send('get', 'url', headers={})
+        self.assertEqual(hs.stats['requests'], 2)
+        self.assertEqual(hs.stats['received_bytes'], 8)
+        self.assertEqual(hs.stats['decoded_bytes'], 20)
+        event, info = hook.call_args[0]
+        self.assertEqual(event, 'response')
+        self.assertEqual(info['received_bytes'], 4)
+        self.assertEqual(info['decoded_bytes'], 10)
+        self.assertEqual(info['status_code'], 200)
+
+    def test_transfer_sizes(self):
+        response = Response()
+        response._content = b'0123456789'
+        response.headers['Content-Length'] = '6'
+        response.raw = BytesIO()
+        self.assertEqual(transfer_sizes(response), (6, 10))
+        del response.headers['Content-Length']
+        self.assertEqual(transfer_sizes(response), (10, 10))
+
     def test_authentication_headers(self):
         token = 'kakaroto'
         expected = {
@@ -811,6 +1284,35 @@ class TestClient(TestCase):
             logger.warning.assert_called_with('Rate limit exceeded.')
             time.sleep.assert_called_with(self.seconds)
 
+    def test_handle_rate_limit_exceeded_shared_sleep(self):
+        hs = self._get_client()
+        sleeping, waiting, wake_up = Event(), Event(), Event()
+        real_lock, lock = hs._rate_limit_lock, MagicMock()
+        lock.__enter__.side_effect = lambda: (
+            waiting.set() if sleeping.is_set() else None, real_lock.acquire())
+        lock.__exit__.side_effect = lambda *args: real_lock.release()
+
+        def sleep(seconds):
+            sleeping.set()
+            wake_up.wait()
+
+        with patch('helpscout.client.time') as time, \
+                patch('helpscout.client.logger'), \
+                patch.object(hs, '_rate_limit_lock', lock):
+            time.sleep.side_effect = sleep
+            first = Thread(target=hs._handle_rate_limit_exceeded)
+            first.start()
+            sleeping.wait()
+            self.assertFalse(hs._rate_limit_clear.is_set())
+            second = Thread(target=hs._handle_rate_limit_exceeded)
+            second.start()
+            waiting.wait()
+            wake_up.set()
+            first.join()
+            second.join()
+            time.sleep.assert_called_once_with(self.seconds)
+            self.assertTrue(hs._rate_limit_clear.is_set())
+
     def test_handle_rate_limit_exceeded_exception(self):
         hs = self._get_client(sleep=False)
         with patch('helpscout.client.time') as time, \
@@ -829,7 +1331,8 @@ class TestClient(TestCase):
             hit.return_value = hit_return = 9
             getattr(hs, endpoint).get(params=params)
             HelpScoutObject.cls.assert_called_with(endpoint, endpoint)
-            hit.assert_called_with(endpoint, 'get', None, params=params)
+            hit.assert_called_with(endpoint, 'get', None, params=params,
+                                   fields=None, exclude=None, deadline=None)
             cls.from_results.assert_called_with(hit_return)
 
     def test_getattr_requester_delete_resource_id(self):
@@ -882,6 +1385,63 @@ class TestClient(TestCase):
         self.assertEqual(tags_requester.client, hs)
         self.assertEqual(tags_requester.endpoint, 'conversations/910/tags')
 
+    def test_identity_map_skipped_for_projections(self):
+        hs = HelpScout(self.app_id, self.app_secret, self.url,
+                       identity_map=IdentityMap())
+        hs.access_token = 'token'
+        customer = {'id': 7, 'firstName': 'Kate', 'lastName': 'Doe'}
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.side_effect = lambda *args, **kwargs: iter(
+                [HelpScoutObject.project(customer, kwargs['fields'],
+                                         kwargs['exclude'])])
+            partial_customer = hs.get_objects('customers', 7, fields=['id'])
+            full = hs.get_objects('customers', 7)
+            again = hs.get_objects('customers', 7)
+        self.assertEqual(partial_customer._attrs, ('id',))
+        self.assertEqual(full.lastName, 'Doe')
+        self.assertIs(again, full)
+
+    def test_paginate(self):
+        hs = self._get_client(token='token')
+        self.assertEqual(list(hs.paginate({'id': 1})), [{'id': 1}])
+        first = {'_embedded': {'users': [{'id': 1}]}, 'page': {},
+                 '_links': {'next': {'href': self.url + 'users?page=2'}}}
+        second = {'_embedded': {'users': [{'id': 2}]}, 'page': {},
+                  '_links': {}}
+        with patch('helpscout.client.requests') as requests:
+            requests.get.return_value = MagicMock(
+                ok=True, status_code=200, json=MagicMock(return_value=second))
+            ret = list(hs.paginate(first, deadline=5))
+        self.assertEqual(ret, [{'users': [{'id': 1}]}, {'users': [{'id': 2}]}])
+
+    def test_getattr_private_names(self):
+        hs = self._get_client()
+        with self.assertRaises(AttributeError):
+            hs.__getstate_helper__
+        with self.assertRaises(AttributeError):
+            hs.conversations._private
+
+    def test_pickle(self):
+        hs = HelpScout(self.app_id, self.app_secret, self.url, pool_size=2,
+                       coalesce_requests=True, timeout=5, hooks=[print])
+        hs.access_token, hs.access_token_expiration = 'token', 123.5
+        copy = pickle.loads(pickle.dumps(hs))
+        self.assertEqual(copy, hs)
+        self.assertEqual(copy.access_token, 'token')
+        self.assertEqual(copy.access_token_expiration, 123.5)
+        self.assertEqual(copy.timeout, 5)
+        self.assertIsInstance(copy.transport, RequestsTransport)
+        self.assertIsNot(copy.transport, hs.transport)
+        self.assertIsNotNone(copy._single_flight)
+        self.assertEqual(copy.hooks, [])
+
+    def test_pickle_requester(self):
+        hs = self._get_client(token='token')
+        requester = pickle.loads(pickle.dumps(hs.conversations[910]))
+        self.assertIsInstance(requester, HelpScoutEndpointRequester)
+        self.assertEqual(requester.endpoint, 'conversations/910')
+        self.assertEqual(requester.client.access_token, 'token')
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,196 @@
+from threading import Event, Thread
+from time import sleep
+from unittest import main, TestCase
+from unittest.mock import MagicMock, patch
+
+from helpscout.client import HelpScout
+from helpscout.concurrency import (Deadline, HelpScoutProcessPool, prefetch,
+                                   SingleFlight)
+from helpscout.exceptions import HelpScoutTimeoutException
+from helpscout.ratelimit import RateLimiter
+
+
+class TestSingleFlight(TestCase):
+
+    def test_do(self):
+        single_flight = SingleFlight()
+        function = MagicMock(return_value=3)
+        self.assertEqual(single_flight.do('key', function, 1, a=2), 3)
+        function.assert_called_once_with(1, a=2)
+        self.assertEqual(single_flight.in_flight(), 0)
+
+    def test_do_concurrent_calls_share_result(self):
+        single_flight = SingleFlight()
+        started, release = Event(), Event()
+        results, calls = [], []
+
+        def function():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'result'
+
+        leader = Thread(
+            target=lambda: results.append(single_flight.do('k', function)))
+        leader.start()
+        started.wait()
+        followers = [
+            Thread(target=lambda: results.append(
+                single_flight.do('k', function)))
+            for _ in range(5)]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['result'] * 6)
+
+    def test_do_exception(self):
+        single_flight = SingleFlight()
+        function = MagicMock(side_effect=ValueError('boom'))
+        with self.assertRaises(ValueError):
+            single_flight.do('key', function)
+        self.assertEqual(single_flight.in_flight(), 0)
+        function.side_effect = None
+        function.return_value = 1
+        self.assertEqual(single_flight.do('key', function), 1)
+
+    def test_client_coalesce_requests(self):
+        hs = HelpScout('app_id', 'app_secret', coalesce_requests=True)
+        with patch('helpscout.client.HelpScout._get_objects') as get_objects:
+            get_objects.return_value = results = [1, 2]
+            ret = hs.get_objects('users', params={'a': 1})
+            get_objects.assert_called_once_with(
+                'users', None, {'a': 1}, False, None, None, None, None)
+            self.assertEqual(ret, results)
+            self.assertIsNot(ret, results)
+
+    def test_client_coalesce_requests_list_params(self):
+        hs = HelpScout('app_id', 'app_secret', coalesce_requests=True)
+        with patch('helpscout.client.HelpScout._get_objects') as get_objects:
+            get_objects.return_value = [1]
+            ret = hs.get_objects('conversations', params={'tag': ['x']},
+                                 fields=['id', 'tags'], embed=['threads'])
+            get_objects.assert_called_once_with(
+                'conversations', None, {'tag': ['x']}, False, ['id', 'tags'],
+                None, ['threads'], None)
+            self.assertEqual(ret, [1])
+
+
+class TestPrefetch(TestCase):
+
+    def test_prefetch(self):
+        self.assertEqual(list(prefetch(iter(range(10)), 3)), list(range(10)))
+
+    def test_prefetch_empty(self):
+        self.assertEqual(list(prefetch(iter([]), 3)), [])
+
+    def test_prefetch_exception(self):
+        def produce():
+            yield 1
+            raise ValueError('boom')
+        items = prefetch(produce(), 2)
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(ValueError):
+            next(items)
+
+    def test_prefetch_bounded(self):
+        produced = []
+
+        def produce():
+            for i in range(100):
+                produced.append(i)
+                yield i
+        items = prefetch(produce(), 2)
+        self.assertEqual(next(items), 0)
+        sleep(0.3)
+        # 1 consumed + 2 buffered + 1 waiting to be buffered
+        self.assertLessEqual(len(produced), 4)
+        items.close()
+
+    def test_client_prefetch_pages(self):
+        hs = HelpScout('app_id', 'app_secret', prefetch_pages=2)
+        hs.access_token = 'abc'
+        first = {'_embedded': [{'id': 1}], 'page': {},
+                 '_links': {'next': {'href': 'http://helpscout.com/2'}}}
+        second = {'_embedded': [{'id': 2}, {'id': 3}], 'page': {},
+                  '_links': {'next': None}}
+        with patch('helpscout.client.requests') as requests:
+            requests.get.return_value = MagicMock(
+                ok=True, status_code=200,
+                json=MagicMock(return_value=second))
+            ret = list(hs._results_with_pagination(first, 'get'))
+        self.assertEqual(ret, [{'id': 1}, {'id': 2}, {'id': 3}])
+
+
+def _token(client, suffix):
+    return '%s-%s' % (client.access_token, suffix)
+
+
+def _acquire(client, _):
+    return client.rate_limiter.acquire(None, 0)
+
+
+class TestProcessPool(TestCase):
+
+    def test_map_warm_token(self):
+        hs = HelpScout('app_id', 'app_secret')
+        with patch.object(hs, '_authenticate') as authenticate:
+            authenticate.side_effect = lambda token: setattr(
+                hs, 'access_token', 'warm')
+            with HelpScoutProcessPool(hs, 2) as pool:
+                ret = list(pool.map(_token, [1, 2, 3]))
+        authenticate.assert_called_once_with(None)
+        self.assertEqual(ret, ['warm-1', 'warm-2', 'warm-3'])
+
+    def test_get_objects(self):
+        hs = HelpScout('app_id', 'app_secret')
+        hs.access_token, hs.access_token_expiration = 'token', 1e12
+        pool = HelpScoutProcessPool(hs, 1)
+        with patch.object(pool, 'map') as map:
+            map.side_effect = lambda function, *iterables: [
+                function(hs, *args) for args in zip(*iterables)]
+            with patch.object(hs, 'get_objects') as get_objects:
+                get_objects.side_effect = lambda *args, **kwargs: args
+                ret = pool.get_objects('conversations', [1, 2], fields='id')
+                self.assertEqual(
+                    ret, [('conversations', 1), ('conversations', 2)])
+                get_objects.assert_called_with(
+                    'conversations', 2, fields='id')
+                ret = pool.get_objects('conversations/{}/threads', [3])
+                self.assertEqual(ret, [('conversations/3/threads',)])
+        pool.shutdown()
+
+    def test_map_shared_rate_limiter(self):
+        hs = HelpScout('app_id', 'app_secret',
+                       rate_limiter=RateLimiter(rate=0.01, burst=2))
+        hs.access_token, hs.access_token_expiration = 'token', 1e12
+        with HelpScoutProcessPool(hs, 2) as pool:
+            ret = list(pool.map(_acquire, range(3)))
+        self.assertEqual(sorted(ret, key=str), [0, 0, None])
+        self.assertIsNone(hs.rate_limiter.acquire(None, 0))
+
+
+class TestDeadline(TestCase):
+
+    def test_of(self):
+        self.assertIsNone(Deadline.of(None))
+        deadline = Deadline.of(5)
+        self.assertIsInstance(deadline, Deadline)
+        self.assertIs(Deadline.of(deadline), deadline)
+        self.assertTrue(4 < deadline.remaining() <= 5)
+
+    def test_check(self):
+        Deadline(5).check('requesting')
+        deadline = Deadline(-1)
+        deadline.pages, deadline.next_page = 3, 'page4'
+        with self.assertRaises(HelpScoutTimeoutException) as context:
+            deadline.check('requesting')
+        self.assertEqual(context.exception.pages, 3)
+        self.assertEqual(context.exception.next_page, 'page4')
+        self.assertGreaterEqual(context.exception.elapsed, 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from unittest import main, TestCase
+
+from helpscout.dates import (format_timestamp, parse_timestamp,
+                             parse_timestamps, split_range, to_seconds)
+
+
+class TestDates(TestCase):
+
+    def test_parse_timestamp(self):
+        self.assertEqual(
+            parse_timestamp('2019-06-20T15:01:02Z'),
+            datetime(2019, 6, 20, 15, 1, 2, tzinfo=timezone.utc))
+        self.assertIsNone(parse_timestamp(None))
+
+    def test_parse_timestamp_other_formats(self):
+        expected = datetime(2019, 6, 20, 15, 1, 2, 500000, tzinfo=timezone.utc)
+        self.assertEqual(parse_timestamp('2019-06-20T15:01:02.5Z'), expected)
+        self.assertEqual(
+            parse_timestamp('2019-06-20T17:01:02.5+02:00'), expected)
+        with self.assertRaises(ValueError):
+            parse_timestamp('yesterday')
+
+    def test_parse_timestamps(self):
+        parsed = parse_timestamps(['2019-06-20T15:00:00Z', None,
+                                   '2019-06-20T15:00:00Z'])
+        self.assertEqual(parsed[0], datetime(2019, 6, 20, 15,
+                                             tzinfo=timezone.utc))
+        self.assertIsNone(parsed[1])
+        self.assertIs(parsed[0], parsed[2])
+
+    def test_format_timestamp(self):
+        self.assertEqual(format_timestamp(datetime(2019, 6, 20, 15)),
+                         '2019-06-20T15:00:00Z')
+        self.assertEqual(
+            format_timestamp(datetime(
+                2019, 6, 20, 15, tzinfo=timezone(timedelta(hours=-3)))),
+            '2019-06-20T18:00:00Z')
+        self.assertEqual(format_timestamp('2019-06-20T15:00:00Z'),
+                         '2019-06-20T15:00:00Z')
+
+    def test_to_seconds(self):
+        self.assertEqual(to_seconds('1970-01-02T00:00:00Z'), 86400)
+
+    def test_split_range(self):
+        windows = split_range('2019-06-01T12:00:00Z', '2019-06-03T06:00:00Z',
+                              timedelta(days=1))
+        self.assertEqual(
+            [(format_timestamp(start), format_timestamp(end))
+             for start, end in windows],
+            [('2019-06-01T12:00:00Z', '2019-06-02T00:00:00Z'),
+             ('2019-06-02T00:00:00Z', '2019-06-03T00:00:00Z'),
+             ('2019-06-03T00:00:00Z', '2019-06-03T06:00:00Z')])
+        self.assertEqual(split_range('2019-06-01T12:00:00Z',
+                                     '2019-06-01T12:00:00Z',
+                                     timedelta(days=1)), [])
+
+
+if __name__ == '__main__':
+    main()
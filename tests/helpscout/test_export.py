@@ -0,0 +1,127 @@
+import json
+
+from io import StringIO
+from unittest import main, TestCase
+from unittest.mock import MagicMock, patch
+
+from helpscout import concurrency, export
+from helpscout.client import HelpScout
+from helpscout.exceptions import HelpScoutException
+from helpscout.ratelimit import RateLimiter
+
+
+class TestExport(TestCase):
+
+    def _client(self):
+        client = MagicMock()
+        client.hit_.side_effect = lambda endpoint, method, **kwargs: iter(
+            [{'conversations': [{'id': kwargs['params']['mailbox']}]}])
+        return client
+
+    def test_conversation_shards(self):
+        shards = export.conversation_shards(
+            [1, 2], ('active', 'closed'), '2019-01-01T00:00:00Z',
+            '2019-01-03T00:00:00Z', window=export.timedelta(days=1))
+        self.assertEqual(len(shards), 8)
+        self.assertEqual(shards[0], {
+            'status': 'active', 'mailbox': 1,
+            'query': '(createdAt:[2019-01-01T00:00:00Z TO '
+                     '2019-01-01T23:59:59Z])'})
+        self.assertEqual(
+            shards[1]['query'],
+            '(createdAt:[2019-01-02T00:00:00Z TO 2019-01-02T23:59:59Z])')
+        self.assertEqual(export.conversation_shards(), [{'status': 'all'}])
+
+    def test_export_in_process_lines(self):
+        client, sink = self._client(), StringIO()
+        count = export.export(client, 'conversations',
+                              [{'mailbox': 1}, {'mailbox': 2}], sink,
+                              processes=0, fields=['id'])
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            [json.loads(line) for line in sink.getvalue().splitlines()],
+            [{'id': 1}, {'id': 2}])
+        client.hit_.assert_any_call('conversations', 'get',
+                                    params={'mailbox': 2}, fields=['id'],
+                                    exclude=None)
+
+    def test_export_in_process_callable(self):
+        exported = []
+        export.export(self._client(), 'conversations', [{'mailbox': 1}],
+                      exported.append, processes=0)
+        self.assertEqual(exported, [{'id': 1}])
+
+    def _pool(self, pool, hit_side_effect):
+        """Makes a patched pool run the shards as its processes would."""
+        result = MagicMock()
+
+        def map_async(function, tasks):
+            _, initializer, initargs = pool.call_args[0]
+            initializer(*initargs)
+            with patch.object(concurrency._process_client, 'hit_') as hit:
+                hit.side_effect = hit_side_effect
+                for task in tasks:
+                    try:
+                        function(task)
+                    except Exception as e:
+                        result.get.side_effect = e
+            return result
+
+        pool.return_value.__enter__.return_value.map_async.side_effect = (
+            map_async)
+        return result
+
+    def test_export_pool(self):
+        client = HelpScout('app_id', 'app_secret', timeout=5)
+        client.access_token = 'token'
+        sink = []
+        with patch.object(export.multiprocessing, 'Pool') as pool:
+            result = self._pool(pool, lambda *args, **kwargs: iter([
+                {'conversations': [{'id': 1}, {'id': 2}]},
+                {'conversations': [{'id': 3}]}]))
+            count = export.export(client, 'conversations', [{'mailbox': 1}],
+                                  sink.append, processes=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(sink, [{'id': 1}, {'id': 2}, {'id': 3}])
+        result.get.assert_called_once_with()
+        self.assertIsNone(client.rate_limiter)
+        processes, _, initargs = pool.call_args[0]
+        self.assertEqual(processes, 2)
+        rate_limiter = initargs[1]
+        self.assertIsInstance(rate_limiter, RateLimiter)
+        shard_client = concurrency._process_client
+        self.assertIsNot(shard_client, client)
+        self.assertEqual(shard_client.access_token, 'token')
+        self.assertIs(shard_client.rate_limiter, rate_limiter)
+        self.assertEqual(shard_client.base_url, client.base_url)
+        self.assertEqual(shard_client.timeout, 5)
+
+    def test_export_pool_shard_error(self):
+        client = HelpScout('app_id', 'app_secret')
+        client.access_token = 'token'
+
+        def hit_(endpoint, method, params, **kwargs):
+            yield {'conversations': [{'id': params['mailbox']}]}
+            if params['mailbox'] == 1:
+                raise HelpScoutException('Failed')
+
+        sink = []
+        with patch.object(export.multiprocessing, 'Pool') as pool:
+            self._pool(pool, hit_)
+            with self.assertRaises(HelpScoutException):
+                export.export(client, 'conversations',
+                              [{'mailbox': 1}, {'mailbox': 2}], sink.append,
+                              processes=2)
+        self.assertEqual(sink, [{'id': 1}, {'id': 2}])
+
+    def test_export_pool_shares_rate_limiter(self):
+        rate_limiter = RateLimiter()
+        client = HelpScout('app_id', 'app_secret', rate_limiter=rate_limiter)
+        client.access_token = 'token'
+        with patch.object(export.multiprocessing, 'Pool') as pool:
+            export.export(client, 'conversations', [], [].append)
+        self.assertIs(pool.call_args[0][2][1], rate_limiter)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+from unittest import main, skipIf, TestCase
+
+from helpscout.frames import to_arrow, to_columns, to_dataframe
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestFrames(TestCase):
+
+    items = [
+        {'id': 1, 'createdAt': '2019-06-20T15:00:00Z',
+         'primaryCustomer': {'email': 'a@b.com'},
+         'tags': [{'tag': 'vip'}], '_links': {}},
+        {'id': 2, 'createdAt': '2019-06-21T15:00:00.5Z',
+         'primaryCustomer': None, 'tags': []},
+    ]
+
+    def test_to_columns(self):
+        self.assertEqual(to_columns(self.items, ['id', 'tags.0.tag']),
+                         {'id': [1, 2], 'tags.0.tag': ['vip', None]})
+        self.assertEqual(
+            to_columns(iter(self.items), {'email': 'primaryCustomer.email'}),
+            {'email': ['a@b.com', None]})
+        self.assertEqual(list(to_columns(self.items)),
+                         ['id', 'createdAt', 'primaryCustomer', 'tags'])
+        self.assertEqual(to_columns([]), {})
+
+    def test_to_columns_api_results(self):
+        pages = iter([{'conversations': self.items[:1]},
+                      {'conversations': self.items[1:]}])
+        self.assertEqual(to_columns(pages, ['id']), {'id': [1, 2]})
+
+    @skipIf(pandas is None, 'pandas is not installed')
+    def test_to_dataframe(self):
+        df = to_dataframe(self.items, ['id', 'createdAt'])
+        self.assertEqual(list(df.columns), ['id', 'createdAt'])
+        self.assertEqual(list(df['id']), [1, 2])
+        self.assertEqual(str(df['createdAt'].dt.tz), 'UTC')
+        self.assertEqual(df['createdAt'][1],
+                         pandas.Timestamp('2019-06-21T15:00:00.5Z'))
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_arrow(self):
+        table = to_arrow(self.items, {'id': 'id', 'createdAt': 'createdAt',
+                                      'email': 'primaryCustomer.email'})
+        self.assertEqual(table.column_names, ['id', 'createdAt', 'email'])
+        self.assertEqual(table.schema.field('createdAt').type,
+                         pyarrow.timestamp('us', tz='UTC'))
+        self.assertEqual(table.column('email').to_pylist(),
+                         ['a@b.com', None])
+
+
+if __name__ == '__main__':
+    main()
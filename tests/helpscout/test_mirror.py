@@ -0,0 +1,130 @@
+from unittest import main, TestCase
+from unittest.mock import MagicMock, patch
+
+from helpscout.client import HelpScout
+from helpscout.mirror import HelpScoutMirror
+
+
+class TestMirror(TestCase):
+
+    customers = [
+        {'id': 1, 'firstName': 'Kate', 'updatedAt': '2019-06-01T00:00:00Z',
+         '_embedded': {'emails': [{'value': 'kate@fake.com'}]}},
+        {'id': 2, 'firstName': 'Matt', 'updatedAt': '2019-07-01T00:00:00Z',
+         '_embedded': {'emails': [{'value': 'matt@fake.com'}]}},
+    ]
+
+    def test_store_and_get(self):
+        mirror = HelpScoutMirror()
+        self.assertEqual(mirror.store('customers', self.customers), 2)
+        self.assertEqual(mirror.get('customers', 1), self.customers[0])
+        self.assertEqual(mirror.get('customers', '2'), self.customers[1])
+        self.assertIsNone(mirror.get('customers', 3))
+        self.assertIsNone(mirror.get('users', 1))
+
+    def test_store_replaces(self):
+        mirror = HelpScoutMirror()
+        mirror.store('users', [{'id': 1, 'email': 'old@fake.com'}])
+        mirror.store('users', [{'id': 1, 'email': 'new@fake.com'}])
+        self.assertEqual(mirror.find('users', email='old@fake.com'), [])
+        self.assertEqual(mirror.get('users', 1)['email'], 'new@fake.com')
+
+    def test_get_stale(self):
+        mirror = HelpScoutMirror(max_age=60)
+        with patch('helpscout.mirror.time') as time:
+            time.time.return_value = 1000
+            mirror.store('customers', self.customers)
+            time.time.return_value = 1059
+            self.assertEqual(mirror.get('customers', 1), self.customers[0])
+            time.time.return_value = 1061
+            self.assertIsNone(mirror.get('customers', 1))
+            self.assertEqual(
+                mirror.get('customers', 1, max_age=100), self.customers[0])
+
+    def test_find(self):
+        mirror = HelpScoutMirror()
+        mirror.store('customers', self.customers)
+        mirror.store('conversations', [{'id': 5, 'mailboxId': 10}])
+        self.assertEqual(
+            mirror.find('customers', email='matt@fake.com'),
+            [self.customers[1]])
+        self.assertEqual(
+            mirror.find('customers', updated_since='2019-06-15T00:00:00Z'),
+            [self.customers[1]])
+        self.assertEqual(mirror.find('customers'), self.customers)
+        self.assertEqual(
+            mirror.find('conversations', mailbox_id=10),
+            [{'id': 5, 'mailboxId': 10}])
+
+    def test_sync(self):
+        mirror = HelpScoutMirror()
+        client = MagicMock()
+        client.hit_.return_value = [{'customers': self.customers}]
+        self.assertEqual(mirror.sync(client, 'customers'), 2)
+        client.hit_.assert_called_with('customers', 'get', params={})
+        since = mirror.last_synced('customers')
+        self.assertRegex(since, r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+        client.hit_.return_value = []
+        self.assertEqual(mirror.sync(client, 'customers'), 0)
+        client.hit_.assert_called_with(
+            'customers', 'get', params={'modifiedSince': since})
+        self.assertEqual(mirror.sync(client, 'customers', {'a': 1}), 0)
+        client.hit_.assert_called_with('customers', 'get', params={'a': 1})
+
+    def test_sync_ignores_objects_stored_outside_syncs(self):
+        mirror = HelpScoutMirror()
+        mirror.store(
+            'customers', [{'id': 5, 'updatedAt': '2024-01-01T00:00:00Z'}])
+        client = MagicMock()
+        client.hit_.return_value = [{'customers': self.customers}]
+        self.assertEqual(mirror.sync(client, 'customers'), 2)
+        client.hit_.assert_called_with('customers', 'get', params={})
+
+    def test_sync_interrupted_keeps_watermark(self):
+        mirror = HelpScoutMirror()
+        client = MagicMock()
+        client.hit_.side_effect = ValueError()
+        with self.assertRaises(ValueError):
+            mirror.sync(client, 'customers')
+        self.assertIsNone(mirror.last_synced('customers'))
+
+    def test_conversations_updated_at(self):
+        mirror = HelpScoutMirror()
+        mirror.store('conversations', [
+            {'id': 1, 'userUpdatedAt': '2019-06-01T00:00:00Z'},
+            {'id': 2, 'userUpdatedAt': '2019-07-01T00:00:00Z'}])
+        self.assertEqual(mirror.last_updated('conversations'),
+                         '2019-07-01T00:00:00Z')
+        self.assertEqual(
+            [c['id'] for c in mirror.find(
+                'conversations', updated_since='2019-06-15T00:00:00Z')], [2])
+
+    def test_client_get_objects_uses_mirror(self):
+        mirror = HelpScoutMirror()
+        hs = HelpScout('app_id', 'app_secret', mirror=mirror)
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.return_value = iter([self.customers[0]])
+            customer = hs.customers[1].get()
+            self.assertEqual(customer.firstName, 'Kate')
+            hit.assert_called_once()
+            customer = hs.customers[1].get()
+            self.assertEqual(customer.firstName, 'Kate')
+            hit.assert_called_once()
+            customer = hs.customers.get(resource_id=1)
+            self.assertEqual(customer.firstName, 'Kate')
+            hit.assert_called_once()
+
+    def test_client_get_objects_projection_skips_mirror(self):
+        mirror = HelpScoutMirror()
+        mirror.store('customers', self.customers)
+        hs = HelpScout('app_id', 'app_secret', mirror=mirror)
+        with patch('helpscout.client.HelpScout.hit_') as hit:
+            hit.return_value = iter([{'id': 1}])
+            customer = hs.customers[1].get(fields=['id'])
+            hit.assert_called_once()
+            self.assertEqual(customer.id, 1)
+            self.assertEqual(mirror.get('customers', 1), self.customers[0])
+
+
+if __name__ == '__main__':
+    main()
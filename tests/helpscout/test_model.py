@@ -1,6 +1,12 @@
 from unittest import TestCase, main
 
-from helpscout.model import HelpScoutObject
+import gc
+import pickle
+
+from datetime import datetime, timezone
+
+from helpscout.model import (Conversation, HelpScoutObject, IdentityMap,
+                             Mailbox, Thread)
 
 
 class TestHelpScoutObject(TestCase):
@@ -44,6 +50,23 @@ class TestHelpScoutObject(TestCase):
         self.assertTrue(isinstance(users, list))
         self.assertEqual(len(users), 1)
 
+    def test_project_fields(self):
+        cls = HelpScoutObject.cls('users', 'users')
+        data = {'users': [{'id': 3, 'name': 'Kate', '_links': {}}]}
+        self.assertEqual(cls.project(data, fields=['id']),
+                         {'users': [{'id': 3}]})
+
+    def test_project_exclude_single(self):
+        cls = HelpScoutObject.cls('users', 'users')
+        data = {'id': 3, 'name': 'Kate', '_links': {}}
+        self.assertEqual(cls.project(data, exclude=['_links']),
+                         {'id': 3, 'name': 'Kate'})
+
+    def test_project_nothing(self):
+        cls = HelpScoutObject.cls('users', 'users')
+        data = {'id': 3, 'name': 'Kate'}
+        self.assertIs(cls.project(data), data)
+
     def test_entity_class_name(self):
         cls = HelpScoutObject.cls('users', 'users')
         self.assertEqual(cls.__name__, 'User')
@@ -79,6 +102,98 @@ class TestHelpScoutObject(TestCase):
         user = cls({'id': 12, 'name': 'Mike'})
         self.assertEqual(str(user), 'User(id=12, name="Mike")')
 
+    def test_declared_classes(self):
+        self.assertIs(
+            HelpScoutObject.cls('conversations', 'conversations'),
+            Conversation)
+        self.assertIs(
+            HelpScoutObject.cls('conversations/1/threads',
+                                'conversations/1/threads'),
+            Thread)
+        self.assertIs(HelpScoutObject.cls('mailboxes/3', 'mailboxes/3'),
+                      Mailbox)
+        self.assertEqual(Conversation.key, 'conversations')
+
+    def test_cls_cached(self):
+        first = HelpScoutObject.cls('sprockets/1', 'sprockets/1')
+        self.assertIs(HelpScoutObject.cls('sprockets/1', 'sprockets/1'),
+                      first)
+        self.assertIs(HelpScoutObject.cls('sprockets', 'sprockets'), first)
+        self.assertEqual(first.__name__, 'Sprocket')
+
+    def test_init_shared_sorted_attributes(self):
+        first = Conversation({'subject': 'a', 'id': 1})
+        second = Conversation({'subject': 'b', 'id': 2})
+        self.assertEqual(first._attrs, ('id', 'subject'))
+        self.assertIs(first._attrs, second._attrs)
+        second.status = 'active'
+        self.assertEqual(second._attrs, ('id', 'status', 'subject'))
+        self.assertEqual(first._attrs, ('id', 'subject'))
+
+    def test_pickle_declared(self):
+        conversation = Conversation({'id': 1, 'subject': 'Hi'})
+        self.assertEqual(
+            pickle.loads(pickle.dumps(conversation)), conversation)
+
+    def test_timestamp_attributes(self):
+        conversation = Conversation({
+            'id': 1, 'createdAt': '2019-06-20T15:00:00Z',
+            'userUpdatedAt': None})
+        created = conversation.created_at_dt
+        self.assertEqual(created, datetime(2019, 6, 20, 15,
+                                           tzinfo=timezone.utc))
+        self.assertIs(conversation.created_at_dt, created)
+        self.assertIsNone(conversation.user_updated_at_dt)
+        self.assertEqual(conversation._attrs,
+                         ('createdAt', 'id', 'userUpdatedAt'))
+        self.assertEqual(conversation, Conversation({
+            'id': 1, 'createdAt': '2019-06-20T15:00:00Z',
+            'userUpdatedAt': None}))
+        with self.assertRaises(AttributeError):
+            conversation.closed_at_dt
+        with self.assertRaises(AttributeError):
+            conversation.closed_at
+
+
+class TestIdentityMap(TestCase):
+
+    def test_from_results_shared(self):
+        identity_map = IdentityMap()
+        pages = [{'conversations': [{'id': 1, 'subject': 'a'},
+                                    {'id': 2, 'subject': 'b'}]},
+                 {'conversations': [{'id': 1, 'subject': 'a'}]}]
+        first, second, again = Conversation.from_results(pages, identity_map)
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+        self.assertIs(identity_map.get(Conversation, {'id': 2}), second)
+        self.assertIsNot(identity_map.get(Mailbox, {'id': 2}), second)
+        self.assertEqual(len(identity_map), 3)
+
+    def test_nested_shared(self):
+        identity_map = IdentityMap()
+        first = identity_map.get(Conversation, {
+            'id': 1, 'primaryCustomer': {'id': 7, 'email': 'a@b.com'}})
+        second = identity_map.get(Conversation, {
+            'id': 2, 'primaryCustomer': {'id': 7, 'email': 'a@b.com'}})
+        changed = identity_map.get(Conversation, {
+            'id': 3, 'primaryCustomer': {'id': 7, 'email': 'c@d.com'}})
+        self.assertIs(first.primaryCustomer, second.primaryCustomer)
+        self.assertEqual(changed.primaryCustomer['email'], 'c@d.com')
+
+    def test_eviction(self):
+        identity_map = IdentityMap(maxsize=1)
+        identity_map.get(Conversation, {'id': 1})
+        kept = identity_map.get(Conversation, {'id': 2})
+        identity_map.get(Conversation, {'id': 3})
+        gc.collect()
+        self.assertEqual(len(identity_map), 2)
+        self.assertIs(identity_map.get(Conversation, {'id': 2}), kept)
+
+    def test_without_id(self):
+        identity_map = IdentityMap()
+        self.assertIsNot(identity_map.get(Conversation, {'subject': 'a'}),
+                         identity_map.get(Conversation, {'subject': 'a'}))
+
 
 if __name__ == '__main__':
     main()
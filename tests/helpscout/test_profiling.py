@@ -0,0 +1,63 @@
+import tracemalloc
+
+from datetime import timedelta
+from time import sleep
+from unittest import main, TestCase
+from unittest.mock import MagicMock
+
+from helpscout.client import HelpScout
+from helpscout.profiling import HelpScoutProfiler
+
+
+class TestProfiler(TestCase):
+
+    def test_nested_phases(self):
+        profiler = HelpScoutProfiler(trace_memory=False)
+        with profiler.phase('conversations', 'build'):
+            with profiler.phase('conversations', 'request') as phase:
+                sleep(0.02)
+                phase.split('wait', 0.015)
+        build = profiler.stats[('conversations', 'build')]
+        request = profiler.stats[('conversations', 'build', 'request')]
+        wait = profiler.stats[
+            ('conversations', 'build', 'request', 'wait')]
+        self.assertEqual(build['calls'], 1)
+        self.assertLess(build['wall'], 0.01)
+        self.assertGreaterEqual(request['wall'], 0.004)
+        self.assertEqual(wait['wall'], 0.015)
+
+    def test_summary_and_folded(self):
+        profiler = HelpScoutProfiler(trace_memory=False)
+        profiler.record(('users', 'decode'), wall=0.5, cpu=0.25, memory=2048)
+        profiler.record(('users', 'request'), calls=2, wall=1.5)
+        summary = profiler.summary().splitlines()
+        self.assertEqual(len(summary), 3)
+        self.assertTrue(summary[1].startswith('users;request '))
+        self.assertEqual(profiler.folded(),
+                         'users;decode 500000\nusers;request 1500000')
+        self.assertEqual(profiler.folded('memory'), 'users;decode 2048')
+
+    def test_client_profile(self):
+        transport = MagicMock()
+        transport.request.return_value = response = MagicMock(
+            ok=True, status_code=200, content=b'',
+            elapsed=timedelta(seconds=0))
+        response.json.return_value = {'users': [{'id': 1}, {'id': 2}]}
+        hs = HelpScout('app_id', 'app_secret', transport=transport)
+        hs.access_token = 'abc'
+        with hs.profile() as profiler:
+            self.assertIs(hs.profiler, profiler)
+            self.assertTrue(tracemalloc.is_tracing())
+            users = hs.users.get()
+        self.assertIsNone(hs.profiler)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(len(users), 2)
+        self.assertEqual(set(profiler.stats), {
+            ('users', 'build'), ('users', 'build', 'request'),
+            ('users', 'build', 'request', 'wait'),
+            ('users', 'build', 'request', 'transfer'),
+            ('users', 'build', 'decode')})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+from threading import Thread
+from time import sleep
+from unittest import main, TestCase
+from unittest.mock import patch
+
+from helpscout.ratelimit import PriorityScheduler, RateLimiter
+
+
+class TestRateLimiter(TestCase):
+
+    def test_acquire_burst(self):
+        limiter = RateLimiter(rate=10, burst=3)
+        with patch('helpscout.ratelimit.time.sleep') as sleep:
+            for _ in range(3):
+                self.assertEqual(limiter.acquire(), 0)
+            sleep.assert_not_called()
+
+    def test_acquire_waits(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        limiter.acquire()
+        with patch('helpscout.ratelimit.time') as time:
+            time.time.side_effect = [limiter._state[1], limiter._state[1] + 1]
+            self.assertAlmostEqual(limiter.acquire(), 0.1)
+            time.sleep.assert_called_once()
+            self.assertAlmostEqual(time.sleep.call_args[0][0], 0.1)
+
+    def test_acquire_timeout(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        limiter.acquire()
+        with patch('helpscout.ratelimit.time.sleep') as sleep:
+            self.assertIsNone(limiter.acquire(timeout=0.5))
+            sleep.assert_not_called()
+        self.assertIsNone(limiter.acquire(timeout=0))
+
+    def test_default_burst(self):
+        self.assertEqual(RateLimiter(rate=0.5).burst, 1)
+        self.assertEqual(RateLimiter(rate=20).burst, 20)
+
+
+class TestPriorityScheduler(TestCase):
+
+    def test_reserved_capacity(self):
+        scheduler = PriorityScheduler(
+            rate=10, burst=10, reserved={'interactive': 0.3, 'normal': 0.1})
+        with patch('helpscout.ratelimit.time.time', return_value=100):
+            scheduler._updated = 100
+            for _ in range(6):
+                self.assertEqual(scheduler.acquire('bulk'), 0)
+            self.assertEqual(scheduler.acquire(), 0)
+            for _ in range(3):
+                self.assertEqual(scheduler.acquire('interactive'), 0)
+        self.assertEqual(scheduler.stats['bulk'], 6)
+        self.assertEqual(scheduler.stats['normal'], 1)
+        self.assertEqual(scheduler.stats['interactive'], 3)
+
+    def test_acquire_timeout(self):
+        scheduler = PriorityScheduler(rate=1, burst=1, reserved={})
+        scheduler.acquire('bulk')
+        self.assertIsNone(scheduler.acquire('bulk', timeout=0.01))
+        self.assertEqual(scheduler.stats['bulk_timeouts'], 1)
+        self.assertEqual(scheduler._waiting, [0, 0, 0])
+
+    def test_priority_order(self):
+        scheduler = PriorityScheduler(rate=10, burst=1, reserved={})
+        scheduler.acquire('bulk')
+        finished = []
+
+        def request(priority):
+            scheduler.acquire(priority)
+            finished.append(priority)
+
+        threads = [Thread(target=request, args=('bulk',)),
+                   Thread(target=request, args=('interactive',))]
+        threads[0].start()
+        sleep(0.02)
+        threads[1].start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(finished, ['interactive', 'bulk'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from unittest import main, TestCase
+from unittest.mock import MagicMock
+
+from helpscout.reports import HelpScoutReportRunner, merge_additive
+
+
+class TestReports(TestCase):
+
+    def _client(self):
+        client = MagicMock()
+        client.hit_.side_effect = lambda report, method, params: iter([{
+            'current': {'startDate': params['start'], 'conversations': 2,
+                        'resolutionTime': 1.5, 'customers': {'new': 1}},
+        }])
+        return client
+
+    def test_run(self):
+        client = self._client()
+        runner = HelpScoutReportRunner(client, timedelta(days=1))
+        ret = runner.run('reports/conversations', '2019-06-01T00:00:00Z',
+                         '2019-06-04T00:00:00Z', {'mailboxes': '1'},
+                         additive=['current.conversations'])
+        self.assertEqual(client.hit_.call_count, 3)
+        client.hit_.assert_any_call(
+            'reports/conversations', 'get',
+            params={'mailboxes': '1', 'start': '2019-06-02T00:00:00Z',
+                    'end': '2019-06-03T00:00:00Z'})
+        self.assertEqual(
+            [window[:2] for window in ret['windows']],
+            [('2019-06-01T00:00:00Z', '2019-06-02T00:00:00Z'),
+             ('2019-06-02T00:00:00Z', '2019-06-03T00:00:00Z'),
+             ('2019-06-03T00:00:00Z', '2019-06-04T00:00:00Z')])
+        self.assertEqual(ret['windows'][1][2]['current']['startDate'],
+                         '2019-06-02T00:00:00Z')
+        self.assertEqual(ret['totals'], {'current.conversations': 6})
+
+    def test_run_cached_windows(self):
+        client = self._client()
+        runner = HelpScoutReportRunner(client, timedelta(days=1))
+        runner.run('reports/conversations', '2019-06-01T00:00:00Z',
+                   '2019-06-03T00:00:00Z')
+        self.assertEqual(client.hit_.call_count, 2)
+        ret = runner.run('reports/conversations', '2019-06-01T00:00:00Z',
+                         '2019-06-04T00:00:00Z')
+        self.assertEqual(client.hit_.call_count, 3)
+        self.assertEqual(ret['totals'], {})
+        self.assertEqual(len(ret['windows']), 3)
+
+    def test_run_unfinished_windows_not_cached(self):
+        client = self._client()
+        runner = HelpScoutReportRunner(client, timedelta(days=1))
+        runner.run('reports/conversations', '2999-06-01T00:00:00Z',
+                   '2999-06-02T00:00:00Z')
+        self.assertEqual(runner.cache, {})
+
+    def test_merge_additive(self):
+        results = [
+            {'a': 1, 'b': 0.5, 'c': True, 'd': {'e': 2, 'day': 3}},
+            {'a': 3, 'b': 0.75, 'd': {'e': 1, 'day': 3, 'f': 'x'}},
+            {'d': None}]
+        self.assertEqual(
+            merge_additive(results, ['a', 'b', 'c', 'd.e', 'd.f', 'g']),
+            {'a': 4, 'b': 1.25, 'd.e': 3})
+
+
+if __name__ == '__main__':
+    main()
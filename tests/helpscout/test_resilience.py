@@ -0,0 +1,78 @@
+from unittest import main, TestCase
+from unittest.mock import MagicMock, patch
+
+from helpscout.exceptions import HelpScoutCircuitOpenException
+from helpscout.resilience import CircuitBreaker, HedgingPolicy
+
+
+class TestHedgingPolicy(TestCase):
+
+    def test_delay(self):
+        policy = HedgingPolicy(percentile=90, min_delay=0.01, max_delay=1,
+                               min_samples=10)
+        self.assertEqual(policy.delay(), 1)
+        for latency in range(1, 11):
+            policy.record(latency / 100.)
+        self.assertEqual(policy.delay(), 0.1)
+        policy = HedgingPolicy(min_delay=0.5, min_samples=1)
+        policy.record(0.1)
+        self.assertEqual(policy.delay(), 0.5)
+
+    def test_budget(self):
+        policy = HedgingPolicy(budget=0.5)
+        self.assertTrue(policy.acquire())
+        self.assertFalse(policy.acquire())
+        policy.record(0.1)
+        self.assertFalse(policy.acquire())
+        policy.record(0.1)
+        self.assertTrue(policy.acquire())
+
+
+class TestCircuitBreaker(TestCase):
+
+    def _open(self, breaker, endpoint='conversations'):
+        for success in (True, False, False, False):
+            breaker.before(endpoint)
+            breaker.record(endpoint, success)
+
+    def test_opens_on_failure_rate(self):
+        hook = MagicMock()
+        breaker = CircuitBreaker(failure_rate=0.5, window=4, min_requests=4,
+                                 hooks=[hook])
+        self._open(breaker)
+        self.assertEqual(breaker.state('conversations'), 'open')
+        self.assertEqual(breaker.state('customers'), 'closed')
+        hook.assert_called_once_with('circuit_state', {
+            'endpoint': 'conversations', 'state': 'open',
+            'previous': 'closed'})
+        with self.assertRaises(HelpScoutCircuitOpenException) as context:
+            breaker.before('conversations')
+        self.assertEqual(context.exception.endpoint, 'conversations')
+        breaker.before('customers')
+
+    def test_not_enough_requests(self):
+        breaker = CircuitBreaker(window=10, min_requests=5)
+        self._open(breaker)
+        self.assertEqual(breaker.state('conversations'), 'closed')
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(window=4, min_requests=4, recovery_time=30)
+        with patch('helpscout.resilience.time') as time:
+            time.time.return_value = 100
+            self._open(breaker)
+            time.time.return_value = 131
+            self.assertEqual(breaker.state('conversations'), 'half_open')
+            breaker.before('conversations')
+            with self.assertRaises(HelpScoutCircuitOpenException):
+                breaker.before('conversations')  # Only one probe at a time
+            breaker.record('conversations', False)
+            self.assertEqual(breaker.state('conversations'), 'open')
+            time.time.return_value = 162
+            breaker.before('conversations')
+            breaker.record('conversations', True)
+            self.assertEqual(breaker.state('conversations'), 'closed')
+            breaker.before('conversations')
+
+
+if __name__ == '__main__':
+    main()
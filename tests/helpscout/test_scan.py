@@ -0,0 +1,111 @@
+import re
+
+from datetime import timedelta
+from unittest import main, TestCase
+from unittest.mock import MagicMock, patch
+
+from helpscout.dates import to_seconds
+from helpscout.scan import HelpScoutScanner
+
+
+QueryRegex = re.compile(r'\(modifiedAt:\[(\S+) TO (\S+)\]\)$')
+
+
+class TestScan(TestCase):
+
+    def _client(self, conversations, page_size=2):
+        """Client listing the conversations modified within each query."""
+        client = MagicMock()
+
+        def hit_raw(endpoint, method, params, stream):
+            start, end = QueryRegex.search(params['query']).groups()
+            start, end = to_seconds(start), to_seconds(end)
+            found = [conversation for conversation in conversations
+                     if start <= conversation['modifiedAt'] <= end]
+            pages = [found[i:i + page_size]
+                     for i in range(0, len(found), page_size)] or [[]]
+            response = {
+                '_embedded': {'conversations': pages[0]},
+                'page': {'totalPages': len(pages)},
+                'pages': pages,
+            }
+            return MagicMock(json=MagicMock(return_value=response))
+
+        client.hit_raw.side_effect = hit_raw
+        client.paginate.side_effect = lambda response: iter(
+            [{'conversations': page} for page in response['pages']])
+        return client
+
+    def test_scan(self):
+        day = 24 * 3600
+        start = to_seconds('2019-06-01T00:00:00Z')
+        conversations = [{'id': i, 'modifiedAt': start + i * day}
+                         for i in range(4)]
+        client = self._client(conversations)
+        scanner = HelpScoutScanner(client, window=timedelta(days=1))
+        ret = list(scanner.scan('conversations', '2019-06-01T00:00:00Z',
+                                '2019-06-04T00:00:00Z', {'status': 'all'}))
+        self.assertEqual([conversation.id for conversation in ret],
+                         [0, 1, 2])  # The range end is excluded
+        self.assertEqual(client.hit_raw.call_count, 3)
+        client.hit_raw.assert_any_call(
+            'conversations', 'get', params={
+                'status': 'all', 'sortField': 'modifiedAt',
+                'sortOrder': 'asc', 'query': '(modifiedAt:['
+                '2019-06-02T00:00:00Z TO 2019-06-02T23:59:59Z])'},
+            stream=False)
+
+    def test_scan_stops_at_its_start(self):
+        day = 24 * 3600
+        start = to_seconds('2019-06-01T00:00:00Z')
+        now = start + 2 * day + 3600
+        conversations = [
+            {'id': 1, 'modifiedAt': start}, {'id': 2, 'modifiedAt': start},
+            {'id': 3, 'modifiedAt': start + day}]
+        client = self._client(conversations)
+        hit_raw = client.hit_raw.side_effect
+
+        def modifying_hit_raw(*args, **kwargs):
+            r = hit_raw(*args, **kwargs)
+            conversations[1] = {'id': 2, 'modifiedAt': now + 60}
+            return r
+
+        client.hit_raw.side_effect = modifying_hit_raw
+        scanner = HelpScoutScanner(client, window=timedelta(days=1))
+        with patch('helpscout.scan.time.time', return_value=now):
+            ret = list(scanner.scan('conversations', '2019-06-01T00:00:00Z',
+                                    '2019-06-04T00:00:00Z'))
+        # 2 was modified after the first window, and left to the next scan
+        self.assertEqual([conversation.id for conversation in ret],
+                         [1, 2, 3])
+        self.assertEqual(scanner.scanned_until, '2019-06-03T01:00:00Z')
+        self.assertEqual(client.hit_raw.call_count, 3)
+        self.assertIn('2019-06-03T00:59:59Z',
+                      client.hit_raw.call_args[1]['params']['query'])
+
+    def test_scan_narrows_windows(self):
+        start = to_seconds('2019-06-01T00:00:00Z')
+        conversations = [{'id': i, 'modifiedAt': start + i * 3600}
+                         for i in range(24)]
+        client = self._client(conversations)
+        scanner = HelpScoutScanner(client, window=timedelta(days=1),
+                                   max_pages=2, max_workers=2)
+        ret = list(scanner.scan('conversations', '2019-06-01T00:00:00Z',
+                                '2019-06-02T00:00:00Z'))
+        self.assertEqual([conversation.id for conversation in ret],
+                         list(range(24)))
+        self.assertGreater(client.hit_raw.call_count, 1)
+        for call in client.paginate.call_args_list:
+            self.assertLessEqual(len(call[0][0]['pages']), 2)
+
+    def test_query(self):
+        scanner = HelpScoutScanner(MagicMock(), 'createdAt')
+        self.assertEqual(
+            scanner._query('tag:vip', '2019-06-01T00:00:00Z',
+                           '2019-06-02T00:00:00Z'),
+            '(tag:vip) AND (createdAt:'
+            '[2019-06-01T00:00:00Z TO 2019-06-01T23:59:59Z])')
+
+
+if __name__ == '__main__':
+    main()
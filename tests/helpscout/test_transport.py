@@ -0,0 +1,213 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+
+from io import BytesIO
+from unittest import main, skipIf, TestCase
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+from helpscout.attachments import download_attachment
+from helpscout.client import HelpScout
+from helpscout.exceptions import HelpScoutException
+from helpscout.transport import (HTTP2Transport, HTTPXResponse,
+                                 RecordedResponse, RecordingResponse,
+                                 RecordingTransport, ReplayTransport,
+                                 RequestsTransport, Transport)
+
+try:
+    import h2
+    import httpx
+except ImportError:
+    h2 = httpx = None
+
+
+class TestTransport(TestCase):
+
+    def test_transport_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            Transport().request('get', 'url')
+
+    def test_requests_transport(self):
+        transport = RequestsTransport(pool_size=4)
+        adapter = transport.session.get_adapter('https://api.helpscout.net')
+        self.assertEqual(adapter._pool_maxsize, 4)
+        with patch.object(transport, 'session') as session:
+            transport.request('get', 'url', headers={'a': 'b'})
+            session.request.assert_called_once_with(
+                'get', 'url', headers={'a': 'b'})
+        self.assertEqual(str(transport), 'RequestsTransport(pool_size=4)')
+
+    def test_http2_transport(self):
+        httpx = MagicMock()
+        with patch.dict('sys.modules', {'httpx': httpx}):
+            transport = HTTP2Transport(max_connections=2)
+        httpx.Client.assert_called_once_with(
+            http2=True, timeout=None, limits=httpx.Limits.return_value)
+        httpx.Limits.assert_called_once_with(max_connections=2)
+        client = httpx.Client.return_value
+        client.send.return_value = MagicMock(status_code=201)
+        response = transport.request('post', 'url', headers={}, json={'a': 1})
+        client.build_request.assert_called_once_with(
+            'POST', 'url', headers={}, json={'a': 1}, content=None)
+        client.send.assert_called_once_with(
+            client.build_request.return_value, stream=False)
+        self.assertIsInstance(response, HTTPXResponse)
+        self.assertTrue(response.ok)
+        self.assertEqual(response.status_code, 201)
+        transport.request('get', 'url', timeout=(1, 5))
+        self.assertIs(client.build_request.call_args[1]['timeout'],
+                      httpx.Timeout.return_value)
+        httpx.Timeout.assert_called_once_with(5, connect=1)
+
+    @skipIf(httpx is None, 'httpx[http2] is not installed')
+    def test_http2_transport_authenticates(self):
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            if request.url.path.endswith('oauth2/token'):
+                return httpx.Response(
+                    200, json={'access_token': 'abc', 'expires_in': 7200})
+            return httpx.Response(200, json={'id': 1, 'firstName': 'Kate'})
+
+        transport = HTTP2Transport()
+        transport.client = httpx.Client(transport=httpx.MockTransport(handler))
+        hs = HelpScout('app_id', 'app_secret', transport=transport)
+        user = hs.users[1].get()
+        self.assertEqual(user.firstName, 'Kate')
+        self.assertEqual(hs.access_token, 'abc')
+        token_request, user_request = sent
+        self.assertEqual(token_request.headers['content-type'],
+                         'application/x-www-form-urlencoded')
+        self.assertEqual(
+            parse_qs(token_request.content.decode('utf-8')),
+            {'grant_type': ['client_credentials'], 'client_id': ['app_id'],
+             'client_secret': ['app_secret']})
+        self.assertEqual(user_request.headers['authorization'], 'Bearer abc')
+
+    def test_http2_transport_without_httpx(self):
+        with patch.dict('sys.modules', {'httpx': None}):
+            with self.assertRaises(ImportError):
+                HTTP2Transport()
+
+    def test_httpx_response(self):
+        wrapped = MagicMock(status_code=404, num_bytes_downloaded=3)
+        response = HTTPXResponse(wrapped)
+        self.assertFalse(response.ok)
+        self.assertEqual(response.num_bytes_downloaded, 3)
+        self.assertIs(response.json(), wrapped.json.return_value)
+        response.iter_content(10)
+        wrapped.iter_bytes.assert_called_once_with(10)
+
+
+class TestRecordReplay(TestCase):
+
+    url = 'http://helpscout.com/api/'
+    pages = {
+        url + 'oauth2/token': {'access_token': 'secret', 'expires_in': 7200},
+        url + 'users': {
+            '_embedded': [{'id': 1}, {'id': 2}], 'page': {},
+            '_links': {'next': {'href': url + 'users?page=2'}}},
+        url + 'users?page=2': {
+            '_embedded': [{'id': 3}], 'page': {}, '_links': {}},
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cassette.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self):
+        live = MagicMock()
+        live.request.side_effect = lambda method, url, **kwargs: (
+            RecordedResponse(200, {'Content-Length': '10'},
+                             json.dumps(self.pages[url]).encode('utf-8')))
+        transport = RecordingTransport(self.path, live)
+        hs = HelpScout('app_id', 'app_secret', self.url, transport=transport)
+        users = hs.users.get()
+        transport.close()
+        return users, live
+
+    def test_record_and_replay(self):
+        recorded, live = self._record()
+        self.assertEqual([user.id for user in recorded], [1, 2, 3])
+        self.assertEqual(live.request.call_count, 3)
+        transport = ReplayTransport(self.path)
+        hs = HelpScout('app_id', 'app_secret', self.url, transport=transport)
+        replayed = hs.users.get()
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(hs.access_token, 'recorded')
+        self.assertEqual(hs.stats['received_bytes'], 30)
+
+    def test_record_streamed(self):
+        data = bytes(range(256)) * 64
+        body = json.dumps(
+            {'data': base64.b64encode(data).decode('ascii')}).encode('utf-8')
+        live = MagicMock()
+        live.request.side_effect = lambda method, url, **kwargs: (
+            RecordedResponse(200, {}, json.dumps(
+                self.pages[url]).encode('utf-8'))
+            if url.endswith('oauth2/token') else
+            RecordedResponse(200, {}, body))
+        transport = RecordingTransport(self.path, live)
+        hs = HelpScout('app_id', 'app_secret', self.url, transport=transport)
+        recorded, replayed = BytesIO(), BytesIO()
+        with patch('helpscout.transport.SpoolSize', 1024):
+            download_attachment(hs, 1, 2, recorded, chunk_size=1000)
+        transport.close()
+        self.assertEqual(recorded.getvalue(), data)
+        self.assertTrue(live.request.call_args[1]['stream'])
+        hs = HelpScout('app_id', 'app_secret', self.url,
+                       transport=ReplayTransport(self.path))
+        download_attachment(hs, 1, 2, replayed)
+        self.assertEqual(replayed.getvalue(), data)
+
+    def test_recording_response_records_unread_chunks(self):
+        bodies = []
+
+        def record(spool):
+            spool.seek(0)
+            bodies.append(spool.read())
+
+        response = RecordingResponse(
+            RecordedResponse(200, {}, b'abcde'), record)
+        self.assertEqual(next(response.iter_content(2)), b'ab')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        response.close()
+        self.assertEqual(bodies, [b'abcde'])
+
+    def test_replay_latency(self):
+        self._record()
+        transport = ReplayTransport(self.path, latency=2)
+        with patch('helpscout.transport.time') as time:
+            transport.request('get', self.url + 'users')
+            time.sleep.assert_called_once()
+
+    def test_replay_missing(self):
+        self._record()
+        transport = ReplayTransport(self.path)
+        with self.assertRaises(HelpScoutException):
+            transport.request('get', self.url + 'mailboxes')
+
+    def test_replay_repeats_last(self):
+        self._record()
+        transport = ReplayTransport(self.path)
+        first = transport.request('get', self.url + 'users')
+        second = transport.request('get', self.url + 'users')
+        self.assertEqual(first.json(), second.json())
+
+    def test_recorded_response(self):
+        response = RecordedResponse(500, {}, b'abcde')
+        self.assertFalse(response.ok)
+        self.assertEqual(response.text, 'abcde')
+        self.assertEqual(list(response.iter_content(2)), [b'ab', b'cd', b'e'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+
+from io import BytesIO
+from unittest import main, TestCase
+from unittest.mock import MagicMock
+
+from helpscout.exceptions import HelpScoutInvalidSignatureException
+from helpscout.model import HelpScoutObject
+from helpscout.webhook import HelpScoutWebhook
+
+
+class TestWebhook(TestCase):
+
+    secret_key = 'secret'
+    body = json.dumps({'id': 12, 'subject': 'Hi'}).encode('utf-8')
+    signature = base64.b64encode(
+        hmac.new(b'secret', body, hashlib.sha1).digest()).decode('ascii')
+
+    def test_verify(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        self.assertTrue(webhook.verify(self.body, self.signature))
+        self.assertTrue(webhook.verify(self.body, self.signature.encode()))
+        self.assertFalse(webhook.verify(self.body + b' ', self.signature))
+        self.assertFalse(webhook.verify(self.body, 'abc'))
+        self.assertFalse(webhook.verify(self.body, None))
+
+    def test_parse(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        conversation = webhook.parse(self.body, 'convo.created')
+        self.assertIs(
+            conversation.__class__,
+            HelpScoutObject.cls('conversations', 'conversations'))
+        self.assertEqual(conversation.id, 12)
+        self.assertEqual(conversation.subject, 'Hi')
+        customer = webhook.parse(self.body, 'customer.created')
+        self.assertEqual(customer.__class__.__name__, 'Customer')
+
+    def test_handle(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        created, every = MagicMock(return_value=1), MagicMock(return_value=2)
+        webhook.on('convo.created')(created)
+        webhook.register('*', every)
+        ret = webhook.handle(self.body, self.signature, 'convo.created')
+        self.assertEqual(ret, [1, 2])
+        self.assertEqual(created.call_args[0][0], 'convo.created')
+        self.assertEqual(created.call_args[0][1].id, 12)
+        ret = webhook.handle(self.body, self.signature, 'convo.deleted')
+        self.assertEqual(ret, [2])
+        self.assertEqual(created.call_count, 1)
+
+    def test_handle_invalid_signature(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        handler = MagicMock()
+        webhook.register('convo.created', handler)
+        with self.assertRaises(HelpScoutInvalidSignatureException):
+            webhook.handle(self.body, 'abc', 'convo.created')
+        handler.assert_not_called()
+
+    def _wsgi(self, webhook, signature):
+        environ = {
+            'CONTENT_LENGTH': str(len(self.body)),
+            'wsgi.input': BytesIO(self.body),
+            'HTTP_X_HELPSCOUT_SIGNATURE': signature,
+            'HTTP_X_HELPSCOUT_EVENT': 'convo.created',
+        }
+        start_response = MagicMock()
+        webhook.wsgi_app(environ, start_response)
+        return start_response.call_args[0][0]
+
+    def test_wsgi_app(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        handler = MagicMock()
+        webhook.register('convo.created', handler)
+        self.assertEqual(self._wsgi(webhook, self.signature), '200 OK')
+        handler.assert_called_once()
+        self.assertEqual(self._wsgi(webhook, 'abc'), '401 Unauthorized')
+        handler.side_effect = ValueError()
+        self.assertEqual(
+            self._wsgi(webhook, self.signature), '500 Internal Server Error')
+
+    def test_asgi_app(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        handler = MagicMock()
+        webhook.register('convo.created', handler)
+        scope = {'type': 'http', 'headers': [
+            (b'x-helpscout-signature', self.signature.encode()),
+            (b'x-helpscout-event', b'convo.created')]}
+        messages = [{'body': self.body[:5], 'more_body': True},
+                    {'body': self.body[5:]}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(webhook.asgi_app(scope, receive, send))
+        handler.assert_called_once()
+        self.assertEqual(sent[0]['status'], 200)
+
+    def test_asgi_app_lifespan(self):
+        webhook = HelpScoutWebhook(self.secret_key)
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(webhook.asgi_app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [{'type': 'lifespan.startup.complete'},
+                                {'type': 'lifespan.shutdown.complete'}])
+        sent = []
+        asyncio.run(webhook.asgi_app({'type': 'websocket'}, receive, send))
+        self.assertEqual(sent, [])
+
+
+if __name__ == '__main__':
+    main()